@@ -0,0 +1,213 @@
+#include <algorithm>
+#include <cmath>
+#include <cstring>
+#include "Cache.h"
+Define_Module(Cache);
+
+Cache::Cache()
+{
+    capacity = 0;
+    lfu = false;
+    keySpace = 1;
+    zipfKeys = false;
+    keyRng = 0;
+    hits = 0;
+    misses = 0;
+    expired = 0;
+    evictions = 0;
+    invalidations = 0;
+}
+
+void Cache::initialize()
+{
+    capacity = par("capacity");
+    hitServiceTime = par("hitServiceTime");
+    ttl = par("ttl");
+    keySpace = par("keySpace");
+    keyRng = par("keyRng");
+    if (capacity < 0)
+        error("capacity must be >= 0, got %d", capacity);
+    if (keySpace < 1)
+        error("keySpace must be >= 1, got %d", keySpace);
+
+    std::string policy = par("evictionPolicy").stdstringValue();
+    if (policy == "lru") lfu = false;
+    else if (policy == "lfu") lfu = true;
+    else error("Unknown eviction policy: %s", policy.c_str());
+
+    std::string distribution = par("keyDistribution").stdstringValue();
+    if (distribution == "uniform") {
+        zipfKeys = false;
+    } else if (distribution == "zipf") {
+        // P(key = k) ~ 1 / (k+1)^s, sampled by inverting the cumulative table
+        zipfKeys = true;
+        double s = par("zipfExponent");
+        zipfCdf.resize(keySpace);
+        double sum = 0.0;
+        for (int k = 0; k < keySpace; k++) {
+            sum += 1.0 / std::pow(k + 1.0, s);
+            zipfCdf[k] = sum;
+        }
+        for (double& c : zipfCdf) c /= sum;
+    } else {
+        error("Unknown key distribution: %s", distribution.c_str());
+    }
+
+    EV_INFO << "Cache " << getIndex() << " initialized, capacity=" << capacity << ", policy=" << policy << endl;
+}
+
+void Cache::handleMessage(cMessage *msg)
+{
+    // Requests arrive on userIn[i], table responses on tableIn[i]; both go
+    // out on the gate of the same index on the other side
+    int index = msg->getArrivalGate()->getIndex();
+    if (msg->arrivedOn("userIn"))
+        handleRequest(msg, index);
+    else
+        handleResponse(msg, index);
+}
+
+void Cache::handleRequest(cMessage *req, int userIndex)
+{
+    if (req->getKind() >= 2 || req->hasPar("txnId")) {
+        // Withdraw of a timed-out request, or transaction lock/Release: the
+        // table owns the queue and the locks, the cache stays out of the way
+        send(req, "tableOut", userIndex);
+        return;
+    }
+
+    long key = drawKey();
+    req->addPar("key").setLongValue(key);
+    bool counted = simTime() >= getSimulation()->getWarmupPeriod();
+
+    if (req->getKind() != 0) {
+        // Write: the cached copy becomes stale now, and reads answered by
+        // the table until the write completes must not fill it again
+        invalidate(key);
+        writesInFlight[key]++;
+        send(req, "tableOut", userIndex);
+        return;
+    }
+
+    if (lookup(key)) {
+        if (counted) {
+            hits++;
+            hitResponseTime.collect(hitServiceTime.dbl());
+        }
+        // Hits are served in parallel, without a lock
+        cMessage *resp = new cMessage("Response", 0);
+        if (req->hasPar("arrivalTime"))
+            resp->addPar("arrivalTime").setDoubleValue(req->par("arrivalTime").doubleValue());
+        if (req->hasPar("requestId"))
+            resp->addPar("requestId").setLongValue(req->par("requestId").longValue());
+        delete req;
+        sendDelayed(resp, hitServiceTime, "userOut", userIndex);
+        return;
+    }
+
+    if (counted) misses++;
+    send(req, "tableOut", userIndex);
+}
+
+void Cache::handleResponse(cMessage *resp, int userIndex)
+{
+    if (resp->hasPar("txnId")) {
+        send(resp, "userOut", userIndex);
+        return;
+    }
+
+    // "Rejected" and "Withdrawn" answers carry no data: they never fill
+    // the cache, but a write that ends that way is no longer in flight
+    bool isRead = (resp->getKind() == 0);
+    bool served = (strcmp(resp->getName(), "Response") == 0);
+    if (resp->hasPar("key")) {
+        long key = resp->par("key").longValue();
+        if (isRead) {
+            if (served && writesInFlight.find(key) == writesInFlight.end()) insert(key);
+        } else {
+            auto it = writesInFlight.find(key);
+            if (it != writesInFlight.end() && --it->second == 0) writesInFlight.erase(it);
+        }
+    }
+
+    if (served && simTime() >= getSimulation()->getWarmupPeriod() && resp->hasPar("arrivalTime")) {
+        double responseTime = simTime().dbl() - resp->par("arrivalTime").doubleValue();
+        if (isRead) missResponseTime.collect(responseTime);
+        else writeResponseTime.collect(responseTime);
+    }
+    send(resp, "userOut", userIndex);
+}
+
+long Cache::drawKey()
+{
+    if (!zipfKeys) return intuniform(0, keySpace - 1, keyRng);
+    double u = uniform(0, 1, keyRng);
+    return std::lower_bound(zipfCdf.begin(), zipfCdf.end(), u) - zipfCdf.begin();
+}
+
+bool Cache::lookup(long key)
+{
+    auto it = entries.find(key);
+    if (it == entries.end()) return false;
+    if (ttl > SIMTIME_ZERO && simTime() - it->second.insertTime >= ttl) {
+        if (simTime() >= getSimulation()->getWarmupPeriod()) expired++;
+        erase(it);
+        return false;
+    }
+    Entry& entry = it->second;
+    evictionOrder.erase(OrderKey(lfu ? entry.uses : 0, entry.lastUse, key));
+    entry.uses++;
+    entry.lastUse = simTime();
+    evictionOrder.insert(OrderKey(lfu ? entry.uses : 0, entry.lastUse, key));
+    return true;
+}
+
+void Cache::insert(long key)
+{
+    if (capacity == 0) return;
+    auto it = entries.find(key);
+    if (it != entries.end()) erase(it);         // refresh: new insert time, use count restarts
+    if ((int)entries.size() >= capacity) {
+        auto victim = evictionOrder.begin();
+        erase(entries.find(std::get<2>(*victim)));
+        if (simTime() >= getSimulation()->getWarmupPeriod()) evictions++;
+    }
+    Entry entry;
+    entry.insertTime = simTime();
+    entry.lastUse = simTime();
+    entry.uses = 1;
+    entries[key] = entry;
+    evictionOrder.insert(OrderKey(lfu ? entry.uses : 0, entry.lastUse, key));
+}
+
+void Cache::invalidate(long key)
+{
+    auto it = entries.find(key);
+    if (it == entries.end()) return;
+    erase(it);
+    if (simTime() >= getSimulation()->getWarmupPeriod()) invalidations++;
+}
+
+void Cache::erase(std::map<long, Entry>::iterator it)
+{
+    evictionOrder.erase(OrderKey(lfu ? it->second.uses : 0, it->second.lastUse, it->first));
+    entries.erase(it);
+}
+
+void Cache::finish()
+{
+    recordScalar("cache.hits", hits);
+    recordScalar("cache.misses", misses);
+    if (hits + misses > 0)
+        recordScalar("cache.hitRatio", (double)hits / (hits + misses));
+    recordScalar("cache.expired", expired);
+    recordScalar("cache.evictions", evictions);
+    recordScalar("cache.invalidations", invalidations);
+    recordScalar("cache.entries", entries.size());
+
+    // Response-time breakdown seen at the cache: hits, read misses (table
+    // wait + service) and writes
+    hitResponseTime.record(this, "cache.hitResponseTime", false);
+    missResponseTime.record(this, "cache.missResponseTime", true);
+    writeResponseTime.record(this, "cache.writeResponseTime", true);
+}
@@ -0,0 +1,63 @@
+#ifndef __PROGETTO_CACHE_H_
+#define __PROGETTO_CACHE_H_
+
+#include <omnetpp.h>
+#include <map>
+#include <set>
+#include <tuple>
+#include <vector>
+#include "LeanStat.h"
+
+using namespace omnetpp;
+
+class Cache : public cSimpleModule {
+private:
+    struct Entry {
+        simtime_t insertTime;
+        simtime_t lastUse;
+        long uses;
+    };
+    // Eviction order: (uses, lastUse, key), smallest evicted first; uses
+    // stays 0 under LRU so only recency counts
+    typedef std::tuple<long, simtime_t, long> OrderKey;
+
+    int capacity;
+    simtime_t hitServiceTime;
+    simtime_t ttl;
+    bool lfu;
+    int keySpace;
+    bool zipfKeys;
+    int keyRng;
+    std::vector<double> zipfCdf;        // cumulative key probabilities (zipf only)
+
+    std::map<long, Entry> entries;
+    std::set<OrderKey> evictionOrder;
+    std::map<long, int> writesInFlight; // reads of these keys must not fill the cache
+
+    // Statistics (post warm-up)
+    long hits;
+    long misses;
+    long expired;                       // misses due to an expired entry
+    long evictions;
+    long invalidations;
+    LeanStat hitResponseTime;
+    LeanStat missResponseTime;          // cache -> table -> cache, read
+    LeanStat writeResponseTime;
+
+protected:
+    virtual void initialize() override;
+    virtual void handleMessage(cMessage *msg) override;
+    virtual void finish() override;
+    virtual void handleRequest(cMessage *req, int userIndex);
+    virtual void handleResponse(cMessage *resp, int userIndex);
+    virtual long drawKey();
+    virtual bool lookup(long key);
+    virtual void insert(long key);
+    virtual void invalidate(long key);
+    virtual void erase(std::map<long, Entry>::iterator it);
+
+public:
+    Cache();
+};
+
+#endif // __PROGETTO_CACHE_H_
@@ -0,0 +1,118 @@
+#ifndef __PROGETTO_EVENTPROFILER_H_
+#define __PROGETTO_EVENTPROFILER_H_
+
+#include <omnetpp.h>
+#include <chrono>
+#include <cmath>
+#include <map>
+#include <string>
+#include <vector>
+
+using namespace omnetpp;
+
+// Optional per-event instrumentation (profileEvents = true): event count and
+// wall-clock time per "<ModuleType>.<message kind>" category, plus the FES
+// length sampled at every profiled event, overall and per sim-time bucket
+// [2^(k-1), 2^k) s. One process-wide registry, reset when a new run starts;
+// the index-0 module of each type records its categories as scalars.
+//
+// Modules only construct a Scope when profiling is enabled, so the disabled
+// path costs a single branch per event.
+class EventProfiler {
+public:
+    struct Category {
+        std::string name;
+        long events = 0;
+        double wallTime = 0.0;          // seconds
+    };
+
+    struct FesStat {
+        long samples = 0;
+        double sum = 0.0;
+        int max = 0;
+
+        void collect(int length) {
+            samples++;
+            sum += length;
+            if (length > max) max = length;
+        }
+    };
+
+    class Scope {
+    private:
+        EventProfiler& profiler;
+        int category;
+        std::chrono::steady_clock::time_point start;
+
+    public:
+        Scope(EventProfiler& profiler, int category) : profiler(profiler), category(category) {
+            profiler.sampleFes();
+            start = std::chrono::steady_clock::now();
+        }
+
+        ~Scope() {
+            std::chrono::duration<double> elapsed = std::chrono::steady_clock::now() - start;
+            Category& c = profiler.categories[category];
+            c.events++;
+            c.wallTime += elapsed.count();
+        }
+    };
+
+private:
+    std::string runId;
+    std::vector<Category> categories;
+    FesStat fes;
+    std::map<int, FesStat> fesOverTime;     // bucket exponent k -> FES samples
+
+    void sampleFes() {
+        int length = getSimulation()->getFES()->getLength();
+        fes.collect(length);
+        double t = simTime().dbl();
+        int k = t < 1.0 ? 0 : (int)std::floor(std::log2(t)) + 1;
+        fesOverTime[k].collect(length);
+    }
+
+public:
+    static EventProfiler& instance(cComponent *owner) {
+        static EventProfiler profiler;
+        std::string current = owner->getEnvir()->getConfigEx()->getVariable(CFGVAR_RUNID);
+        if (current != profiler.runId) {
+            profiler = EventProfiler();
+            profiler.runId = current;
+        }
+        return profiler;
+    }
+
+    // Id of the category "<type>.<kind>", registered on first use
+    int category(const std::string& type, const std::string& kind) {
+        std::string name = type + "." + kind;
+        for (size_t i = 0; i < categories.size(); i++)
+            if (categories[i].name == name) return (int)i;
+        categories.push_back(Category{name});
+        return (int)categories.size() - 1;
+    }
+
+    // profile.<kind>.events / .wallTime / .meanWallTime for the categories of type
+    void record(cComponent *owner, const std::string& type) const {
+        for (const Category& c : categories) {
+            if (c.name.compare(0, type.size() + 1, type + ".") != 0) continue;
+            std::string prefix = "profile." + c.name.substr(type.size() + 1);
+            owner->recordScalar((prefix + ".events").c_str(), c.events);
+            owner->recordScalar((prefix + ".wallTime").c_str(), c.wallTime);
+            if (c.events > 0)
+                owner->recordScalar((prefix + ".meanWallTime").c_str(), c.wallTime / c.events);
+        }
+    }
+
+    void recordFes(cComponent *owner) const {
+        if (fes.samples == 0) return;
+        owner->recordScalar("profile.fesLength.mean", fes.sum / fes.samples);
+        owner->recordScalar("profile.fesLength.max", fes.max);
+        for (const auto& bucket : fesOverTime) {
+            std::string name = "profile.fesLength.upTo" + std::to_string(1L << bucket.first) + "s";
+            owner->recordScalar(name.c_str(), bucket.second.sum / bucket.second.samples);
+        }
+    }
+};
+
+#endif // __PROGETTO_EVENTPROFILER_H_
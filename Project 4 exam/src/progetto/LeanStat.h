@@ -0,0 +1,39 @@
+#ifndef __PROGETTO_LEANSTAT_H_
+#define __PROGETTO_LEANSTAT_H_
+
+#include <omnetpp.h>
+#include <limits>
+#include <string>
+
+using namespace omnetpp;
+
+// Plain in-module replacement for a mean/max/min @statistic, used when
+// leanStats = true: no signal is emitted on the hot path and the same scalar
+// names the recorders would produce ("<name>:mean", ...) are written at
+// finish(). Run lean configs with **.statistic-recording = false so the
+// idle @statistic recorders do not add empty duplicates.
+struct LeanStat {
+    long count = 0;
+    double sum = 0.0;
+    double min = std::numeric_limits<double>::infinity();
+    double max = -std::numeric_limits<double>::infinity();
+
+    void collect(double value) {
+        count++;
+        sum += value;
+        if (value < min) min = value;
+        if (value > max) max = value;
+    }
+
+    double mean() const { return count > 0 ? sum / count : std::numeric_limits<double>::quiet_NaN(); }
+
+    void record(cComponent *owner, const std::string& name, bool extremes) const {
+        owner->recordScalar((name + ":mean").c_str(), mean());
+        if (extremes) {
+            owner->recordScalar((name + ":max").c_str(), count > 0 ? max : std::numeric_limits<double>::quiet_NaN());
+            owner->recordScalar((name + ":min").c_str(), count > 0 ? min : std::numeric_limits<double>::quiet_NaN());
+        }
+    }
+};
+
+#endif // __PROGETTO_LEANSTAT_H_
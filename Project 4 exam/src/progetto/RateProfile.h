@@ -0,0 +1,220 @@
+#ifndef __PROGETTO_RATEPROFILE_H_
+#define __PROGETTO_RATEPROFILE_H_
+
+#include <omnetpp.h>
+#include <cmath>
+#include <deque>
+#include <memory>
+#include <sstream>
+#include <string>
+#include <vector>
+
+using namespace omnetpp;
+
+// On/off state of the "mmpp" rate profile: normal periods and bursts with
+// exponential durations. One modulator per run is shared by all users, so
+// a burst hits the whole system at once (a flash crowd) instead of
+// averaging out over independent users. State changes are drawn lazily, only
+// as far ahead as some user asks, and past ones are dropped. They always come
+// from the network module's RNG burstRng, never from the asking user's, so
+// the burst schedule does not depend on which user asks first or on N; with
+// common random numbers map DatabaseNetwork.rng-<burstRng> to its own stream.
+class BurstModulator {
+private:
+    std::deque<double> switches;        // upcoming state changes, increasing
+    long passed = 0;                    // state changes already dropped (parity = state)
+    double lastSwitch = 0.0;
+    double meanGap;
+    double meanDuration;
+    int rng;
+    cModule *source;                    // network module: owner of the burst stream
+
+    static std::unique_ptr<BurstModulator>& instance() {
+        static std::unique_ptr<BurstModulator> modulator;
+        return modulator;
+    }
+
+    static std::string& currentRun() {
+        static std::string runId;
+        return runId;
+    }
+
+public:
+    BurstModulator(cModule *network, double gap, double duration, int rngIndex)
+        : meanGap(gap), meanDuration(duration), rng(rngIndex), source(network) {}
+
+    static BurstModulator *get(cComponent *owner, double gap, double duration, int rngIndex) {
+        if (gap <= 0 || duration <= 0)
+            throw cRuntimeError("burstGap and burstDuration must be > 0, got %g and %g", gap, duration);
+        // A new run (same process) starts again from the normal state
+        std::string runId = owner->getEnvir()->getConfigEx()->getVariable(CFGVAR_RUNID);
+        BurstModulator *modulator = instance().get();
+        if (runId != currentRun() || !modulator) {
+            instance().reset(new BurstModulator(owner->getSimulation()->getSystemModule(), gap, duration, rngIndex));
+            currentRun() = runId;
+            return instance().get();
+        }
+        // The schedule is shared: every user must ask for the same one
+        if (gap != modulator->meanGap || duration != modulator->meanDuration || rngIndex != modulator->rng)
+            throw cRuntimeError("Inconsistent burst parameters: burstGap=%g burstDuration=%g burstRng=%d, "
+                                "but another user has %g, %g, %d (the burst schedule is shared by all users)",
+                                gap, duration, rngIndex, modulator->meanGap, modulator->meanDuration, modulator->rng);
+        return modulator;
+    }
+
+    // Whether t (>= current simulation time) falls in a burst, and when that state ends
+    bool stateAt(double t, double& end) {
+        double now = simTime().dbl();
+        while (!switches.empty() && switches.front() <= now) {
+            lastSwitch = switches.front();
+            switches.pop_front();
+            passed++;
+        }
+        while (switches.empty() || switches.back() <= t) {
+            long changes = passed + switches.size();
+            double from = switches.empty() ? lastSwitch : switches.back();
+            bool burst = (changes % 2 == 1);
+            switches.push_back(from + source->exponential(burst ? meanDuration : meanGap, rng));
+        }
+        long before = 0;
+        while (switches[before] <= t) before++;
+        end = switches[before];
+        return (passed + before) % 2 == 1;
+    }
+};
+
+// Arrival-rate profile of an open-mode user: lambda(t) = lambda * f(t), see
+// User.ned. nextArrival() returns the next arrival time after now, exactly
+// for every profile: inversion of the integrated rate (piecewise), thinning
+// against lambda * (1 + |amplitude|) (sinusoidal), and per-state exponential
+// draws restarted at every state change (mmpp, memoryless).
+class RateProfile {
+public:
+    enum Kind { CONSTANT, PIECEWISE, SINUSOIDAL, MMPP };
+
+private:
+    Kind kind = CONSTANT;
+    double lambda = 0.0;
+    std::vector<double> stepStart;      // piecewise: segment starts within a period, stepStart[0] = 0
+    std::vector<double> stepFactor;
+    double period = 0.0;                // piecewise/sinusoidal (piecewise: 0 = no repetition)
+    double amplitude = 0.0;
+    double phase = 0.0;
+    double burstFactor = 1.0;
+    BurstModulator *modulator = nullptr;
+
+    double nextPiecewise(cComponent *owner, double now, int rng) const {
+        // Segment containing now: cycle * period + stepStart[i]
+        double cycle = (period > 0) ? std::floor(now / period) : 0.0;
+        double offset = now - cycle * period;
+        size_t i = 0;
+        while (i + 1 < stepStart.size() && stepStart[i + 1] <= offset) i++;
+
+        // Spend an Exp(1) amount of integrated rate, segment by segment
+        double budget = owner->exponential(1.0, rng);
+        double t = now;
+        for (;;) {
+            double end;
+            if (i + 1 < stepStart.size()) end = cycle * period + stepStart[i + 1];
+            else if (period > 0) end = (cycle + 1) * period;
+            else end = INFINITY;
+            double rate = lambda * stepFactor[i];
+            if (rate > 0 && budget <= rate * (end - t))
+                return t + budget / rate;
+            if (std::isinf(end))
+                return INFINITY;        // rate 0 from here on: no more arrivals
+            budget -= rate * (end - t);
+            t = end;
+            if (++i == stepStart.size()) {
+                i = 0;
+                cycle++;
+            }
+        }
+    }
+
+    double nextSinusoidal(cComponent *owner, double now, int rng) const {
+        double peak = 1.0 + std::fabs(amplitude);
+        double t = now;
+        for (;;) {
+            t += owner->exponential(1.0 / (lambda * peak), rng);
+            double factor = 1.0 + amplitude * std::sin(2 * M_PI * t / period + phase);
+            if (owner->uniform(0, peak, rng) <= factor)
+                return t;
+        }
+    }
+
+    double nextMmpp(cComponent *owner, double now, int rng) const {
+        double t = now;
+        for (;;) {
+            double end;
+            double rate = lambda * (modulator->stateAt(t, end) ? burstFactor : 1.0);
+            if (rate > 0) {
+                double candidate = t + owner->exponential(1.0 / rate, rng);
+                if (candidate < end) return candidate;
+            }
+            t = end;
+        }
+    }
+
+public:
+    void configure(cComponent *owner, double rate) {
+        lambda = rate;
+        std::string name = owner->par("rateProfile").stdstringValue();
+        period = owner->par("ratePeriod").doubleValue();
+        if (name == "constant") {
+            kind = CONSTANT;
+        } else if (name == "piecewise") {
+            kind = PIECEWISE;
+            std::istringstream steps(owner->par("rateSteps").stdstringValue());
+            double start, factor;
+            while (steps >> start >> factor) {
+                if (factor < 0)
+                    throw cRuntimeError("rateSteps: negative factor %g", factor);
+                if (!stepStart.empty() && start <= stepStart.back())
+                    throw cRuntimeError("rateSteps: start times must be increasing");
+                stepStart.push_back(start);
+                stepFactor.push_back(factor);
+            }
+            if (stepStart.empty() || stepStart[0] != 0 || !steps.eof())
+                throw cRuntimeError("rateSteps must be \"start factor ...\" pairs with the first start = 0");
+            bool anyRate = false;
+            for (double f : stepFactor) anyRate = anyRate || f > 0;
+            if (!anyRate)
+                throw cRuntimeError("rateSteps: at least one factor must be > 0");
+            if (period > 0 && stepStart.back() >= period)
+                throw cRuntimeError("rateSteps: start %g not inside ratePeriod %g", stepStart.back(), period);
+        } else if (name == "sinusoidal") {
+            kind = SINUSOIDAL;
+            amplitude = owner->par("rateAmplitude").doubleValue();
+            phase = owner->par("ratePhase").doubleValue();
+            if (std::fabs(amplitude) > 1)
+                throw cRuntimeError("rateAmplitude must be in [-1, 1], got %g", amplitude);
+            if (period <= 0)
+                throw cRuntimeError("ratePeriod must be > 0 for the sinusoidal profile");
+        } else if (name == "mmpp") {
+            kind = MMPP;
+            burstFactor = owner->par("burstFactor").doubleValue();
+            if (burstFactor < 0)
+                throw cRuntimeError("burstFactor must be >= 0, got %g", burstFactor);
+            modulator = BurstModulator::get(owner, owner->par("burstGap").doubleValue(),
+                                            owner->par("burstDuration").doubleValue(), owner->par("burstRng").intValue());
+        } else {
+            throw cRuntimeError("Unknown rate profile: %s", name.c_str());
+        }
+    }
+
+    bool isConstant() const { return kind == CONSTANT; }
+
+    // Time of the next arrival after now, INFINITY if the rate stays 0
+    double nextArrival(cComponent *owner, double now, int rng) const {
+        switch (kind) {
+        case PIECEWISE: return nextPiecewise(owner, now, rng);
+        case SINUSOIDAL: return nextSinusoidal(owner, now, rng);
+        case MMPP: return nextMmpp(owner, now, rng);
+        case CONSTANT:
+        default: return now + owner->exponential(1.0 / lambda, rng);
+        }
+    }
+};
+
+#endif // __PROGETTO_RATEPROFILE_H_
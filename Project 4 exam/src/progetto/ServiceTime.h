@@ -0,0 +1,109 @@
+#ifndef __PROGETTO_SERVICETIME_H_
+#define __PROGETTO_SERVICETIME_H_
+
+#include <omnetpp.h>
+#include <cmath>
+#include <cstdlib>
+#include <cstring>
+#include <fstream>
+#include <map>
+#include <memory>
+#include <string>
+#include <vector>
+
+using namespace omnetpp;
+
+// Service time distribution of one operation type, sampled by Table when a
+// request starts service. Configured from the "<op>Service*" parameters:
+//   "request"        the serviceTime the user attached (fixed S, old behaviour)
+//   "deterministic"  always mean
+//   "exponential"    Exp(mean)
+//   "lognormal"      lognormal with the given mean and coefficient of variation cv
+//   "empirical"      resampled uniformly from a trace file of durations in
+//                    seconds, one per line ('#' starts a comment)
+// Trace files are read once per process and shared by all tables.
+class ServiceTime {
+public:
+    enum Kind { FROM_REQUEST, DETERMINISTIC, EXPONENTIAL, LOGNORMAL, EMPIRICAL };
+
+private:
+    Kind kind = FROM_REQUEST;
+    double mean = 0.0;
+    double mu = 0.0;                    // lognormal: parameters of the underlying normal
+    double sigma = 0.0;
+    std::shared_ptr<const std::vector<double>> samples;   // empirical
+
+    static std::map<std::string, std::shared_ptr<const std::vector<double>>>& traces() {
+        static std::map<std::string, std::shared_ptr<const std::vector<double>>> loaded;
+        return loaded;
+    }
+
+    static std::shared_ptr<const std::vector<double>> loadTrace(const std::string& path) {
+        auto& trace = traces()[path];
+        if (trace) return trace;
+        std::ifstream in(path);
+        if (!in)
+            throw cRuntimeError("Cannot open service time trace '%s'", path.c_str());
+        auto values = std::make_shared<std::vector<double>>();
+        std::string line;
+        long lineNumber = 0;
+        while (std::getline(in, line)) {
+            lineNumber++;
+            size_t comment = line.find('#');
+            if (comment != std::string::npos) line.erase(comment);
+            if (line.find_first_not_of(" \t\r") == std::string::npos) continue;
+            char *end;
+            double value = std::strtod(line.c_str(), &end);
+            if (end == line.c_str() || end[std::strspn(end, " \t\r")] != '\0')
+                throw cRuntimeError("%s:%ld: bad service time '%s'", path.c_str(), lineNumber, line.c_str());
+            if (value < 0)
+                throw cRuntimeError("Negative service time %g in trace '%s'", value, path.c_str());
+            values->push_back(value);
+        }
+        if (values->empty())
+            throw cRuntimeError("Service time trace '%s' is empty", path.c_str());
+        trace = values;
+        return trace;
+    }
+
+public:
+    void configure(cComponent *owner, const std::string& op) {
+        std::string name = owner->par((op + "ServiceDistribution").c_str()).stdstringValue();
+        mean = owner->par((op + "ServiceMean").c_str()).doubleValue();
+        double cv = owner->par((op + "ServiceCv").c_str()).doubleValue();
+        if (name == "request") {
+            kind = FROM_REQUEST;
+        } else if (name == "deterministic") {
+            kind = DETERMINISTIC;
+        } else if (name == "exponential") {
+            kind = EXPONENTIAL;
+        } else if (name == "lognormal") {
+            if (cv <= 0)
+                throw cRuntimeError("%sServiceCv must be > 0 for lognormal, got %g", op.c_str(), cv);
+            kind = LOGNORMAL;
+            sigma = std::sqrt(std::log(1.0 + cv * cv));
+            mu = std::log(mean) - sigma * sigma / 2;
+        } else if (name == "empirical") {
+            kind = EMPIRICAL;
+            samples = loadTrace(owner->par((op + "ServiceTrace").c_str()).stdstringValue());
+        } else {
+            throw cRuntimeError("Unknown %s service distribution: %s", op.c_str(), name.c_str());
+        }
+        if (kind != FROM_REQUEST && kind != EMPIRICAL && mean <= 0)
+            throw cRuntimeError("%sServiceMean must be > 0, got %g", op.c_str(), mean);
+    }
+
+    bool fromRequest() const { return kind == FROM_REQUEST; }
+
+    double sample(cComponent *owner, int rng) const {
+        switch (kind) {
+        case DETERMINISTIC: return mean;
+        case EXPONENTIAL: return owner->exponential(mean, rng);
+        case LOGNORMAL: return owner->lognormal(mu, sigma, rng);
+        case EMPIRICAL: return (*samples)[owner->intuniform(0, samples->size() - 1, rng)];
+        default: return mean;
+        }
+    }
+};
+
+#endif // __PROGETTO_SERVICETIME_H_
@@ -0,0 +1,95 @@
+#ifndef __PROGETTO_SNAPSHOTWRITER_H_
+#define __PROGETTO_SNAPSHOTWRITER_H_
+
+#include <omnetpp.h>
+#include <cmath>
+#include <filesystem>
+#include <fstream>
+#include <map>
+#include <memory>
+#include <string>
+
+using namespace omnetpp;
+
+// Append-only CSV of cumulative counters written periodically during a run,
+// so a killed or timed-out run still leaves partial results behind
+// (read by simulations/snapshots.py). All modules of a run that use the same
+// path share one writer; writers of a previous run (same process, e.g.
+// repeat > 1 in Cmdenv) are closed when a new run id shows up.
+//
+// One row per module and snapshot:
+//   time,module,served,waitSum,busyTime,maxQueue,arrivals,queueLength
+// arrivals = requests sent (users), queueLength = requests queued at that
+// instant (tables); fields that do not apply to a module are left empty.
+class SnapshotWriter {
+private:
+    std::ofstream out;
+    double lastTime = -1.0;
+
+    static std::map<std::string, std::unique_ptr<SnapshotWriter>>& writers() {
+        static std::map<std::string, std::unique_ptr<SnapshotWriter>> instances;
+        return instances;
+    }
+
+    static std::string& currentRun() {
+        static std::string runId;
+        return runId;
+    }
+
+    void field(double value) {
+        out << ',';
+        if (!std::isnan(value)) out << value;
+    }
+
+public:
+    explicit SnapshotWriter(const std::string& path) {
+        std::filesystem::path p(path);
+        if (p.has_parent_path())
+            std::filesystem::create_directories(p.parent_path());
+        out.open(path, std::ios::out | std::ios::trunc);
+        out.precision(12);
+        out << "time,module,served,waitSum,busyTime,maxQueue,arrivals,queueLength\n";
+        out.flush();
+    }
+
+    // "${resultdir}/${configname}-${runnumber}.snap.csv" when no path is given
+    static std::string defaultPath(cComponent *owner) {
+        cConfigurationEx *cfg = owner->getEnvir()->getConfigEx();
+        return std::string(cfg->getVariable(CFGVAR_RESULTDIR)) + "/" + cfg->getVariable(CFGVAR_CONFIGNAME)
+               + "-" + cfg->getVariable(CFGVAR_RUNNUMBER) + ".snap.csv";
+    }
+
+    static SnapshotWriter *get(cComponent *owner, const std::string& path) {
+        std::string runId = owner->getEnvir()->getConfigEx()->getVariable(CFGVAR_RUNID);
+        if (runId != currentRun()) {
+            writers().clear();
+            currentRun() = runId;
+        }
+        std::string file = path.empty() ? defaultPath(owner) : path;
+        auto& writer = writers()[file];
+        if (!writer)
+            writer.reset(new SnapshotWriter(file));
+        return writer.get();
+    }
+
+    void write(simtime_t t, const std::string& module, double served, double waitSum,
+               double busyTime, double maxQueue, double arrivals, double queueLength) {
+        // A newer timestamp means the previous snapshot is complete: push it to disk
+        if (t.dbl() != lastTime) {
+            out.flush();
+            lastTime = t.dbl();
+        }
+        out << t.dbl() << ',' << module;
+        field(served);
+        field(waitSum);
+        field(busyTime);
+        field(maxQueue);
+        field(arrivals);
+        field(queueLength);
+        out << '\n';
+    }
+
+    void flush() { out.flush(); }
+};
+
+#endif // __PROGETTO_SNAPSHOTWRITER_H_
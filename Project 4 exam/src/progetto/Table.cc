@@ -1,21 +1,37 @@
 #include <algorithm>
+#include <cmath>
 #include "Table.h"
 Define_Module(Table);
 
 Table::Table()
 {
-    activeReaders = 0;
-    writeActive = false;
+    numPartitions = 1;
+    numReplicas = 0;
+    hashPartitions = false;
+    replicaSelection = LEAST_LOADED;
+    selectionRng = 0;
+    replicaWrites = 0;
+    queuedRequests = 0;
+    busyPartitions = 0;
+    policy = FCFS;
+    policyBound = 0;
+    serviceRng = 0;
+    admission = ADMIT_ALL;
+    queueCapacity = 0;
+    rejected = 0;
+    codelDropped = 0;
+    withdrawn = 0;
     totalServed = 0;
     totalReads = 0;
     totalWrites = 0;
-    busyTimeStart = SIMTIME_ZERO;
     totalBusyTime = SIMTIME_ZERO;
     lastStateChange = SIMTIME_ZERO;
     maxQueueLength = 0;
-    totalQueueLength = 0;
-    queueLengthSamples = 0;
     totalWaitingTime = 0.0;
+    snapshotTimer = nullptr;
+    snapshots = nullptr;
+    profileEvents = false;
+    profiler = nullptr;
 }
 
 Table::~Table()
@@ -25,12 +41,15 @@ Table::~Table()
         cancelAndDelete(evt);
     }
     serviceEvents.clear();
+    cancelAndDelete(snapshotTimer);
+
+    for (auto& held : heldLocks) delete held.second.first;
+    heldLocks.clear();
 
     // delete all queued requests
-    while (!requestQueue.empty()) {
-        cMessage *m = requestQueue.front();
-        requestQueue.pop();
-        delete m;
+    for (Partition& part : partitions) {
+        for (cMessage *m : part.queue) delete m;
+        part.queue.clear();
     }
 }
 
@@ -43,23 +62,96 @@ void Table::initialize()
     else
         numUsers = -1;
 
-    activeReaders = 0;
-    writeActive = false;
+    numPartitions = par("partitions");
+    if (numPartitions < 1)
+        error("partitions must be >= 1, got %d", numPartitions);
+    numReplicas = par("readReplicas");
+    if (numReplicas < 0)
+        error("readReplicas must be >= 0, got %d", numReplicas);
+    partitions.assign(numPartitions * (1 + numReplicas), Partition());
+    for (Partition& part : partitions) part.lastIntegralUpdate = simTime();
+    std::string selection = par("partitionSelection").stdstringValue();
+    if (selection == "hash") hashPartitions = true;
+    else if (selection == "uniform") hashPartitions = false;
+    else error("Unknown partition selection: %s", selection.c_str());
+    std::string replicaPolicy = par("replicaSelection").stdstringValue();
+    if (replicaPolicy == "leastLoaded") replicaSelection = LEAST_LOADED;
+    else if (replicaPolicy == "roundRobin") replicaSelection = ROUND_ROBIN;
+    else if (replicaPolicy == "random") replicaSelection = RANDOM_REPLICA;
+    else error("Unknown replica selection: %s", replicaPolicy.c_str());
+    selectionRng = par("selectionRng");
+    replicationDelay = par("replicationDelay");
+    replicaWrites = 0;
+    queuedRequests = 0;
+    busyPartitions = 0;
+
+    std::string policyName = par("schedulingPolicy").stdstringValue();
+    if (policyName == "fcfs") policy = FCFS;
+    else if (policyName == "readerBatch") policy = READER_BATCH;
+    else if (policyName == "writerPriority") policy = WRITER_PRIORITY;
+    else if (policyName == "phaseFair") policy = PHASE_FAIR;
+    else if (policyName == "boundedBypass") policy = BOUNDED_BYPASS;
+    else error("Unknown scheduling policy: %s", policyName.c_str());
+    policyBound = par("policyBound");
+    if ((policy == READER_BATCH || policy == BOUNDED_BYPASS) && policyBound < 1)
+        error("policyBound must be >= 1 for %s, got %d", policyName.c_str(), policyBound);
+
+    readService.configure(this, "read");
+    writeService.configure(this, "write");
+    serviceRng = par("serviceRng");
+
+    std::string admissionName = par("admissionControl").stdstringValue();
+    if (admissionName == "none") admission = ADMIT_ALL;
+    else if (admissionName == "maxQueue") admission = MAX_QUEUE;
+    else if (admissionName == "codel") admission = CODEL;
+    else error("Unknown admission control: %s", admissionName.c_str());
+    queueCapacity = par("queueCapacity");
+    if (admission == MAX_QUEUE && queueCapacity < 1)
+        error("queueCapacity must be >= 1, got %d", queueCapacity);
+    codelTarget = par("codelTarget");
+    codelInterval = par("codelInterval");
+    if (admission == CODEL && codelInterval <= SIMTIME_ZERO)
+        error("codelInterval must be > 0");
+    rejected = 0;
+    codelDropped = 0;
+    withdrawn = 0;
 
     totalServed = 0;
     totalReads = 0;
     totalWrites = 0;
 
-    busyTimeStart = SIMTIME_ZERO;
     totalBusyTime = SIMTIME_ZERO;
     lastStateChange = simTime();
     maxQueueLength = 0;
-    totalQueueLength = 0;
-    queueLengthSamples = 0;
     totalWaitingTime = 0.0;
+    recordWaitSketch = par("recordWaitSketch");
+    double sketchAccuracy = par("sketchRelativeAccuracy");
+    int sketchMaxBins = par("sketchMaxBins");
+    if (sketchAccuracy <= 0 || sketchAccuracy >= 1)
+        error("sketchRelativeAccuracy must be in (0, 1), got %g", sketchAccuracy);
+    if (sketchMaxBins < 2)
+        error("sketchMaxBins must be >= 2, got %d", sketchMaxBins);
+    waitSketch.configure(sketchAccuracy, sketchMaxBins);
+    leanStats = par("leanStats");
+    snapshotInterval = par("snapshotInterval");
+    if (snapshotInterval > SIMTIME_ZERO) {
+        snapshots = SnapshotWriter::get(this, par("snapshotFile").stdstringValue());
+        snapshotTimer = new cMessage("SnapshotTimer");
+        scheduleAt(simTime() + snapshotInterval, snapshotTimer);
+    }
+
+    profileEvents = par("profileEvents");
+    if (profileEvents) {
+        profiler = &EventProfiler::instance(this);
+        profileSnapshot = profiler->category("Table", "snapshot");
+        profileArrival[0] = profiler->category("Table", "arrival.read");
+        profileArrival[1] = profiler->category("Table", "arrival.write");
+        profileServiceDone[0] = profiler->category("Table", "serviceDone.read");
+        profileServiceDone[1] = profiler->category("Table", "serviceDone.write");
+        profileWithdraw = profiler->category("Table", "withdraw");
+        profileRelease = profiler->category("Table", "release");
+    }
     
-    
-    queueLengthSignal = registerSignal("queueLength");
     waitingTimeSignal = registerSignal("waitingTime");
     throughputSignal = registerSignal("throughput");
     utilizationSignal = registerSignal("utilization");
@@ -68,11 +160,43 @@ void Table::initialize()
 }
 
 void Table::handleMessage(cMessage *msg)
+{
+    if (!profileEvents) {
+        dispatchMessage(msg);
+        return;
+    }
+    int category;
+    if (msg == snapshotTimer) {
+        category = profileSnapshot;
+    } else if (strncmp(msg->getName(), "serviceDone", 11) == 0) {
+        cMessage *orig = (cMessage*) msg->getContextPointer();
+        category = profileServiceDone[orig && orig->getKind() != 0 ? 1 : 0];
+    } else if (msg->getKind() == 2) {
+        category = profileWithdraw;
+    } else if (msg->getKind() == 3) {
+        category = profileRelease;
+    } else {
+        category = profileArrival[msg->getKind() == 0 ? 0 : 1];
+    }
+    EventProfiler::Scope scope(*profiler, category);
+    dispatchMessage(msg);
+}
+
+void Table::dispatchMessage(cMessage *msg)
 {
     // Distinguish between arrivals from users (original requests) and internal service completion events
     // We mark service completion events by their name starting with "serviceDone"
 
-    if (strncmp(msg->getName(), "serviceDone", 11) == 0) {
+    if (msg == snapshotTimer) {
+        writeSnapshot();
+        scheduleAt(simTime() + snapshotInterval, snapshotTimer);
+    } else if (strcmp(msg->getName(), "replicate") == 0) {
+        // A committed write reaches a replica: queue it there as a write
+        removeEvent(msg);
+        int k = msg->par("lockIndex").longValue();
+        msg->setName("replicaWrite");
+        enqueue(msg, k);
+    } else if (strncmp(msg->getName(), "serviceDone", 11) == 0) {
         // Service completion for some original request
         cMessage *orig = (cMessage*) msg->getContextPointer();
         if (!orig) {
@@ -82,165 +206,481 @@ void Table::handleMessage(cMessage *msg)
             return;
         }
 
-        // Determine user id to send response
-        long userId = -1;
-        if (orig->hasPar("userId")) userId = orig->par("userId").longValue();
-
-        bool isRead = (orig->getKind() == 0);
+        int k = msg->getKind();             // the service event carries the lock index in its kind
+        removeEvent(msg);
+        delete msg; // serviceDone event
+        completeRequest(orig, k);
+
+    } else if (msg->getKind() == 2) {
+        // The user gave up on a request (requestTimeout)
+        withdrawRequest(msg);
+    } else if (msg->getKind() == 3) {
+        // End of a transaction: its lock here is released
+        releaseLock(msg);
+    } else {
+        // Arrival from a user: push into FIFO queue
+        EV_DEBUG << "Table " << tableId << " received request " << msg->getName() << " from user "
+                 << (msg->hasPar("userId") ? msg->par("userId").longValue() : -1) << " at " << simTime() << endl;
 
-        // Create response message to send back to the user
-        cMessage *resp = new cMessage("Response");
-        resp->setKind(orig->getKind()); // preserve read/write kind
-        // copy arrivalTime param so user can compute wait time
-        if (orig->hasPar("arrivalTime")) {
-            cMsgPar *p = new cMsgPar("arrivalTime");
-            p->setDoubleValue(orig->par("arrivalTime").doubleValue());
-            resp->addPar(p);
-        }
+        int k = selectPartition(msg);
+        if (numReplicas > 0 && msg->getKind() == 0) k = selectReplica(k);
+        enqueue(msg, k);
+    }
+}
 
-        // send back to originating user via userOut[userId]
-        if (userId >= 0) {
-            send(resp, "userOut", (int)userId);
-        } else {
-            // If we don't know user id, just delete
-            delete resp;
-        }
+void Table::completeRequest(cMessage *orig, int k)
+{
+    // Service done, or Release of a transaction lock (hold = true): answer the
+    // user, then free the lock of domain k
+    bool isRead = (orig->getKind() == 0);
+    bool held = orig->hasPar("hold") && orig->par("hold").boolValue();
+
+    if (strcmp(orig->getName(), "replicaWrite") == 0) {
+        // Replica apply: no response and not part of the user-visible statistics
+        replicaWrites++;
+        if (simTime() >= getSimulation()->getWarmupPeriod())
+            replicationLag.collect((simTime() - orig->par("commitTime").doubleValue()).dbl());
+    } else {
+        if (!held) sendResponse(orig, "Response");
 
         // Update stats
         totalServed++;
         if (isRead) totalReads++; else totalWrites++;
 
-        EV_DEBUG << "Table " << tableId << " finished " << (isRead?"READ":"WRITE") << " for user " << userId << " at " << simTime() << endl;
+        EV_DEBUG << "Table " << tableId << " finished " << (isRead?"READ":"WRITE") << " for user "
+                 << (orig->hasPar("userId") ? orig->par("userId").longValue() : -1) << " at " << simTime() << endl;
 
-        // Clean up original request and the service event message
-        delete orig; // original request received from user
-        removeEvent(msg);
-        delete msg; // serviceDone event
+        // A write committed on a primary is shipped to its replicas
+        if (!isRead && numReplicas > 0) replicateWrite(orig, k);
+    }
 
-        if (isRead) {
-            activeReaders--;
-            if (activeReaders < 0) activeReaders = 0; // safety
-        } else {
-            writeActive = false;
-        }
-        
-        // If now idle (no readers active, no write), accumulate busy time
-        bool nowIdle = (activeReaders == 0 && !writeActive);
-        if (nowIdle) {
+    Partition& part = partitions[k];
+    part.served++;
+
+    // Clean up original request
+    delete orig; // original request received from user
+
+    updateTimeIntegrals(part);
+    if (isRead) {
+        part.activeReaders--;
+        if (part.activeReaders < 0) part.activeReaders = 0; // safety
+    } else {
+        part.writeActive = false;
+    }
+    
+    // If the partition is now idle (no readers active, no write), accumulate
+    // its busy time; the table is idle when no partition is busy
+    if (!part.busy()) {
+        part.busyTime += simTime() - part.busySince;
+        if (--busyPartitions == 0) {
             totalBusyTime += simTime() - lastStateChange;
             lastStateChange = simTime();
         }
+    }
 
-        // Try to start next services in queue
-        processQueue();
+    // Try to start next services in queue
+    processQueue(k);
+}
 
-    } else {
-        // Arrival from a user: push into FIFO queue
-        EV_DEBUG << "Table " << tableId << " received request " << msg->getName() << " from user "
-                 << (msg->hasPar("userId") ? msg->par("userId").longValue() : -1) << " at " << simTime() << endl;
+void Table::releaseLock(cMessage *release)
+{
+    auto key = std::make_pair(release->par("userId").longValue(), release->par("txnId").longValue());
+    delete release;
+    auto it = heldLocks.find(key);
+    if (it == heldLocks.end()) {
+        EV_WARN << "Release for a lock not held on table " << tableId << endl;
+        return;
+    }
+    cMessage *req = it->second.first;
+    int k = it->second.second;
+    heldLocks.erase(it);
+    completeRequest(req, k);
+}
+
+void Table::enqueue(cMessage *req, int k)
+{
+    Partition& part = partitions[k];
+    if (admission == MAX_QUEUE && (int)part.queue.size() >= queueCapacity
+            && strcmp(req->getName(), "replicaWrite") != 0) {
+        // Partition queue full: refuse instead of letting the wait grow
+        rejected++;
+        sendResponse(req, "Rejected");
+        delete req;
+        return;
+    }
+
+    updateTimeIntegrals(part);
+    part.queue.push_back(req);
+    queuedRequests++;
 
-        requestQueue.push(msg);
-        
-        // Update queue length statistics and emit signal
-        int qlen = requestQueue.size();
-        if (qlen > maxQueueLength) maxQueueLength = qlen;
-        totalQueueLength += qlen;
-        queueLengthSamples++;
-        emit(queueLengthSignal, qlen);
+    // Queue length is integrated over time (updateTimeIntegrals), only the max is tracked here
+    int qlen = part.queue.size();
+    if (qlen > part.maxQueueLength) part.maxQueueLength = qlen;
+    if (queuedRequests > maxQueueLength) maxQueueLength = queuedRequests;
 
-        // Try to start service if possible
-        processQueue();
+    // Try to start service if possible
+    processQueue(k);
+}
+
+void Table::withdrawRequest(cMessage *withdraw)
+{
+    long userId = withdraw->par("userId").longValue();
+    long requestId = withdraw->par("requestId").longValue();
+    delete withdraw;
+
+    for (size_t k = 0; k < partitions.size(); k++) {
+        Partition& part = partitions[k];
+        auto it = std::find_if(part.queue.begin(), part.queue.end(), [=](cMessage *m) {
+            return m->hasPar("requestId") && m->par("requestId").longValue() == requestId
+                && m->par("userId").longValue() == userId;
+        });
+        if (it == part.queue.end()) continue;
+
+        cMessage *req = *it;
+        updateTimeIntegrals(part);
+        part.queue.erase(it);
+        queuedRequests--;
+        withdrawn++;
+        sendResponse(req, "Withdrawn");
+        delete req;
+        // A withdrawn writer may have been blocking the readers behind it
+        processQueue(k);
+        return;
     }
-}void Table::processQueue()
+    // Not queued: already in service (the user will see a late response) or already refused
+}
+
+void Table::sendResponse(cMessage *req, const char *name)
 {
+    // send back to originating user via userOut[userId]; if we don't know
+    // the user id there is nobody to answer
+    if (!req->hasPar("userId")) return;
+    long userId = req->par("userId").longValue();
+    if (userId < 0) return;
+
+    cMessage *resp = new cMessage(name);
+    resp->setKind(req->getKind()); // preserve read/write kind
+    // copy arrivalTime param so user can compute wait time
+    if (req->hasPar("arrivalTime")) {
+        cMsgPar *p = new cMsgPar("arrivalTime");
+        p->setDoubleValue(req->par("arrivalTime").doubleValue());
+        resp->addPar(p);
+    }
+    // row key drawn by the cache (useCache), needed to fill it
+    if (req->hasPar("key"))
+        resp->addPar("key").setLongValue(req->par("key").longValue());
+    // requestTimeout: lets the user match the response to its deadline
+    if (req->hasPar("requestId"))
+        resp->addPar("requestId").setLongValue(req->par("requestId").longValue());
+    if (req->hasPar("txnId"))
+        resp->addPar("txnId").setLongValue(req->par("txnId").longValue());
+    send(resp, "userOut", (int)userId);
+}
+
+int Table::selectPartition(cMessage *req)
+{
+    if (numPartitions == 1) return 0;
+    if (hashPartitions && req->hasPar("userId"))
+        return (int)(req->par("userId").longValue() % numPartitions);
+    return intuniform(0, numPartitions - 1, selectionRng);
+}
+
+int Table::selectReplica(int k)
+{
+    Partition& primary = partitions[k];
+    switch (replicaSelection) {
+    case ROUND_ROBIN:
+        primary.nextReplica = (primary.nextReplica + 1) % numReplicas;
+        return replicaIndex(k, primary.nextReplica);
+    case RANDOM_REPLICA:
+        return replicaIndex(k, intuniform(0, numReplicas - 1, selectionRng));
+    case LEAST_LOADED:
+    default: {
+        int best = replicaIndex(k, 0);
+        for (int r = 1; r < numReplicas; r++) {
+            int idx = replicaIndex(k, r);
+            if (partitions[idx].load() < partitions[best].load()) best = idx;
+        }
+        return best;
+    }
+    }
+}
+
+void Table::replicateWrite(cMessage *write, int k)
+{
+    for (int r = 0; r < numReplicas; r++) {
+        cMessage *apply = new cMessage("replicate", 1);
+        apply->addPar("lockIndex").setLongValue(replicaIndex(k, r));
+        apply->addPar("commitTime").setDoubleValue(simTime().dbl());
+        if (write->hasPar("serviceTime"))
+            apply->addPar("serviceTime").setDoubleValue(write->par("serviceTime").doubleValue());
+        serviceEvents.push_back(apply);
+        scheduleAt(simTime() + replicationDelay, apply);
+    }
+}
+
+void Table::processQueue(int k)
+{
+    Partition& part = partitions[k];
+
     // If a WRITE is in progress, everything is blocked.
-    if (writeActive) {
+    if (part.writeActive || part.queue.empty()) {
         return;
     }
 
-    // Process queue as long as possible
-    while (!requestQueue.empty()) {
-        cMessage *req = requestQueue.front();
-        bool isReadRequest = (req->getKind() == 0); // 0 = READ
-
-        if (isReadRequest) {
-            // THIS IS A READ
-            // Since writeActive is false (checked above), the read can proceed
-            // EVEN IF there are already other active readers (activeReaders > 0).
-            
-            requestQueue.pop();           // Remove from queue
-            startServiceForRequest(req);  // Start (increment activeReaders)
-            
-            // Continue loop! Other reads in queue can enter immediately.
-        } 
-        else {
-            // THIS IS A WRITE
-            // Write requires EXCLUSIVE access.
-            // Must wait for activeReaders to reach 0.
-            
-            if (activeReaders == 0) {
-                // Clear! Table is empty.
-                requestQueue.pop();
-                startServiceForRequest(req); // Will set writeActive = true
-                
-                // Now there's a writer, absolute stop.
-                break; 
-            } else {
-                // Readers present. Write waits.
-                // Being FCFS, write blocks everyone behind it.
+    switch (policy) {
+    case FCFS:
+        // Reads at the front start even with other readers active; a write
+        // must wait for part.activeReaders to reach 0 and blocks everyone behind it
+        while (!part.writeActive && !part.queue.empty()) {
+            if (part.queue.front()->getKind() != 0 && part.activeReaders > 0) break;
+            startQueued(k, part.queue.begin());
+        }
+        break;
+
+    case READER_BATCH:
+        if (part.activeReaders == 0) {
+            if (part.queue.front()->getKind() != 0) {
+                startQueued(k, part.queue.begin());
                 break;
             }
+            // Open a batch: up to policyBound queued reads, also from behind waiting writers
+            for (int n = 0; n < policyBound; n++) {
+                auto read = firstQueued(part, 0);
+                if (read == part.queue.end()) break;
+                startQueued(k, read);
+            }
+        }
+        // The open batch grows only while no writer is waiting
+        if (firstQueued(part, 1) == part.queue.end()) {
+            while (!part.queue.empty()) startQueued(k, part.queue.begin());
+        }
+        break;
+
+    case WRITER_PRIORITY:
+        while (!part.writeActive && !part.queue.empty()) {
+            auto writer = firstQueued(part, 1);
+            if (writer == part.queue.end()) {
+                startQueued(k, part.queue.begin());   // only reads queued
+            } else if (part.activeReaders == 0) {
+                startQueued(k, writer);
+            } else {
+                break;                                // readers drain, then the writer
+            }
+        }
+        break;
+
+    case PHASE_FAIR: {
+        auto writer = firstQueued(part, 1);
+        if (writer == part.queue.end()) {
+            while (!part.queue.empty()) startQueued(k, part.queue.begin());
+            part.lastPhaseWrite = false;
+        } else if (part.lastPhaseWrite && firstQueued(part, 0) != part.queue.end()) {
+            // Read phase after a write: every read waiting now, then the next writer
+            for (auto read = firstQueued(part, 0); read != part.queue.end(); read = firstQueued(part, 0))
+                startQueued(k, read);
+            part.lastPhaseWrite = false;
+        } else if (part.activeReaders == 0) {
+            startQueued(k, writer);
+            part.lastPhaseWrite = true;
+        }
+        break;
+    }
+
+    case BOUNDED_BYPASS:
+        while (!part.writeActive && !part.queue.empty()) {
+            if (part.queue.front()->getKind() == 0) {
+                startQueued(k, part.queue.begin());
+            } else if (part.activeReaders == 0) {
+                startQueued(k, part.queue.begin());
+                part.writerBypasses = 0;
+            } else {
+                // The front writer waits for the active readers: a read may
+                // overtake it, at most policyBound times
+                auto read = firstQueued(part, 0);
+                if (part.writerBypasses >= policyBound || read == part.queue.end()) break;
+                part.writerBypasses++;
+                startQueued(k, read);
+            }
         }
+        break;
+    }
+
+    // A request dropped by CoDel started nothing: look at the queue again
+    if (part.dropRetry) {
+        part.dropRetry = false;
+        processQueue(k);
     }
 }
 
-void Table::startServiceForRequest(cMessage *req)
+std::deque<cMessage*>::iterator Table::firstQueued(Partition& part, short kind)
 {
-    // Create a service completion event
-    char buf[64];
-    sprintf(buf, "serviceDone-%s", req->getName());
-    cMessage *done = new cMessage(buf);
-    // attach the original request so we can reply when the service completes
-    done->setContextPointer((void*)req);
+    return std::find_if(part.queue.begin(), part.queue.end(),
+                        [kind](cMessage *m) { return (m->getKind() == 0) == (kind == 0); });
+}
 
-    // record this event for cleanup
-    serviceEvents.push_back(done);
+void Table::startQueued(int k, std::deque<cMessage*>::iterator it)
+{
+    Partition& part = partitions[k];
+    cMessage *req = *it;
+    updateTimeIntegrals(part);
+    part.queue.erase(it);
+    queuedRequests--;
+    if (admission == CODEL && codelShouldDrop(part, req)) {
+        rejected++;
+        codelDropped++;
+        sendResponse(req, "Rejected");
+        delete req;
+        part.dropRetry = true;
+        return;
+    }
+    startServiceForRequest(req, k);
+}
+
+bool Table::codelShouldDrop(Partition& part, cMessage *req)
+{
+    // CoDel (RFC 8289) on the queueing delay of the request being dequeued;
+    // replica writes carry no arrivalTime and are never dropped
+    if (!req->hasPar("arrivalTime")) return false;
+    simtime_t now = simTime();
+    simtime_t sojourn = now - req->par("arrivalTime").doubleValue();
+
+    // The delay is persistently high when it stays above target for a whole interval
+    bool okToDrop = false;
+    if (sojourn < codelTarget || part.queue.empty()) {
+        part.firstAboveTime = SIMTIME_ZERO;
+    } else if (part.firstAboveTime == SIMTIME_ZERO) {
+        part.firstAboveTime = now + codelInterval;
+    } else if (now >= part.firstAboveTime) {
+        okToDrop = true;
+    }
 
-    // determine service time: prefer 'serviceTime' parameter on the request, else default 1.0
-    double serviceTime = 1.0;
-    if (req->hasPar("serviceTime")) serviceTime = req->par("serviceTime").doubleValue();
+    if (part.dropping) {
+        if (!okToDrop) {
+            part.dropping = false;
+        } else if (now >= part.dropNext) {
+            // Control law: drops get closer as interval / sqrt(count)
+            part.dropCount++;
+            part.dropNext += codelInterval / std::sqrt((double)part.dropCount);
+            return true;
+        }
+    } else if (okToDrop) {
+        // Enter the dropping state; if it was left recently, resume near the
+        // previous drop rate instead of starting over
+        part.dropping = true;
+        int delta = part.dropCount - part.lastDropCount;
+        part.dropCount = (delta > 1 && now - part.dropNext < 16 * codelInterval) ? delta : 1;
+        part.lastDropCount = part.dropCount;
+        part.dropNext = now + codelInterval / std::sqrt((double)part.dropCount);
+        return true;
+    }
+    return false;
+}
+
+void Table::startServiceForRequest(cMessage *req, int k)
+{
+    // Transaction lock ("hold"): taken like a normal request, but no service
+    // runs here; the lock stays until the user's Release
+    bool held = req->hasPar("hold") && req->par("hold").boolValue();
+
+    double serviceTime = held ? 0.0 : drawServiceTime(req);
     
     // Calculate wait time in queue
     if (req->hasPar("arrivalTime")) {
         double arrTime = req->par("arrivalTime").doubleValue();
         double waitTime = simTime().dbl() - arrTime;
         totalWaitingTime += waitTime;
-        emit(waitingTimeSignal, waitTime);
+        if (!leanStats) emit(waitingTimeSignal, waitTime);
+        if (simTime() >= getSimulation()->getWarmupPeriod()) {
+            if (req->getKind() == 0) {
+                readWaitingTime.collect(waitTime);
+                if (!held) readServiceTime.collect(serviceTime);
+            } else {
+                writeWaitingTime.collect(waitTime);
+                if (!held) writeServiceTime.collect(serviceTime);
+            }
+            if (req->hasPar("txnId")) txnLockWait.collect(waitTime);
+            if (leanStats) leanWaitingTime.collect(waitTime);
+            if (recordWaitSketch) waitSketch.add(waitTime);
+        }
     }
 
     // update state before scheduling
     bool isRead = (req->getKind() == 0);
     
     // Track busy time: if was idle (0 readers, no write), now becomes busy
-    bool wasBusy = (activeReaders > 0 || writeActive);
+    Partition& part = partitions[k];
+    bool wasBusy = part.busy();
     
     if (isRead) {
-        activeReaders++;
+        part.activeReaders++;
     } else {
-        writeActive = true;
+        part.writeActive = true;
     }
     
     // If it was idle and now becomes busy, mark start of busy period
     if (!wasBusy) {
-        lastStateChange = simTime();
+        part.busySince = simTime();
+        if (busyPartitions++ == 0) lastStateChange = simTime();
     }
 
+    if (held) {
+        heldLocks[std::make_pair(req->par("userId").longValue(), req->par("txnId").longValue())] = std::make_pair(req, k);
+        sendResponse(req, "Granted");
+        return;
+    }
+
+    // Create a service completion event
+    char buf[64];
+    sprintf(buf, "serviceDone-%s", req->getName());
+    cMessage *done = new cMessage(buf);
+    // attach the original request so we can reply when the service completes
+    done->setContextPointer((void*)req);
+    done->setKind(k);
+
+    // record this event for cleanup
+    serviceEvents.push_back(done);
+
     scheduleAt(simTime() + serviceTime, done);
 
     EV_DEBUG << "Table " << tableId << " started " << (isRead?"READ":"WRITE") << " for user "
              << (req->hasPar("userId") ? req->par("userId").longValue() : -1) << " at " << simTime() << ", serviceTime=" << serviceTime << endl;
 }
 
+double Table::drawServiceTime(cMessage *req)
+{
+    // Replica applies are writes: they draw from the write distribution too
+    const ServiceTime& dist = (req->getKind() == 0) ? readService : writeService;
+    if (!dist.fromRequest())
+        return dist.sample(this, serviceRng);
+    // "request": prefer 'serviceTime' parameter on the request, else default 1.0
+    if (req->hasPar("serviceTime")) return req->par("serviceTime").doubleValue();
+    return 1.0;
+}
+
+void Table::updateTimeIntegrals(Partition& part)
+{
+    // Called just before a partition's queue length, activeReaders or
+    // writeActive change: the current state has held since
+    // lastIntegralUpdate. Time before the warm-up period is not counted.
+    simtime_t from = std::max(part.lastIntegralUpdate, getSimulation()->getWarmupPeriod());
+    if (simTime() > from) {
+        double dt = (simTime() - from).dbl();
+        part.queueLengthIntegral += part.queue.size() * dt;
+        part.activeReadersIntegral += part.activeReaders * dt;
+        if (part.writeActive) part.writerBusyIntegral += dt;
+    }
+    part.lastIntegralUpdate = simTime();
+}
+
+void Table::writeSnapshot()
+{
+    simtime_t busyTime = totalBusyTime;
+    if (busyPartitions > 0) busyTime += simTime() - lastStateChange;
+    snapshots->write(simTime(), getFullPath(), totalServed, totalWaitingTime, busyTime.dbl(), maxQueueLength,
+                     NAN, queuedRequests);
+}
+
 void Table::removeEvent(cMessage *evt)
 {
     auto it = std::find(serviceEvents.begin(), serviceEvents.end(), evt);
@@ -249,23 +689,44 @@ void Table::removeEvent(cMessage *evt)
 
 void Table::finish()
 {
-    // Emit final statistics signals (course-standard method)
-    emit(throughputSignal, totalServed);
+    if (snapshots) {
+        writeSnapshot();
+        snapshots->flush();
+    }
+
+
+    // Emit final statistics signals (course-standard method); in leanStats
+    // mode the same scalars are written directly
+    if (!leanStats) emit(throughputSignal, totalServed);
+    else recordScalar("throughput:last", totalServed);
     
-    // Queue statistics
-    if (queueLengthSamples > 0) {
-        emit(queueLengthSignal, (int)(totalQueueLength / queueLengthSamples));
+    // Time-average queue length, reader concurrency and writer occupancy
+    // over [warmup, end], summed over the partitions (with partitions > 1
+    // writerOccupancy is the mean number of writers in service)
+    double queueLengthIntegral = 0.0, activeReadersIntegral = 0.0, writerBusyIntegral = 0.0;
+    for (Partition& part : partitions) {
+        updateTimeIntegrals(part);
+        queueLengthIntegral += part.queueLengthIntegral;
+        activeReadersIntegral += part.activeReadersIntegral;
+        writerBusyIntegral += part.writerBusyIntegral;
+    }
+    double observed = (simTime() - getSimulation()->getWarmupPeriod()).dbl();
+    if (observed > 0) {
+        recordScalar("table.avgQueueLength", queueLengthIntegral / observed);
+        recordScalar("table.avgActiveReaders", activeReadersIntegral / observed);
+        recordScalar("table.writerOccupancy", writerBusyIntegral / observed);
     }
     
-    // Calculate and emit utilization
+    // Calculate and emit utilization (busy = at least one partition busy)
     simtime_t busyTime = totalBusyTime;
-    if (activeReaders > 0 || writeActive) {
+    if (busyPartitions > 0) {
         busyTime += simTime() - lastStateChange;
     }
     double simDuration = simTime().dbl();
     if (simDuration > 0) {
         double util = busyTime.dbl() / simDuration;
-        emit(utilizationSignal, util);
+        if (!leanStats) emit(utilizationSignal, util);
+        else recordScalar("utilization:last", util);
         recordScalar("table.utilization", util);
     }
     
@@ -277,4 +738,59 @@ void Table::finish()
     if (totalServed > 0) {
         recordScalar("table.avgWaitingTime", totalWaitingTime / totalServed);
     }
+    // Per-partition (and per-replica) statistics, to compare how evenly
+    // sharding and replicas spread a hot table
+    if (partitions.size() > 1) {
+        for (size_t k = 0; k < partitions.size(); k++) {
+            Partition& part = partitions[k];
+            std::string prefix = "table.partition[" + std::to_string(k) + "].";
+            if ((int)k >= numPartitions) {
+                int idx = k - numPartitions;
+                prefix = "table.partition[" + std::to_string(idx / numReplicas) + "].replica["
+                         + std::to_string(idx % numReplicas) + "].";
+            }
+            simtime_t partBusy = part.busyTime;
+            if (part.busy()) partBusy += simTime() - part.busySince;
+            recordScalar((prefix + "served").c_str(), part.served);
+            recordScalar((prefix + "maxQueueLength").c_str(), part.maxQueueLength);
+            if (simDuration > 0)
+                recordScalar((prefix + "utilization").c_str(), partBusy.dbl() / simDuration);
+            if (observed > 0) {
+                recordScalar((prefix + "avgQueueLength").c_str(), part.queueLengthIntegral / observed);
+                recordScalar((prefix + "writerOccupancy").c_str(), part.writerBusyIntegral / observed);
+            }
+        }
+    }
+
+    recordScalar("table.withdrawn", withdrawn);
+    if (admission != ADMIT_ALL)
+        recordScalar("table.rejected", rejected);
+    if (admission == CODEL)
+        recordScalar("table.codelDropped", codelDropped);
+
+    if (numReplicas > 0) {
+        recordScalar("table.replicaWrites", replicaWrites);
+        replicationLag.record(this, "table.replicationLag", true);
+    }
+
+    // Lock wait of transaction requests (held and final), cross-table contention
+    if (txnLockWait.count > 0) {
+        recordScalar("table.txnLocks", txnLockWait.count);
+        txnLockWait.record(this, "table.txnLockWait", true);
+    }
+
+    // Per-operation waits (post warm-up): the max shows starvation under each policy
+    readWaitingTime.record(this, "table.readWaitingTime", true);
+    writeWaitingTime.record(this, "table.writeWaitingTime", true);
+    // Service times actually drawn, to check a distribution against its mean/cv
+    readServiceTime.record(this, "table.readServiceTime", true);
+    writeServiceTime.record(this, "table.writeServiceTime", true);
+    if (recordWaitSketch)
+        waitSketch.record(this, "table.waitingTime");
+    if (leanStats)
+        leanWaitingTime.record(this, "waitingTime", true);
+    if (profileEvents && getIndex() == 0) {
+        profiler->record(this, "Table");
+        profiler->recordFes(this);
+    }
 }
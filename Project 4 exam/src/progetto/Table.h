@@ -2,55 +2,157 @@
 #define __PROGETTO_TABLE_H_
 
 #include <omnetpp.h>
-#include <queue>
+#include <deque>
+#include <map>
+#include <utility>
 #include <vector>
+#include "EventProfiler.h"
+#include "LeanStat.h"
+#include "ServiceTime.h"
+#include "SnapshotWriter.h"
+#include "WaitSketch.h"
 
 using namespace omnetpp;
 
+// One independently locked slice of a table (partitions > 1) or the whole
+// table (partitions = 1): its own request queue, readers/writers state and
+// time-weighted integrals
+struct Partition {
+    // Queue of pending requests (messages received from users); policies
+    // other than fcfs may start a request that is not at the front
+    std::deque<cMessage*> queue;
+    int activeReaders = 0;              // Readers currently being served
+    bool writeActive = false;           // Whether a write is currently being served
+    int writerBypasses = 0;             // boundedBypass: reads that overtook the oldest queued writer
+    bool lastPhaseWrite = false;        // phaseFair: the last request started was a write
+    int nextReplica = 0;                // roundRobin replica selection (primaries only)
+
+    // CoDel state (admissionControl = "codel")
+    simtime_t firstAboveTime;           // When the delay may first count as persistent (0 = below target)
+    simtime_t dropNext;                 // Next drop while dropping
+    int dropCount = 0;
+    int lastDropCount = 0;
+    bool dropping = false;
+    bool dropRetry = false;             // A dequeued request was dropped: schedule the queue again
+
+    long served = 0;
+    int maxQueueLength = 0;
+    simtime_t busySince;                // Start of the current busy period
+    simtime_t busyTime;                 // Busy time accumulated (whole run, like table.utilization)
+
+    // Time-weighted integrals (post warm-up), advanced on every state change
+    simtime_t lastIntegralUpdate;
+    double queueLengthIntegral = 0.0;   // integral of queue length dt
+    double activeReadersIntegral = 0.0; // integral of active readers dt
+    double writerBusyIntegral = 0.0;    // integral of writeActive dt
+
+    bool busy() const { return activeReaders > 0 || writeActive; }
+    int load() const { return queue.size() + activeReaders + (writeActive ? 1 : 0); }
+};
+
 class Table : public cSimpleModule {
 private:
+    enum SchedulingPolicy { FCFS, READER_BATCH, WRITER_PRIORITY, PHASE_FAIR, BOUNDED_BYPASS };
+    enum ReplicaSelection { LEAST_LOADED, ROUND_ROBIN, RANDOM_REPLICA };
+    enum AdmissionControl { ADMIT_ALL, MAX_QUEUE, CODEL };
+
     int tableId;
     int numUsers; // optional, for validation
 
-    // Queue of pending requests (messages received from users)
-    std::queue<cMessage*> requestQueue;
-
-    // Number of active readers currently being served
-    int activeReaders;
-
-    // Whether a write is currently being served
-    bool writeActive;
+    // Lock domains: primaries 0..numPartitions-1, then the readReplicas
+    // copies of each primary (replicaIndex)
+    std::vector<Partition> partitions;
+    int numPartitions;
+    int numReplicas;
+    bool hashPartitions;                // partitionSelection = "hash": by userId, else uniform
+    ReplicaSelection replicaSelection;
+    int selectionRng;                   // RNG of the uniform partition / random replica draws
+    simtime_t replicationDelay;
+    long replicaWrites;                 // Writes applied to replicas (not in totalServed)
+    LeanStat replicationLag;            // Primary commit -> replica apply done (post warm-up)
+    int queuedRequests;                 // Sum of the partition queue lengths
+    int busyPartitions;                 // Partitions with a read or write in service
+    SchedulingPolicy policy;
+    int policyBound;                    // readerBatch: batch size, boundedBypass: overtakes per writer
+    ServiceTime readService;            // Service time distribution by operation
+    ServiceTime writeService;
+    int serviceRng;
+    LeanStat readServiceTime;           // Sampled service times (post warm-up)
+    LeanStat writeServiceTime;
+    AdmissionControl admission;
+    int queueCapacity;                  // maxQueue: per partition
+    simtime_t codelTarget;
+    simtime_t codelInterval;
+    long rejected;                      // Requests answered "Rejected" (maxQueue or CoDel)
+    long codelDropped;
+    long withdrawn;                     // Timed out by their user while still queued
+    // Transaction locks granted and not yet released: (userId, txnId) -> (request, lock index)
+    std::map<std::pair<long, long>, std::pair<cMessage*, int>> heldLocks;
+    LeanStat txnLockWait;               // Wait of transaction lock requests (post warm-up)
 
     // Track scheduled service completion events so they can be canceled/cleaned up
     std::vector<cMessage*> serviceEvents;
 
     // Signals for statistics collection (course-standard method)
-    simsignal_t queueLengthSignal;      // Queue length
     simsignal_t waitingTimeSignal;      // Wait time per request
     simsignal_t throughputSignal;       // Throughput
     simsignal_t utilizationSignal;      // Utilization
     
     // Queue statistics
-    int maxQueueLength;
-    double totalQueueLength;
-    int queueLengthSamples;
+    int maxQueueLength;                 // Of the whole table (all partitions)
     double totalWaitingTime;
+
+    bool recordWaitSketch;
+    WaitSketch waitSketch;              // Post-warm-up waitingTime distribution
+    bool leanStats;                     // Accumulate instead of emitting signals
+    LeanStat leanWaitingTime;
+    LeanStat readWaitingTime;           // Post-warm-up wait by operation, for every policy
+    LeanStat writeWaitingTime;
+
+    // Periodic snapshots (snapshotInterval > 0)
+    cMessage *snapshotTimer;
+    simtime_t snapshotInterval;
+    SnapshotWriter *snapshots;
+
+    // Event profiling (profileEvents = true)
+    bool profileEvents;
+    EventProfiler *profiler;
+    int profileSnapshot;
+    int profileArrival[2];              // by kind: 0 = READ, 1 = WRITE
+    int profileServiceDone[2];
+    int profileWithdraw;
+    int profileRelease;
     
     // Service statistics
     long totalServed;                   // Total requests served
     long totalReads;                    // Total read operations served
     long totalWrites;                   // Total write operations served
-    simtime_t busyTimeStart;            // Start of busy period
-    simtime_t totalBusyTime;            // Total busy time accumulated
+    simtime_t totalBusyTime;            // Time with at least one partition busy
     simtime_t lastStateChange;          // Last time state changed
 
 protected:
     virtual void initialize() override;
     virtual void handleMessage(cMessage *msg) override;
+    virtual void dispatchMessage(cMessage *msg);
     virtual void finish() override;
     virtual void removeEvent(cMessage *evt);
-    virtual void processQueue();
-    virtual void startServiceForRequest(cMessage *req);
+    virtual int selectPartition(cMessage *req);
+    virtual int replicaIndex(int k, int r) const { return numPartitions + k * numReplicas + r; }
+    virtual int selectReplica(int k);
+    virtual void replicateWrite(cMessage *write, int k);
+    virtual void enqueue(cMessage *req, int k);
+    virtual void withdrawRequest(cMessage *withdraw);
+    virtual void completeRequest(cMessage *orig, int k);
+    virtual void releaseLock(cMessage *release);
+    virtual void sendResponse(cMessage *req, const char *name);
+    virtual bool codelShouldDrop(Partition& part, cMessage *req);
+    virtual void processQueue(int k);
+    virtual std::deque<cMessage*>::iterator firstQueued(Partition& part, short kind);
+    virtual void startQueued(int k, std::deque<cMessage*>::iterator it);
+    virtual void startServiceForRequest(cMessage *req, int k);
+    virtual double drawServiceTime(cMessage *req);
+    virtual void updateTimeIntegrals(Partition& part);
+    virtual void writeSnapshot();
 
 public:
     Table();
@@ -0,0 +1,186 @@
+#ifndef __PROGETTO_TRACESOURCE_H_
+#define __PROGETTO_TRACESOURCE_H_
+
+#include <omnetpp.h>
+#include <cctype>
+#include <cmath>
+#include <cstdint>
+#include <cstdlib>
+#include <deque>
+#include <fstream>
+#include <map>
+#include <memory>
+#include <sstream>
+#include <string>
+#include <vector>
+
+using namespace omnetpp;
+
+// One access of a recorded workload. serviceTime < 0 = not in the trace
+struct TraceRecord {
+    double time;
+    int tableId;
+    bool isRead;
+    double serviceTime;
+};
+
+// Streams an access trace for User.traceFile and deals it out to the users:
+// record i goes to shard i % numShards (the user index). The file is read
+// lazily, only as far as the shard asking for its next record needs; records
+// of other shards read on the way wait in their shard's buffer until
+// consumed, so memory stays bounded by the accesses of the near future, not
+// by the trace length. All users of a run share one source per file; sources
+// of a previous run (same process) are dropped when a new run id shows up.
+//
+// Formats (traceFormat, "auto" = "binary" for *.bin, else "csv"):
+//   csv     timestamp,table,op[,serviceTime] per line, op = R/W, read/write
+//           (any case) or 0/1; '#' comments are skipped, and so is the
+//           first line if its timestamp is not a number (header)
+//   binary  little-endian records of double timestamp, int32 table,
+//           int32 op (0 = read), double serviceTime (NaN = none), 24 bytes
+// Timestamps must be non-decreasing; they are shifted so the first record
+// is at time 0 and divided by the time scale (k > 1 replays at k times load).
+class TraceSource {
+private:
+    std::ifstream in;
+    std::string path;
+    bool binary;
+    double timeScale;
+    int numShards;
+    long maxBuffered;                   // read-ahead bound, in records over all shards
+    std::vector<std::deque<TraceRecord>> buffers;
+    long buffered = 0;
+    long recordsRead = 0;
+    long lineNumber = 0;
+    bool firstLine = true;              // csv: only the first non-empty line may be a header
+    double firstTime = NAN;
+    double lastTime = -INFINITY;
+
+    static std::map<std::string, std::unique_ptr<TraceSource>>& sources() {
+        static std::map<std::string, std::unique_ptr<TraceSource>> instances;
+        return instances;
+    }
+
+    static std::string& currentRun() {
+        static std::string runId;
+        return runId;
+    }
+
+    static std::string trim(const std::string& text) {
+        size_t begin = text.find_first_not_of(" \t\r");
+        if (begin == std::string::npos) return "";
+        return text.substr(begin, text.find_last_not_of(" \t\r") - begin + 1);
+    }
+
+    bool readCsv(TraceRecord& rec) {
+        std::string line;
+        while (std::getline(in, line)) {
+            lineNumber++;
+            size_t comment = line.find('#');
+            if (comment != std::string::npos) line.erase(comment);
+            if (line.find_first_not_of(" \t\r") == std::string::npos) continue;
+            bool header = firstLine;
+            firstLine = false;
+
+            std::vector<std::string> fields;
+            std::stringstream ss(line);
+            std::string field;
+            while (std::getline(ss, field, ','))
+                fields.push_back(trim(field));
+            char *end;
+            rec.time = std::strtod(fields[0].c_str(), &end);
+            if (end == fields[0].c_str()) {
+                if (header) continue;               // header line
+                throw cRuntimeError("%s:%ld: bad timestamp '%s'", path.c_str(), lineNumber, fields[0].c_str());
+            }
+            if (fields.size() < 3)
+                throw cRuntimeError("%s:%ld: expected timestamp,table,op[,serviceTime]", path.c_str(), lineNumber);
+            rec.tableId = std::atoi(fields[1].c_str());
+            std::string op = fields[2];
+            for (char& c : op) c = std::tolower((unsigned char)c);     // same set as trace_tools.py
+            if (op == "r" || op == "read" || op == "0") rec.isRead = true;
+            else if (op == "w" || op == "write" || op == "1") rec.isRead = false;
+            else throw cRuntimeError("%s:%ld: unknown op '%s'", path.c_str(), lineNumber, fields[2].c_str());
+            rec.serviceTime = (fields.size() > 3 && !fields[3].empty()) ? std::strtod(fields[3].c_str(), nullptr) : -1.0;
+            return true;
+        }
+        return false;
+    }
+
+    bool readBinary(TraceRecord& rec) {
+        double time, serviceTime;
+        int32_t table, op;
+        if (!in.read(reinterpret_cast<char*>(&time), sizeof(time))) return false;
+        in.read(reinterpret_cast<char*>(&table), sizeof(table));
+        in.read(reinterpret_cast<char*>(&op), sizeof(op));
+        if (!in.read(reinterpret_cast<char*>(&serviceTime), sizeof(serviceTime)))
+            throw cRuntimeError("%s: truncated record %ld", path.c_str(), recordsRead);
+        rec.time = time;
+        rec.tableId = table;
+        rec.isRead = (op == 0);
+        rec.serviceTime = std::isnan(serviceTime) ? -1.0 : serviceTime;
+        return true;
+    }
+
+    // Reads the next record into its shard buffer; false at end of trace
+    bool readNext() {
+        TraceRecord rec;
+        if (!(binary ? readBinary(rec) : readCsv(rec))) return false;
+        if (rec.time < lastTime)
+            throw cRuntimeError("%s: timestamps must be non-decreasing (record %ld: %g after %g)",
+                                path.c_str(), recordsRead, rec.time, lastTime);
+        lastTime = rec.time;
+        if (std::isnan(firstTime)) firstTime = rec.time;
+        rec.time = (rec.time - firstTime) / timeScale;
+        buffers[recordsRead % numShards].push_back(rec);
+        recordsRead++;
+        if (++buffered > maxBuffered)
+            throw cRuntimeError("%s: more than %ld records buffered ahead (traceReadAhead); "
+                                "a shard is far behind the others", path.c_str(), maxBuffered);
+        return true;
+    }
+
+public:
+    TraceSource(const std::string& file, const std::string& format, double scale, int shards, long readAhead)
+        : path(file), timeScale(scale), numShards(shards), maxBuffered(readAhead), buffers(shards) {
+        if (format == "auto")
+            binary = file.size() >= 4 && file.compare(file.size() - 4, 4, ".bin") == 0;
+        else if (format == "binary" || format == "csv")
+            binary = (format == "binary");
+        else
+            throw cRuntimeError("Unknown trace format: %s", format.c_str());
+        if (timeScale <= 0)
+            throw cRuntimeError("traceTimeScale must be > 0, got %g", timeScale);
+        in.open(file, binary ? std::ios::in | std::ios::binary : std::ios::in);
+        if (!in)
+            throw cRuntimeError("Cannot open trace file '%s'", file.c_str());
+    }
+
+    static TraceSource *get(cComponent *owner, const std::string& file, const std::string& format,
+                            double scale, int shards, long readAhead) {
+        std::string runId = owner->getEnvir()->getConfigEx()->getVariable(CFGVAR_RUNID);
+        if (runId != currentRun()) {
+            sources().clear();
+            currentRun() = runId;
+        }
+        auto& source = sources()[file];
+        if (!source)
+            source.reset(new TraceSource(file, format, scale, shards, readAhead));
+        return source.get();
+    }
+
+    // Next record of a shard, false when the trace has none left for it
+    bool next(int shard, TraceRecord& rec) {
+        std::deque<TraceRecord>& buffer = buffers[shard];
+        while (buffer.empty())
+            if (!readNext()) return false;
+        rec = buffer.front();
+        buffer.pop_front();
+        buffered--;
+        return true;
+    }
+
+    long records() const { return recordsRead; }
+};
+
+#endif // __PROGETTO_TRACESOURCE_H_
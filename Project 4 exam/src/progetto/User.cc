@@ -1,7 +1,24 @@
+#include <algorithm>
+#include <set>
 #include "User.h"
 
 Define_Module(User);
 
+User::User()
+{
+    accessTimer = nullptr;
+    snapshotTimer = nullptr;
+    trace = nullptr;
+}
+
+User::~User()
+{
+    cancelAndDelete(accessTimer);
+    cancelAndDelete(snapshotTimer);
+    for (auto& pending : pendingTimeouts) cancelAndDelete(pending.second);
+    pendingTimeouts.clear();
+}
+
 void User::initialize()
 {
     // Read parameters
@@ -11,12 +28,55 @@ void User::initialize()
     numTables = par("numTables");
     tableDistribution = par("tableDistribution").stringValue();
     serviceTime = par("serviceTime");
+    interarrivalRng = par("interarrivalRng");
+    opTypeRng = par("opTypeRng");
+    tableRng = par("tableRng");
+    recordWaitSketch = par("recordWaitSketch");
+    double sketchAccuracy = par("sketchRelativeAccuracy");
+    int sketchMaxBins = par("sketchMaxBins");
+    if (sketchAccuracy <= 0 || sketchAccuracy >= 1)
+        error("sketchRelativeAccuracy must be in (0, 1), got %g", sketchAccuracy);
+    if (sketchMaxBins < 2)
+        error("sketchMaxBins must be >= 2, got %d", sketchMaxBins);
+    waitSketch.configure(sketchAccuracy, sketchMaxBins);
+    leanStats = par("leanStats");
+    warmupEnd = getSimulation()->getWarmupPeriod();
     
     // Initialize variables
     totalAccesses = 0;
     totalReads = 0;
     totalWrites = 0;
     totalWaitTime = 0.0;
+    totalResponses = 0;
+    requestTimeout = par("requestTimeout");
+    nextRequestId = 0;
+    requestsTimedOut = 0;
+    requestsRejected = 0;
+    lateResponses = 0;
+    maxOutstanding = par("maxOutstanding");
+    if (maxOutstanding < 0)
+        error("maxOutstanding must be >= 0, got %d", maxOutstanding);
+    thinking = maxOutstanding;
+    transactionProbability = par("transactionProbability");
+    transactionSize = par("transactionSize");
+    if (transactionProbability > 0 && (transactionSize < 1 || transactionSize > numTables))
+        error("transactionSize must be in [1, numTables], got %d", transactionSize);
+    nextTxnId = 0;
+    rateProfile.configure(this, lambda);
+    if (!rateProfile.isConstant() && maxOutstanding > 0)
+        error("rateProfile applies to the open mode only (maxOutstanding = 0)");
+    trace = nullptr;
+    std::string traceFile = par("traceFile").stdstringValue();
+    if (!traceFile.empty()) {
+        if (maxOutstanding > 0 || transactionProbability > 0 || !rateProfile.isConstant())
+            error("traceFile cannot be combined with maxOutstanding, transactionProbability or rateProfile");
+        trace = TraceSource::get(this, traceFile, par("traceFormat").stdstringValue(), par("traceTimeScale"),
+                                 getVectorSize(), par("traceReadAhead").intValue());
+    }
+    transactionsCommitted = 0;
+    transactionsAborted = 0;
+    leanReadAccesses = 0;
+    leanWriteAccesses = 0;
     
     // Register signals (course-standard method - signal mechanism)
     waitTimeSignal = registerSignal("waitTime");
@@ -27,6 +87,26 @@ void User::initialize()
     // Create first access event
     accessTimer = new cMessage("AccessTimer");
     scheduleNextAccess();
+
+    snapshotTimer = nullptr;
+    snapshots = nullptr;
+    snapshotInterval = par("snapshotInterval");
+    if (snapshotInterval > SIMTIME_ZERO) {
+        snapshots = SnapshotWriter::get(this, par("snapshotFile").stdstringValue());
+        snapshotTimer = new cMessage("SnapshotTimer");
+        scheduleAt(simTime() + snapshotInterval, snapshotTimer);
+    }
+
+    profileEvents = par("profileEvents");
+    profiler = nullptr;
+    if (profileEvents) {
+        profiler = &EventProfiler::instance(this);
+        profileAccessTimer = profiler->category("User", "accessTimer");
+        profileSnapshot = profiler->category("User", "snapshot");
+        profileResponse[0] = profiler->category("User", "response.read");
+        profileResponse[1] = profiler->category("User", "response.write");
+        profileTimeout = profiler->category("User", "requestTimeout");
+    }
     
     EV_INFO << "User " << userId << " initialized with lambda=" << lambda 
             << ", readProb=" << readProbability 
@@ -36,22 +116,44 @@ void User::initialize()
 
 void User::handleMessage(cMessage *msg)
 {
-    if (msg == accessTimer) {
+    if (!profileEvents) {
+        dispatchMessage(msg);
+        return;
+    }
+    int category = (msg == accessTimer) ? profileAccessTimer
+                 : (msg == snapshotTimer) ? profileSnapshot
+                 : msg->isSelfMessage() ? profileTimeout
+                 : profileResponse[msg->getKind() == 0 ? 0 : 1];
+    EventProfiler::Scope scope(*profiler, category);
+    dispatchMessage(msg);
+}
+
+void User::dispatchMessage(cMessage *msg)
+{
+    if (msg == accessTimer && transactionProbability > 0 && uniform(0, 1, opTypeRng) < transactionProbability) {
+        // This access is a multi-table transaction
+        startTransaction();
+        if (maxOutstanding > 0) thinking--;
+        scheduleNextAccess();
+    } else if (msg == accessTimer) {
         // Time for a new access
         
         // Select table according to specified distribution
-        int tableId = selectTableId();
+        int tableId = trace ? nextRecord.tableId : selectTableId();
         
         // Decide if read or write operation
-        bool isRead = isReadOperation();
+        bool isRead = trace ? nextRecord.isRead : isReadOperation();
+        double duration = (trace && nextRecord.serviceTime >= 0) ? nextRecord.serviceTime : serviceTime;
         
         // Record operation type
         if (isRead) {
             totalReads++;
-            emit(readAccessSignal, 1);
+            if (!leanStats) emit(readAccessSignal, 1);
+            else if (simTime() >= warmupEnd) leanReadAccesses++;
         } else {
             totalWrites++;
-            emit(writeAccessSignal, 1);
+            if (!leanStats) emit(writeAccessSignal, 1);
+            else if (simTime() >= warmupEnd) leanWriteAccesses++;
         }
         
         totalAccesses++;
@@ -60,11 +162,18 @@ void User::handleMessage(cMessage *msg)
                  << " (" << (isRead ? "READ" : "WRITE") << ") at time " << simTime() << endl;
         
         // Send request to table
-        sendAccessRequest(tableId, isRead);
+        sendAccessRequest(tableId, isRead, duration);
         
-        // Schedule next access
+        // Schedule next access (closed loop: this terminal waits for the response)
+        if (maxOutstanding > 0) thinking--;
         scheduleNextAccess();
         
+    } else if (msg == snapshotTimer) {
+        writeSnapshot();
+        scheduleAt(simTime() + snapshotInterval, snapshotTimer);
+    } else if (msg->isSelfMessage()) {
+        // Deadline of an outstanding request
+        handleRequestTimeout(msg);
     } else {
         // Response message from table
         processTableResponse(msg);
@@ -73,10 +182,37 @@ void User::handleMessage(cMessage *msg)
 
 void User::scheduleNextAccess()
 {
+    if (trace) {
+        // Trace replay: the next record of this user's shard, nothing after the last
+        if (!trace->next(getIndex(), nextRecord)) return;
+        if (nextRecord.tableId < 0 || nextRecord.tableId >= numTables)
+            error("Trace access to table %d, but numTables = %d", nextRecord.tableId, numTables);
+        scheduleAt(std::max(simTime(), SimTime(nextRecord.time)), accessTimer);
+        return;
+    }
+    if (maxOutstanding > 0) {
+        // Closed loop: the thinking terminals have independent Exp(lambda)
+        // think times, so (memoryless) the first of them ends after
+        // Exp(thinking * lambda); redrawn whenever a terminal starts thinking
+        cancelEvent(accessTimer);
+        if (thinking > 0)
+            scheduleAt(simTime() + exponential(1.0 / (thinking * lambda), interarrivalRng), accessTimer);
+        return;
+    }
+
     // Generate inter-arrival time according to exponential distribution
-    double delay = getExponentialDelay();
+    // (time-varying rate: the profile gives the next arrival directly)
+    double delay;
+    if (rateProfile.isConstant()) {
+        delay = getExponentialDelay();
+    } else {
+        double next = rateProfile.nextArrival(this, simTime().dbl(), interarrivalRng);
+        if (std::isinf(next)) return;   // rate 0 for the rest of the run
+        delay = next - simTime().dbl();
+    }
     
-    emit(accessIntervalSignal, delay);
+    if (!leanStats) emit(accessIntervalSignal, delay);
+    else if (simTime() >= warmupEnd) leanAccessInterval.collect(delay);
     scheduleAt(simTime() + delay, accessTimer);
 }
 
@@ -96,7 +232,7 @@ int User::selectTableUniform()
 {
     // Uniform distribution: each table has equal probability
     // Returns a value from 0 to numTables-1
-    return intuniform(0, numTables - 1);
+    return intuniform(0, numTables - 1, tableRng);
 }
 
 int User::selectTableLognormal()
@@ -108,7 +244,7 @@ int User::selectTableLognormal()
     double s = par("lognormalS");
     // Generate variable with lognormal distribution
     // lognormal(m, s) where m is mean of natural logarithm
-    double logNormalValue = lognormal(m, s);
+    double logNormalValue = lognormal(m, s, tableRng);
     
     // Map lognormal value to interval [0, numTables-1]
     // Use modulo to ensure result is always in valid range
@@ -123,10 +259,10 @@ bool User::isReadOperation()
 {
     // Generate random number between 0 and 1
     // If less than readProbability, it's a read
-    return uniform(0, 1) < readProbability;
+    return uniform(0, 1, opTypeRng) < readProbability;
 }
 
-void User::sendAccessRequest(int tableId, bool isRead)
+cMessage *User::createRequest(bool isRead, double duration)
 {
     // Create new message for request
     cMessage *request = new cMessage();
@@ -150,8 +286,25 @@ void User::sendAccessRequest(int tableId, bool isRead)
     request->addPar(arrivalTimePar);
 
     cMsgPar *serviceTimePar = new cMsgPar("serviceTime");
-    serviceTimePar->setDoubleValue(serviceTime);
+    serviceTimePar->setDoubleValue(duration);
     request->addPar(serviceTimePar);
+    return request;
+}
+
+void User::sendAccessRequest(int tableId, bool isRead, double duration)
+{
+    cMessage *request = createRequest(isRead, duration);
+
+    if (requestTimeout > SIMTIME_ZERO) {
+        // The table echoes requestId, so the response can be matched to its deadline
+        long requestId = nextRequestId++;
+        request->addPar("requestId").setLongValue(requestId);
+        cMessage *timer = new cMessage("RequestTimeout", request->getKind());
+        timer->addPar("requestId").setLongValue(requestId);
+        timer->addPar("tableId").setLongValue(tableId);
+        pendingTimeouts[requestId] = timer;
+        scheduleAt(simTime() + requestTimeout, timer);
+    }
 
     // Send message to appropriate table gate
     send(request, "tableOut", tableId);
@@ -159,13 +312,47 @@ void User::sendAccessRequest(int tableId, bool isRead)
 
 void User::processTableResponse(cMessage *msg)
 {
+    if (strcmp(msg->getName(), "Withdrawn") == 0) {
+        // Acknowledges a withdrawal: already counted as timed out
+        delete msg;
+        return;
+    }
+    if (msg->hasPar("txnId")) {
+        processTransactionResponse(msg);
+        return;
+    }
+    if (msg->hasPar("requestId")) {
+        auto it = pendingTimeouts.find(msg->par("requestId").longValue());
+        if (it == pendingTimeouts.end()) {
+            // Deadline already expired while the request was in service
+            lateResponses++;
+            delete msg;
+            return;
+        }
+        cancelAndDelete(it->second);
+        pendingTimeouts.erase(it);
+    }
+    if (strcmp(msg->getName(), "Rejected") == 0) {
+        // Refused by the table's admission control: no wait time to record
+        requestsRejected++;
+        requestCompleted(simTime().dbl() - msg->par("arrivalTime").doubleValue());
+        delete msg;
+        return;
+    }
+
     // Response message from table
     double arrivalTime = msg->par("arrivalTime").doubleValue();
     double completionTime = simTime().dbl();
     double waitTime = completionTime - arrivalTime;
 
     totalWaitTime += waitTime;
-    emit(waitTimeSignal, waitTime);
+    totalResponses++;
+    if (!leanStats) emit(waitTimeSignal, waitTime);
+    if (simTime() >= warmupEnd) {
+        if (leanStats) leanWaitTime.collect(waitTime);
+        if (recordWaitSketch) waitSketch.add(waitTime);
+    }
+    requestCompleted(waitTime);
 
     bool isRead = (msg->getKind() == 0);  // 0 = READ, 1 = WRITE
 
@@ -177,23 +364,135 @@ void User::processTableResponse(cMessage *msg)
     delete msg;
 }
 
+void User::startTransaction()
+{
+    // Distinct tables from the usual distribution, locked in ascending order
+    std::set<int> tables;
+    while ((int)tables.size() < transactionSize)
+        tables.insert(selectTableId());
+
+    long txnId = nextTxnId++;
+    Transaction& txn = transactions[txnId];
+    txn.startTime = simTime();
+    for (int tableId : tables)
+        txn.locks.push_back(std::make_pair(tableId, isReadOperation()));
+
+    EV_DEBUG << "User " << userId << " starts transaction " << txnId << " on "
+             << transactionSize << " tables at time " << simTime() << endl;
+    sendLockRequest(txnId, txn);
+}
+
+void User::sendLockRequest(long txnId, Transaction& txn)
+{
+    // Every lock but the last is only acquired ("hold"): the table grants it
+    // and keeps it until Release. The last one is a normal request whose
+    // service runs while all the other locks are held
+    const std::pair<int, bool>& lock = txn.locks[txn.granted];
+    cMessage *request = createRequest(lock.second, serviceTime);
+    request->addPar("txnId").setLongValue(txnId);
+    request->addPar("hold").setBoolValue(txn.granted + 1 < txn.locks.size());
+    send(request, "tableOut", lock.first);
+}
+
+void User::processTransactionResponse(cMessage *msg)
+{
+    long txnId = msg->par("txnId").longValue();
+    auto it = transactions.find(txnId);
+    if (it == transactions.end()) {
+        delete msg;
+        return;
+    }
+    Transaction& txn = it->second;
+    if (strcmp(msg->getName(), "Granted") == 0) {
+        txn.granted++;
+        sendLockRequest(txnId, txn);
+    } else {
+        // "Response": the last table finished the service; "Rejected": the
+        // table refused a lock, so the transaction gives up what it holds
+        endTransaction(txnId, strcmp(msg->getName(), "Response") == 0);
+    }
+    delete msg;
+}
+
+void User::endTransaction(long txnId, bool committed)
+{
+    Transaction& txn = transactions[txnId];
+    for (size_t i = 0; i < txn.granted; i++) {
+        cMessage *release = new cMessage("Release", 3);
+        release->addPar("userId").setLongValue(userId);
+        release->addPar("txnId").setLongValue(txnId);
+        send(release, "tableOut", txn.locks[i].first);
+    }
+
+    double latency = (simTime() - txn.startTime).dbl();
+    if (committed) {
+        transactionsCommitted++;
+        if (simTime() >= warmupEnd) txnLatency.collect(latency);
+    } else {
+        transactionsAborted++;
+    }
+    transactions.erase(txnId);
+    requestCompleted(latency);
+}
+
+void User::handleRequestTimeout(cMessage *timer)
+{
+    // Give up on the request and ask the table to drop it if still queued;
+    // a response that arrives anyway is counted in lateResponses
+    long requestId = timer->par("requestId").longValue();
+    int tableId = timer->par("tableId").longValue();
+    pendingTimeouts.erase(requestId);
+    requestsTimedOut++;
+
+    cMessage *withdraw = new cMessage("Withdraw", 2);
+    withdraw->addPar("userId").setLongValue(userId);
+    withdraw->addPar("requestId").setLongValue(requestId);
+    send(withdraw, "tableOut", tableId);
+    delete timer;
+    requestCompleted(requestTimeout.dbl());
+}
+
+void User::requestCompleted(double responseTime)
+{
+    // Closed loop: the terminal of this request starts thinking again. Every
+    // cycle end counts (also timeouts and rejections), so that the interactive
+    // response time law N = X * (R + Z) holds over the post-warm-up window
+    if (maxOutstanding == 0) return;
+    if (simTime() >= warmupEnd) cycleResponseTime.collect(responseTime);
+    thinking++;
+    scheduleNextAccess();
+}
+
 double User::getExponentialDelay()
 {
     // Generate exponential inter-arrival with rate lambda
     // If lambda = 1/T, then generated value is distributed as Exp(lambda)
-    return exponential(1.0 / lambda);
+    return exponential(1.0 / lambda, interarrivalRng);
+}
+
+void User::writeSnapshot()
+{
+    snapshots->write(simTime(), getFullPath(), totalResponses, totalWaitTime, NAN, NAN, totalAccesses, NAN);
 }
 
 void User::finish()
 {
-    // Final statistics
-    double avgWaitTime = (totalAccesses > 0) ? (totalWaitTime / totalAccesses) : 0.0;
+    if (snapshots) {
+        writeSnapshot();
+        snapshots->flush();
+    }
+
+
+    // Final statistics: the wait is averaged over answered requests only
+    // (timed-out, rejected and in-flight ones have no wait sample)
+    double avgWaitTime = (totalResponses > 0) ? (totalWaitTime / totalResponses) : 0.0;
     double accessesPerSecond = totalAccesses / simTime().dbl();
     
     EV_INFO << endl << "=== Statistics for User " << userId << " ===" << endl;
     EV_INFO << "Total accesses: " << totalAccesses << endl;
     EV_INFO << "Total reads: " << totalReads << endl;
     EV_INFO << "Total writes: " << totalWrites << endl;
+    EV_INFO << "Total responses: " << totalResponses << endl;
     EV_INFO << "Average wait time: " << avgWaitTime << " seconds" << endl;
     EV_INFO << "Accesses per second: " << accessesPerSecond << endl;
     EV_INFO << "========================================" << endl;
@@ -202,6 +501,39 @@ void User::finish()
     recordScalar("totalAccesses", totalAccesses);
     recordScalar("totalReads", totalReads);
     recordScalar("totalWrites", totalWrites);
+    recordScalar("totalResponses", totalResponses);
     recordScalar("averageWaitTime", avgWaitTime);
     recordScalar("accessesPerSecond", accessesPerSecond);
+    recordScalar("requestsTimedOut", requestsTimedOut);
+    recordScalar("requestsRejected", requestsRejected);
+    if (requestTimeout > SIMTIME_ZERO)
+        recordScalar("lateResponses", lateResponses);
+    if (transactionProbability > 0) {
+        recordScalar("transactionsCommitted", transactionsCommitted);
+        recordScalar("transactionsAborted", transactionsAborted);
+        txnLatency.record(this, "txnLatency", true);
+    }
+    if (trace && getIndex() == 0)
+        recordScalar("traceRecordsRead", trace->records());
+    if (maxOutstanding > 0) {
+        // Inputs of the interactive law check (interactive_law.py)
+        double observed = (simTime() - warmupEnd).dbl();
+        recordScalar("maxOutstanding", maxOutstanding);
+        recordScalar("thinkTime", 1.0 / lambda);
+        if (observed > 0)
+            recordScalar("closedThroughput", cycleResponseTime.count / observed);
+        cycleResponseTime.record(this, "closedResponseTime", false);
+    }
+    if (recordWaitSketch)
+        waitSketch.record(this, "waitTime");
+    if (profileEvents && getIndex() == 0)
+        profiler->record(this, "User");
+
+    // Same names the @statistic recorders produce in the signal-based mode
+    if (leanStats) {
+        leanWaitTime.record(this, "waitTime", true);
+        recordScalar("readAccess:count", leanReadAccesses);
+        recordScalar("writeAccess:count", leanWriteAccesses);
+        leanAccessInterval.record(this, "accessInterval", false);
+    }
 }
@@ -2,7 +2,16 @@
 #define __PROGETTO_USER_H_
 
 #include <omnetpp.h>
+#include <map>
 #include <queue>
+#include <utility>
+#include <vector>
+#include "EventProfiler.h"
+#include "LeanStat.h"
+#include "RateProfile.h"
+#include "SnapshotWriter.h"
+#include "TraceSource.h"
+#include "WaitSketch.h"
 
 using namespace omnetpp;
 
@@ -14,6 +23,14 @@ struct DatabaseOperation {
     double startTime;      // Time when operation actually started
 };
 
+// A multi-table transaction in progress: locks[i] = (tableId, isRead),
+// sorted by tableId and acquired in that order
+struct Transaction {
+    std::vector<std::pair<int, bool>> locks;
+    size_t granted = 0;                 // locks[0..granted-1] are held
+    simtime_t startTime;
+};
+
 class User : public cSimpleModule {
 private:
     // Simulation parameters
@@ -23,15 +40,59 @@ private:
     int numTables;                      // Number of tables (M)
     std::string tableDistribution;      // "uniform" or "lognormal"
     double serviceTime;                 // Fixed operation duration (S)
+    int interarrivalRng;                // RNG index for inter-arrival times
+    int opTypeRng;                      // RNG index for read/write choice
+    int tableRng;                       // RNG index for table choice
     
     // Statistics variables
     long totalAccesses;                 // Total completed operations
     long totalReads;                    // Total read operations
     long totalWrites;                   // Total write operations
     double totalWaitTime;               // Total waiting time
+    long totalResponses;                // Completed operations (responses received)
+    simtime_t requestTimeout;           // 0 = requests never time out
+    long nextRequestId;
+    std::map<long, cMessage*> pendingTimeouts;  // requestId -> deadline timer
+    long requestsTimedOut;
+    long requestsRejected;              // Refused by table admission control
+    long lateResponses;                 // Served after their deadline (already in service)
+    int maxOutstanding;                 // Closed loop terminals (0 = open source)
+    int thinking;                       // Closed loop: terminals in think time
+    LeanStat cycleResponseTime;         // Closed loop: send -> completion, post warm-up
+    double transactionProbability;
+    int transactionSize;
+    long nextTxnId;
+    std::map<long, Transaction> transactions;   // txnId -> transaction in progress
+    long transactionsCommitted;
+    long transactionsAborted;           // A lock request was rejected by the table
+    LeanStat txnLatency;                // First lock request -> service done, post warm-up
+    TraceSource *trace;                 // Trace replay (nullptr = synthetic workload)
+    RateProfile rateProfile;            // lambda(t) of the open mode
+    TraceRecord nextRecord;             // Trace replay: access scheduled on accessTimer
+    bool recordWaitSketch;              // Keep a quantile sketch of waitTime
+    WaitSketch waitSketch;              // Post-warm-up waitTime distribution
+    simtime_t warmupEnd;                // Samples before this are not collected
+
+    // leanStats mode: accumulators replacing the signals below
+    bool leanStats;
+    long leanReadAccesses;
+    long leanWriteAccesses;
+    LeanStat leanWaitTime;
+    LeanStat leanAccessInterval;
     
     // Messages
     cMessage *accessTimer;              // Timer for next access
+    cMessage *snapshotTimer;            // Periodic snapshot (nullptr if disabled)
+    simtime_t snapshotInterval;
+    SnapshotWriter *snapshots;
+
+    // Event profiling (profileEvents = true)
+    bool profileEvents;
+    EventProfiler *profiler;
+    int profileAccessTimer;
+    int profileSnapshot;
+    int profileResponse[2];             // by kind: 0 = READ, 1 = WRITE
+    int profileTimeout;
     
     // Signals for statistics collection (course-standard method)
     simsignal_t waitTimeSignal;         // Signal for wait time
@@ -43,6 +104,11 @@ protected:
     virtual void initialize() override;
     virtual void handleMessage(cMessage *msg) override;
     virtual void finish() override;
+    virtual void dispatchMessage(cMessage *msg);
+
+public:
+    User();
+    virtual ~User();
     
 private:
     // Helper methods
@@ -51,9 +117,17 @@ private:
     int selectTableUniform();           // Uniform distribution
     int selectTableLognormal();         // Lognormal distribution
     bool isReadOperation();             // Decide if read operation (probability p)
-    void sendAccessRequest(int tableId, bool isRead);
+    cMessage *createRequest(bool isRead, double duration);
+    void sendAccessRequest(int tableId, bool isRead, double duration);
+    void startTransaction();
+    void sendLockRequest(long txnId, Transaction& txn);
+    void processTransactionResponse(cMessage *msg);
+    void endTransaction(long txnId, bool committed);
     void processTableResponse(cMessage *msg);
+    void handleRequestTimeout(cMessage *timer);
+    void requestCompleted(double responseTime);
     double getExponentialDelay();       // Generate exponential random variable
+    void writeSnapshot();
 };
 
 #endif
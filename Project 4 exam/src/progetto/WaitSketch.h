@@ -0,0 +1,107 @@
+#ifndef __PROGETTO_WAITSKETCH_H_
+#define __PROGETTO_WAITSKETCH_H_
+
+#include <omnetpp.h>
+#include <cmath>
+#include <iterator>
+#include <limits>
+#include <map>
+#include <sstream>
+#include <string>
+
+using namespace omnetpp;
+
+// Streaming quantile sketch (DDSketch) for wait times.
+// Values fall into log-spaced buckets [gamma^(i-1), gamma^i), so every quantile
+// is returned with relative error <= relativeAccuracy in memory bounded by
+// maxBins. Sketches with the same gamma merge by adding bucket counts, which
+// is how the Python side (simulations/sketch.py) combines users, tables and
+// replications.
+class WaitSketch {
+private:
+    double gamma = 1.0;
+    double logGamma = 0.0;
+    int maxBins = 0;
+    long count = 0;
+    long zeroCount = 0;                 // values below MIN_VALUE (e.g. zero wait)
+    std::map<int, long> bins;           // bucket index -> count
+
+    static constexpr double MIN_VALUE = 1e-9;
+
+    double bucketValue(int index) const {
+        // Midpoint (in relative terms) of the bucket
+        return 2.0 * std::pow(gamma, index) / (gamma + 1.0);
+    }
+
+public:
+    void configure(double relativeAccuracy, int maxBins) {
+        gamma = (1.0 + relativeAccuracy) / (1.0 - relativeAccuracy);
+        logGamma = std::log(gamma);
+        this->maxBins = maxBins;
+        count = 0;
+        zeroCount = 0;
+        bins.clear();
+    }
+
+    void add(double value) {
+        count++;
+        if (value < MIN_VALUE) {
+            zeroCount++;
+            return;
+        }
+        bins[(int)std::ceil(std::log(value) / logGamma)]++;
+        // Over budget: fold the lowest bucket into the next one, keeping the
+        // upper tail (the interesting part for waits) exact
+        if ((int)bins.size() > maxBins) {
+            auto lowest = bins.begin();
+            std::next(lowest)->second += lowest->second;
+            bins.erase(lowest);
+        }
+    }
+
+    long getCount() const { return count; }
+    double getGamma() const { return gamma; }
+
+    double quantile(double q) const {
+        if (count == 0) return std::numeric_limits<double>::quiet_NaN();   // no samples, as LeanStat
+        double rank = q * (count - 1);
+        if (zeroCount > rank) return 0.0;
+        long seen = zeroCount;
+        for (const auto& bin : bins) {
+            seen += bin.second;
+            if (seen > rank) return bucketValue(bin.first);
+        }
+        return bucketValue(bins.rbegin()->first);
+    }
+
+    // "<index>:<count>,..." in ascending index order
+    std::string binsString() const {
+        std::ostringstream out;
+        bool first = true;
+        for (const auto& bin : bins) {
+            if (!first) out << ",";
+            out << bin.first << ":" << bin.second;
+            first = false;
+        }
+        return out.str();
+    }
+
+    // Records <name>.p50/.p95/.p99 and <name>.sketch (value = count, buckets
+    // in the scalar attributes)
+    void record(cComponent *owner, const std::string& name) const {
+        owner->recordScalar((name + ".p50").c_str(), quantile(0.50));
+        owner->recordScalar((name + ".p95").c_str(), quantile(0.95));
+        owner->recordScalar((name + ".p99").c_str(), quantile(0.99));
+
+        opp_string_map attributes;
+        std::ostringstream g;
+        g.precision(17);
+        g << gamma;
+        attributes["gamma"] = g.str();
+        attributes["zeroCount"] = std::to_string(zeroCount);
+        attributes["bins"] = binsString();
+        owner->getEnvir()->recordScalar(owner, (name + ".sketch").c_str(), (double)count, &attributes);
+    }
+};
+
+#endif // __PROGETTO_WAITSKETCH_H_
@@ -2,6 +2,7 @@
 """Generate Chapter 4 plots."""
 
 from collections import defaultdict
+from itertools import combinations
 from pathlib import Path
 
 import matplotlib.pyplot as plt
@@ -62,65 +63,113 @@ def load_runs_from_results(results_dir):
     return runs
 
 
+def build_run_table(runs, columns):
+    """Column-oriented view of the run list: {column: np.ndarray}."""
+    return {name: np.array([run[name] for run in runs]) for name in columns}
+
+
+def effect_columns(codes, n_levels):
+    """Sum-to-zero (effect) coding of one factor: n_levels - 1 columns, last level = -1."""
+    cols = np.zeros((len(codes), n_levels - 1))
+    for j in range(n_levels - 1):
+        cols[codes == j, j] = 1.0
+    cols[codes == n_levels - 1, :] = -1.0
+    return cols
+
+
+def anova_effects(table, factors, response, max_order=None):
+    """
+    Sequential (Type I) ANOVA decomposition for any number of factors.
+
+    Every factor is effect-coded and interaction columns are the row-wise
+    products of their factors' columns. Terms enter a least-squares fit in
+    hierarchical order (main effects, then 2-way, ...), and the SS of a term
+    is the drop in residual SS when it is added. The term SS and the residual
+    of the final model therefore add up to SS_total exactly, also for
+    unbalanced cells; for a balanced design they equal the classical
+    decomposition (and do not depend on the order).
+
+    Returns ({term: SS}, ss_within, ss_total), terms being tuples of factor
+    names up to max_order (default: all interactions); ss_within is the SS
+    of the runs around their full-factorial cell mean.
+    """
+    y = np.asarray(table[response], dtype=float)
+    k = len(factors)
+    max_order = k if max_order is None else max_order
+
+    codes, sizes, coded = [], [], []
+    for name in factors:
+        levels, inverse = np.unique(table[name], return_inverse=True)
+        codes.append(inverse)
+        sizes.append(len(levels))
+        coded.append(effect_columns(inverse, len(levels)))
+
+    def residual_ss(design):
+        beta = np.linalg.lstsq(design, y, rcond=None)[0]
+        r = y - design @ beta
+        return float(np.dot(r, r))
+
+    design = np.ones((len(y), 1))
+    previous = residual_ss(design)
+    ss_total = previous
+    effects = {}
+    for order in range(1, max_order + 1):
+        for term in combinations(range(k), order):
+            columns = coded[term[0]]
+            for i in term[1:]:
+                columns = (columns[:, :, None] * coded[i][:, None, :]).reshape(len(y), -1)
+            design = np.hstack([design, columns])
+            current = residual_ss(design)
+            effects[tuple(factors[i] for i in term)] = max(0.0, previous - current)
+            previous = current
+
+    cell = np.ravel_multi_index(codes, sizes)
+    counts = np.bincount(cell, minlength=int(np.prod(sizes)))
+    sums = np.bincount(cell, weights=y, minlength=int(np.prod(sizes)))
+    ss_within = float(np.sum((y - (sums / np.maximum(counts, 1))[cell]) ** 2))
+    return effects, ss_within, ss_total
+
+
+def is_balanced(table, factors):
+    """True when every full-factorial cell holds the same number of runs."""
+    codes, sizes = [], []
+    for name in factors:
+        levels, inverse = np.unique(table[name], return_inverse=True)
+        codes.append(inverse)
+        sizes.append(len(levels))
+    counts = np.bincount(np.ravel_multi_index(codes, sizes), minlength=int(np.prod(sizes)))
+    return counts.min() == counts.max()
+
+
 def compute_factor_effects_waiting_time(runs):
-    """Balanced 3-factor ANOVA decomposition for log10(wait_ms+1)."""
-    levels_n = sorted({r["N"] for r in runs})
-    levels_p = sorted({r["p"] for r in runs})
-    levels_d = sorted({r["dist"] for r in runs})
-    a, b, c = len(levels_n), len(levels_p), len(levels_d)
+    """
+    3-factor ANOVA decomposition (main effects and 2-way terms) for log10(wait_ms+1).
 
-    cells = defaultdict(list)
-    for run in runs:
-        cells[(run["N"], run["p"], run["dist"])].append(np.log10(run["wait_ms"] + 1.0))
-
-    reps = min(len(v) for v in cells.values())
-    y = np.array([np.log10(r["wait_ms"] + 1.0) for r in runs], dtype=float)
-    mu = float(np.mean(y))
-
-    mean_n = {n: np.mean([np.log10(r["wait_ms"] + 1.0) for r in runs if r["N"] == n]) for n in levels_n}
-    mean_p = {p: np.mean([np.log10(r["wait_ms"] + 1.0) for r in runs if r["p"] == p]) for p in levels_p}
-    mean_d = {d: np.mean([np.log10(r["wait_ms"] + 1.0) for r in runs if r["dist"] == d]) for d in levels_d}
-    mean_np = {(n, p): np.mean([np.log10(r["wait_ms"] + 1.0) for r in runs if r["N"] == n and r["p"] == p]) for n in levels_n for p in levels_p}
-    mean_nd = {(n, d): np.mean([np.log10(r["wait_ms"] + 1.0) for r in runs if r["N"] == n and r["dist"] == d]) for n in levels_n for d in levels_d}
-    mean_pd = {(p, d): np.mean([np.log10(r["wait_ms"] + 1.0) for r in runs if r["p"] == p and r["dist"] == d]) for p in levels_p for d in levels_d}
-    mean_npd = {(n, p, d): np.mean(cells[(n, p, d)]) for n in levels_n for p in levels_p for d in levels_d}
-
-    ss_total = np.sum((y - mu) ** 2)
-    ss_n = b * c * reps * sum((mean_n[n] - mu) ** 2 for n in levels_n)
-    ss_p = a * c * reps * sum((mean_p[p] - mu) ** 2 for p in levels_p)
-    ss_d = a * b * reps * sum((mean_d[d] - mu) ** 2 for d in levels_d)
-    ss_np = c * reps * sum((mean_np[(n, p)] - mean_n[n] - mean_p[p] + mu) ** 2 for n in levels_n for p in levels_p)
-    ss_nd = b * reps * sum((mean_nd[(n, d)] - mean_n[n] - mean_d[d] + mu) ** 2 for n in levels_n for d in levels_d)
-    ss_pd = a * reps * sum((mean_pd[(p, d)] - mean_p[p] - mean_d[d] + mu) ** 2 for p in levels_p for d in levels_d)
-    ss_npd = reps * sum(
-        (
-            mean_npd[(n, p, d)]
-            - mean_np[(n, p)]
-            - mean_nd[(n, d)]
-            - mean_pd[(p, d)]
-            + mean_n[n]
-            + mean_p[p]
-            + mean_d[d]
-            - mu
-        )
-        ** 2
-        for n in levels_n
-        for p in levels_p
-        for d in levels_d
-    )
-    ss_error = sum(np.sum((np.array(vals) - np.mean(vals)) ** 2) for vals in cells.values())
-
-    effects = {
-        "N": ss_n,
-        "p": ss_p,
-        "Distribution": ss_d,
-        "N×p": ss_np,
-        "N×Dist": ss_nd,
-        "p×Dist": ss_pd,
-        "Residual": ss_npd + ss_error,
+    Returns ({term: % of SS_total}, summary), summary holding ss_total,
+    ss_within, ss_three_way and whether the cells are balanced.
+    """
+    table = build_run_table(runs, ["N", "p", "dist", "wait_ms"])
+    table["log_wait"] = np.log10(table["wait_ms"] + 1.0)
+
+    factors = ["N", "p", "dist"]
+    ss, ss_within, ss_total = anova_effects(table, factors, "log_wait", max_order=2)
+
+    main_labels = {"N": "N", "p": "p", "dist": "Distribution"}
+    short_labels = {"N": "N", "p": "p", "dist": "Dist"}
+    effects = {}
+    for term, value in ss.items():
+        label = main_labels[term[0]] if len(term) == 1 else "×".join(short_labels[f] for f in term)
+        effects[label] = value
+    # Residual of the sequential fit: three-way interaction plus within-cell error
+    effects["Residual"] = ss_total - sum(ss.values())
+    summary = {
+        "ss_total": ss_total,
+        "ss_within": ss_within,
+        "ss_three_way": effects["Residual"] - ss_within,
+        "balanced": is_balanced(table, factors),
     }
 
-    return {name: max(0.0, value) * 100.0 / ss_total for name, value in effects.items()}
+    return {name: max(0.0, value) * 100.0 / ss_total for name, value in effects.items()}, summary
 
 
 def build_residual_dataset(runs):
@@ -341,7 +390,11 @@ if __name__ == "__main__":
     all_runs = load_runs_from_results(RESULTS_DIR)
     print(f"Loaded {len(all_runs)} runs.")
 
-    effects = compute_factor_effects_waiting_time(all_runs)
+    effects, anova = compute_factor_effects_waiting_time(all_runs)
+    if not anova["balanced"]:
+        print("Warning: unbalanced (N, p, dist) cells, sequential SS in the order N, p, Dist, 2-way terms")
+    print(f"ANOVA log10(wait): SS_total={anova['ss_total']:.4f}, within-cell SS={anova['ss_within']:.4f}, "
+          f"3-way SS={anova['ss_three_way']:.4f}")
     print("Factor effects (%):")
     for name, value in effects.items():
         print(f"  {name:12s} {value:10.6f}")
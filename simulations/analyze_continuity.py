@@ -3,8 +3,14 @@
 ANALISI CONTINUITY TEST - Sezione 5.2
 Confronta Configuration A (N=100) vs Configuration B (N=105)
 Verifica che gli intervalli di confidenza al 95% si sovrappongono
+
+Con --paired (run prodotti da continuity_test.py --paired, common random
+numbers) calcola invece l'intervallo di confidenza sulle differenze B - A
+replica per replica: una metrica passa se l'intero intervallo sta dentro
+±tolerance% della media di A.
 """
 
+import argparse
 import sys
 from pathlib import Path
 from scipy import stats
@@ -49,6 +55,110 @@ def parse_sca_files(results_dir, config_name):
     
     return metrics
 
+def parse_sca_runs(results_dir, config_name):
+    """Aggrega le metriche per replica: {repetition: {metric: value}}"""
+    runs = {}
+    for sca_file in sorted(results_dir.rglob(f"*{config_name}*.sca")):
+        repetition = None
+        served, waits, utils = 0.0, [], []
+        try:
+            with open(sca_file, 'r') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 3 and parts[0] == 'attr' and parts[1] == 'repetition':
+                        repetition = int(parts[2])
+                    elif len(parts) >= 4 and parts[0] == 'scalar':
+                        metric, value = parts[2], float(parts[3])
+                        if metric == 'throughput:last':
+                            served += value
+                        elif metric == 'waitingTime:mean':
+                            waits.append(value)
+                        elif metric == 'table.utilization':
+                            utils.append(value)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠ Errore lettura {sca_file}: {e}")
+            continue
+        if repetition is None:
+            continue
+        runs[repetition] = {
+            'throughput': served,
+            'waitingTime': float(np.mean(waits)) if waits else 0.0,
+            'utilization': float(np.mean(utils)) if utils else 0.0,
+        }
+    return runs
+
+def paired_difference_ci(runs_a, runs_b, metric_key, confidence=0.95):
+    """CI della media delle differenze B - A sulle repliche accoppiate"""
+    reps = sorted(set(runs_a) & set(runs_b))
+    if len(reps) < 2:
+        return None
+    a = np.array([runs_a[r][metric_key] for r in reps])
+    b = np.array([runs_b[r][metric_key] for r in reps])
+    d = b - a
+    n = len(d)
+    t = stats.t.ppf((1 + confidence) / 2, n - 1)
+    half_paired = t * np.std(d, ddof=1) / np.sqrt(n)
+    # Stessi dati trattati come campioni indipendenti (Welch), per confronto
+    half_indep = t * np.sqrt(np.var(a, ddof=1) / n + np.var(b, ddof=1) / n)
+    return {
+        'n': n,
+        'mean_a': float(np.mean(a)),
+        'mean_diff': float(np.mean(d)),
+        'half_width': float(half_paired),
+        'half_width_indep': float(half_indep),
+    }
+
+def analyze_paired(results_dir, tolerance=5.0):
+    """
+    Continuity test in modalità paired (common random numbers): passa se per
+    ogni metrica il CI di B - A è contenuto in ±tolerance% della media di A
+    """
+    runs_a = parse_sca_runs(results_dir, "ContinuityA")
+    runs_b = parse_sca_runs(results_dir, "ContinuityB")
+    if not runs_a or not runs_b:
+        print("\n✗ Errore nel parsing dei risultati")
+        return False
+
+    print(f"\n{'='*70}")
+    print("PAIRED DIFFERENCES B - A (95% Confidence Intervals)")
+    print(f"{'='*70}\n")
+
+    results_summary = []
+    for metric_key in ['throughput', 'waitingTime', 'utilization']:
+        res = paired_difference_ci(runs_a, runs_b, metric_key)
+        if res is None:
+            print(f"  ⚠ {metric_key}: meno di 2 repliche accoppiate")
+            continue
+        lower = res['mean_diff'] - res['half_width']
+        upper = res['mean_diff'] + res['half_width']
+        pct_change = abs(res['mean_diff']) / res['mean_a'] * 100 if res['mean_a'] else 0.0
+        # Repliche necessarie ai campioni indipendenti per la stessa semi-ampiezza
+        ratio = (res['half_width_indep'] / res['half_width']) ** 2 if res['half_width'] > 0 else None
+
+        print(f"{metric_key.upper()}")
+        print("-" * 70)
+        print(f"  Paired replications: {res['n']}")
+        print(f"  Mean difference: {res['mean_diff']:.6f}  95% CI: [{lower:.6f}, {upper:.6f}]")
+        print(f"  Half-width paired: {res['half_width']:.6f}  independent: {res['half_width_indep']:.6f}")
+        if ratio is not None:
+            print(f"  Variance reduction: ~{ratio:.1f}x fewer replications for the same CI")
+        print(f"  Percentage change: {pct_change:.2f}%")
+        band = tolerance / 100.0 * abs(res['mean_a'])
+        ok = -band <= lower and upper <= band
+        if ok:
+            print(f"  ✓ CONTINUITY PRESERVED: CI dentro ±{band:.6f} (±{tolerance:g}%)\n")
+        else:
+            print(f"  ✗ CONTINUITY VIOLATED: CI esce da ±{band:.6f} (±{tolerance:g}%)\n")
+        results_summary.append((metric_key, ok))
+
+    passed = sum(1 for _, result in results_summary if result)
+    print(f"Total: {passed}/{len(results_summary)} metrics show continuity")
+    if not results_summary or passed < len(results_summary):
+        print("\n✗ CONTINUITY TEST FAILED")
+        return False
+    print("\n✓ CONTINUITY TEST PASSED")
+    return True
+
 def calculate_ci_95(values):
     """Calcola media e intervallo di confidenza 95%"""
     if not values or len(values) < 2:
@@ -151,6 +261,12 @@ def plot_continuity_results(results_dir, metrics_a, metrics_b):
 
 def main():
     """Analizza il continuity test"""
+    parser = argparse.ArgumentParser(description="Analisi continuity test A vs B")
+    parser.add_argument("--paired", action="store_true",
+                        help="CI sulle differenze accoppiate (run con common random numbers)")
+    parser.add_argument("--tolerance", type=float, default=5.0,
+                        help="variazione relativa ammessa in %% (paired: banda per il CI di B - A)")
+    args = parser.parse_args()
     
     print(f"\n{'='*70}")
     print(" "*15 + "CONTINUITY TEST ANALYSIS - SEZIONE 5.2")
@@ -163,6 +279,9 @@ def main():
         print(f"  Eseguire prima: python3 continuity_test.py")
         return False
     
+    if args.paired:
+        return analyze_paired(results_dir, args.tolerance)
+    
     # Parsa risultati
     metrics_a = parse_sca_files(results_dir, "ContinuityA")
     metrics_b = parse_sca_files(results_dir, "ContinuityB")
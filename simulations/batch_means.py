@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Batch-means steady-state estimation from a single long run.
+
+Instead of repeating the warm-up in every replication, one long warmed-up run
+is split into batches. The batch size is chosen automatically: start from
+many small batches and double the size until the lag-1 autocorrelation of the
+batch means is no longer significant. The resulting CI is a t-interval on the
+batch means, directly comparable to calculate_ci in plot_results.py.
+
+The .vec file is reduced in one streaming pass into fine time bins (sum and
+count per bin), so batches are formed without holding the observations.
+
+Usage:
+    python3 batch_means.py results/UniformSingleRun-*.vec [--metric waitTime]
+"""
+
+import argparse
+import glob
+import sys
+
+import numpy as np
+from scipy import stats
+
+from vec_stream import iter_vec_records, read_vec_header, parse_duration
+
+MIN_BATCHES = 10        # never go below this many batches
+FINE_BINS = 1024        # initial number of time bins per run
+
+
+def lag1_autocorrelation(x):
+    x = np.asarray(x, dtype=float)
+    if len(x) < 3:
+        return 0.0
+    d = x - x.mean()
+    denom = np.dot(d, d)
+    return float(np.dot(d[:-1], d[1:]) / denom) if denom > 0 else 0.0
+
+
+def batch_means(sums, counts=None, confidence=0.95, alpha=0.05, min_batches=MIN_BATCHES):
+    """
+    Batch-means CI from fine-grained bins.
+
+    sums/counts are per-bin totals in time order (counts=None means one
+    observation per bin, i.e. a plain sequence of values). Adjacent bins are
+    merged pairwise until the batch means pass the lag-1 independence test
+    or only min_batches batches are left.
+    """
+    sums = np.asarray(sums, dtype=float)
+    counts = np.ones_like(sums) if counts is None else np.asarray(counts, dtype=float)
+    batch_size = 1
+
+    while True:
+        nonempty = counts > 0
+        means = sums[nonempty] / counts[nonempty]
+        k = len(means)
+        r1 = lag1_autocorrelation(means)
+        # Under independence r1 ~ N(0, 1/k)
+        uncorrelated = r1 <= stats.norm.ppf(1 - alpha) / np.sqrt(k) if k >= 3 else False
+        if uncorrelated or len(sums) // 2 < min_batches:
+            break
+        even = len(sums) - len(sums) % 2
+        sums = sums[:even].reshape(-1, 2).sum(axis=1)
+        counts = counts[:even].reshape(-1, 2).sum(axis=1)
+        batch_size *= 2
+
+    if k < 2:
+        return {'mean': float(means.mean()) if k else 0.0, 'half_width': 0.0,
+                'num_batches': k, 'batch_size': batch_size, 'lag1': r1, 'uncorrelated': False}
+
+    mean = float(means.mean())
+    h = float(stats.sem(means) * stats.t.ppf((1 + confidence) / 2, k - 1))
+    return {'mean': mean, 'half_width': h, 'num_batches': k,
+            'batch_size': batch_size, 'lag1': r1, 'uncorrelated': bool(uncorrelated)}
+
+
+def batch_means_ci(values, confidence=0.95):
+    """Same (mean, half-width) shape as calculate_ci, from one long sequence"""
+    res = batch_means(values, confidence=confidence)
+    return res['mean'], res['half_width']
+
+
+def time_binned_series(vec_file, metric='waitTime', num_bins=FINE_BINS, start=None, end=None):
+    """
+    Stream a .vec file into num_bins equal time bins over [start, end).
+    Defaults: start = warmup-period, end = sim-time-limit from the run header.
+    """
+    header = read_vec_header(vec_file)
+    if start is None:
+        start = parse_duration(header['config'].get('warmup-period', '0s'))
+    if end is None:
+        limit = header['config'].get('sim-time-limit')
+        if limit is None:
+            end = max((t for _, _, t, _ in iter_vec_records(vec_file, metric)), default=start)
+        else:
+            end = parse_duration(limit)
+
+    sums = np.zeros(num_bins)
+    counts = np.zeros(num_bins)
+    width = (end - start) / num_bins if end > start else 1.0
+    for _, _, t, v in iter_vec_records(vec_file, metric):
+        idx = int((t - start) / width)
+        if 0 <= idx < num_bins:
+            sums[idx] += v
+            counts[idx] += 1
+    return sums, counts, header
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-means CI from single long runs")
+    parser.add_argument('vec_files', nargs='+')
+    parser.add_argument('--metric', default='waitTime')
+    parser.add_argument('--bins', type=int, default=FINE_BINS)
+    args = parser.parse_args()
+
+    files = sorted(f for pattern in args.vec_files for f in glob.glob(pattern))
+    if not files:
+        print("Nessun file .vec trovato")
+        return 1
+
+    print(f"{'Run':<45} {'mean':>12} {'± 95% CI':>12} {'batches':>8} {'size':>6} {'lag1':>7}")
+    print("-" * 96)
+    for vec_file in files:
+        sums, counts, header = time_binned_series(vec_file, args.metric, args.bins)
+        res = batch_means(sums, counts)
+        label = header['attr'].get('configname', vec_file)
+        itervars = header['attr'].get('iterationvars', '')
+        flag = "" if res['uncorrelated'] else "  ⚠ batches still correlated"
+        print(f"{(label + ' ' + itervars)[:45]:<45} {res['mean']:>12.6f} {res['half_width']:>12.6f} "
+              f"{res['num_batches']:>8} {res['batch_size']:>6} {res['lag1']:>7.3f}{flag}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Analysis-pipeline benchmark on synthetic results (synthetic_results.py).
+
+Times each loader/aggregator on generated fixtures and reports wall time
+(median of repeats) and peak Python memory (tracemalloc):
+  - plot_results.parse_sca_file                  (every .sca of the fixture)
+  - plot_consistency.parse_consistency_file      (every .sca of the fixture)
+  - analyze_warmup.parse_vec_file                (one large .vec)
+  - generate_chapter4_plots.load_runs_from_results
+  - generate_chapter4_plots.compute_factor_effects_waiting_time
+
+Results can be stored as a JSON baseline (benchmarks/analysis_baseline.json)
+and compared later, like benchmark_simulator.py.
+
+Usage:
+    python3 benchmark_analysis.py [--size small|medium|large] [--save] [--tolerance 0.2]
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR.parent / "documentation"))
+
+from synthetic_results import generate, write_vec                      # noqa: E402
+from plot_results import parse_sca_file                                 # noqa: E402
+from plot_consistency import parse_consistency_file                     # noqa: E402
+from analyze_warmup import parse_vec_file                               # noqa: E402
+from generate_chapter4_plots import (load_runs_from_results,            # noqa: E402
+                                     compute_factor_effects_waiting_time)
+
+BASELINE_FILE = BASE_DIR / "benchmarks" / "analysis_baseline.json"
+
+# size: (users, tables, reps, users in the .vec file)
+SIZES = {
+    'small': ([100, 500], 20, 3, 50),
+    'medium': ([100, 500, 1000, 2000], 20, 5, 500),
+    'large': ([100, 500, 1000, 1500, 2000, 2500, 3000, 4000, 5000], 20, 10, 2500),
+}
+TOLERANCE = 0.20
+
+
+def measure(func, repeats):
+    """(median wall seconds, peak traced MB) of func()"""
+    walls = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        walls.append(time.perf_counter() - start)
+    # Memory in a separate pass: tracemalloc slows allocation-heavy code down
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(walls), peak / 1e6
+
+
+def build_fixtures(tmp, size):
+    users, tables, reps, vec_users = SIZES[size]
+    sca_files = [p for p in generate(tmp, users=users, tables=tables, reps=reps) if p.suffix == '.sca']
+    vec_file = tmp / "warmup.vec"
+    import numpy as np
+    write_vec(vec_file, 'Uniform', vec_users, tables, 0.5, 0, 0, np.random.default_rng(1), sim_time=4000.0)
+    return sca_files, vec_file
+
+
+def run_benchmarks(size, repeats):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sca_files, vec_file = build_fixtures(tmp, size)
+        fixture_mb = (sum(p.stat().st_size for p in sca_files) + vec_file.stat().st_size) / 1e6
+        print(f"Fixture '{size}': {len(sca_files)} .sca + 1 .vec, {fixture_mb:.1f} MB\n")
+
+        runs = load_runs_from_results(tmp)
+        cases = {
+            'parse_sca_file': lambda: [parse_sca_file(str(p)) for p in sca_files],
+            'parse_consistency_file': lambda: [parse_consistency_file(str(p)) for p in sca_files],
+            'parse_vec_file': lambda: parse_vec_file(str(vec_file), 'waitTime'),
+            'load_runs_from_results': lambda: load_runs_from_results(tmp),
+            'compute_factor_effects_waiting_time': lambda: compute_factor_effects_waiting_time(runs),
+        }
+        results = {}
+        print(f"{'Case':<38} {'wall [s]':>10} {'peak MB':>10}")
+        print("-" * 60)
+        for name, func in cases.items():
+            wall, peak = measure(func, repeats)
+            results[name] = {'wall_s': wall, 'peak_mb': peak}
+            print(f"{name:<38} {wall:>10.4f} {peak:>10.1f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the .sca/.vec loaders and aggregators")
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--save', action='store_true', help="store the results as baseline for this size")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.size, args.repeats)
+
+    baselines = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    if args.save:
+        baselines[args.size] = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'host': platform.node(),
+            'python': platform.python_version(),
+            'cases': results,
+        }
+        BASELINE_FILE.parent.mkdir(exist_ok=True)
+        BASELINE_FILE.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"\n✓ Baseline '{args.size}' salvata: {BASELINE_FILE}")
+        return 0
+
+    baseline = baselines.get(args.size)
+    if not baseline:
+        print("\n(nessuna baseline per questa dimensione: --save per registrarla)")
+        return 0
+
+    print(f"\n{'Case':<38} {'wall Δ':>9} {'mem Δ':>9}")
+    print("-" * 60)
+    regressions = 0
+    for name, cur in results.items():
+        base = baseline['cases'].get(name)
+        if not base:
+            continue
+        d_wall = (cur['wall_s'] - base['wall_s']) / base['wall_s'] if base['wall_s'] > 0 else 0.0
+        d_mem = (cur['peak_mb'] - base['peak_mb']) / base['peak_mb'] if base['peak_mb'] > 0 else 0.0
+        flag = ""
+        if d_wall > args.tolerance or d_mem > args.tolerance:
+            flag = "  ✗ regressione"
+            regressions += 1
+        elif d_wall < -args.tolerance:
+            flag = "  ✓ più veloce"
+        print(f"{name:<38} {d_wall:>+8.1%} {d_mem:>+8.1%}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: signal-based statistics vs leanStats mode (events/s).
+
+The same workload is run with the default signal/@statistic recording and
+with **.leanStats = true + **.statistic-recording = false, where User and
+Table only update in-module accumulators and write scalars at finish().
+Each point is repeated and the median wall time is used.
+
+Usage:
+    python3 benchmark_lean_stats.py [--users 500 2500] [--sim-time 2000] [--repeats 3]
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+MODES = {
+    'signals': "",
+    'lean': "**.leanStats = true\n**.statistic-recording = false\n",
+}
+
+
+def write_config(path, n_users, sim_time, mode_options, result_dir):
+    path.write_text(f"""[General]
+network = progetto.DatabaseNetwork
+sim-time-limit = {sim_time}s
+warmup-period = {sim_time / 10:g}s
+seed-set = 1
+result-dir = {result_dir}
+cmdenv-express-mode = true
+cmdenv-performance-display = false
+**.vector-recording = false
+
+*.numUsers = {n_users}
+*.numTables = 20
+*.user[*].lambda = 0.05
+*.user[*].serviceTime = 0.1s
+*.user[*].readProbability = 0.5
+*.user[*].tableDistribution = "uniform"
+{mode_options}""")
+
+
+def run_once(executable, ned_path, config_path, timeout):
+    """(events, wall seconds) of one run, events parsed from the Cmdenv summary"""
+    cmd = [str(executable), "-u", "Cmdenv", "-n", ned_path, str(config_path)]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-500:])
+    events = re.findall(r'event #(\d+)', result.stdout)
+    return (int(events[-1]) if events else 0), wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="events/s: signal-based statistics vs leanStats")
+    parser.add_argument('--users', type=int, nargs='+', default=[500, 2500])
+    parser.add_argument('--sim-time', type=float, default=2000)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--timeout', type=int, default=1800)
+    args = parser.parse_args()
+
+    base_dir = Path(__file__).resolve().parent
+    executable = base_dir.parent / "out/clang-release/src/exam"
+    ned_path = str(base_dir.parent / "src") + ":" + str(base_dir)
+    if not executable.exists():
+        print(f"✗ ERRORE: Eseguibile non trovato: {executable}")
+        print("  Eseguire: cd ../src && make MODE=release")
+        return 1
+
+    print(f"{'N':>6} {'mode':<8} {'events':>12} {'wall [s]':>10} {'events/s':>12} {'speedup':>8}")
+    print("-" * 62)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for n_users in args.users:
+            rates = {}
+            for mode, options in MODES.items():
+                config_path = tmp / f"bench_{mode}_{n_users}.ini"
+                write_config(config_path, n_users, args.sim_time, options, tmp / "results")
+                runs = [run_once(executable, ned_path, config_path, args.timeout) for _ in range(args.repeats)]
+                events = runs[0][0]
+                wall = statistics.median(w for _, w in runs)
+                rates[mode] = events / wall if wall > 0 else 0.0
+                speedup = rates[mode] / rates['signals'] if rates.get('signals') else 1.0
+                print(f"{n_users:>6} {mode:<8} {events:>12} {wall:>10.2f} {rates[mode]:>12.0f} {speedup:>7.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Simulator throughput benchmark with stored JSON baselines.
+
+Runs the exam binary over a fixed matrix of (N, M, p, distribution)
+workloads with fixed seeds and short time limits and measures, per workload:
+  - events/s and simsec/s (startup excluded)
+  - startup time (network setup, measured with a near-zero time limit)
+  - peak RSS (ru_maxrss of the child via os.wait4)
+
+Baselines live in benchmarks/baseline.json together with the sha256 of the
+simulation sources (src/progetto/*.cc, *.h, *.ned). When the sources differ
+from the baseline, every workload is compared and regressions beyond the
+tolerance are flagged (exit code 1).
+
+Usage:
+    python3 benchmark_simulator.py                # compare with the baseline
+    python3 benchmark_simulator.py --save         # (re)write the baseline
+    python3 benchmark_simulator.py --force        # compare even if sources are unchanged
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).resolve().parent / "benchmarks"
+BASELINE_FILE = BENCHMARK_DIR / "baseline.json"
+
+# name: (N, M, p, distribution)
+WORKLOADS = {
+    'uniform_N100_M20_p50': (100, 20, 0.5, 'uniform'),
+    'uniform_N1000_M20_p50': (1000, 20, 0.5, 'uniform'),
+    'uniform_N2500_M20_p80': (2500, 20, 0.8, 'uniform'),
+    'lognormal_N2500_M20_p30': (2500, 20, 0.3, 'lognormal'),
+    'lognormal_N1000_M5_p50': (1000, 5, 0.5, 'lognormal'),
+}
+SIM_TIME = 1000.0         # seconds of simulated time per run
+STARTUP_SIM_TIME = 1e-6   # "empty" run used to measure setup cost
+SEED_SET = 1
+TOLERANCE = 0.10          # relative slowdown / memory growth flagged as regression
+
+
+def source_hashes(src_dir):
+    """sha256 of every simulation source file (Table.cc, User.cc, headers, NED)"""
+    hashes = {}
+    for path in sorted(Path(src_dir).iterdir()):
+        if path.suffix in ('.cc', '.h', '.ned'):
+            hashes[path.name] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return hashes
+
+
+def write_config(path, workload, sim_time, result_dir):
+    n, m, p, dist = workload
+    lognormal = "*.user[*].lognormalM = 1.5\n*.user[*].lognormalS = 1.0\n" if dist == 'lognormal' else ""
+    path.write_text(f"""[General]
+network = progetto.DatabaseNetwork
+sim-time-limit = {sim_time}s
+warmup-period = 0s
+seed-set = {SEED_SET}
+result-dir = {result_dir}
+cmdenv-express-mode = true
+cmdenv-performance-display = false
+**.vector-recording = false
+
+*.numUsers = {n}
+*.numTables = {m}
+*.user[*].lambda = 0.05
+*.user[*].serviceTime = 0.1s
+*.user[*].readProbability = {p}
+*.user[*].tableDistribution = "{dist}"
+{lognormal}""")
+
+
+def run_binary(executable, ned_path, config_path, timeout):
+    """
+    Run once; returns dict(events, wall, peak_rss_mb). The child is reaped
+    with os.wait4 to get its own peak RSS; output goes to a file so a full
+    pipe can never stall it.
+    """
+    with tempfile.TemporaryFile(mode='w+') as out:
+        start = time.perf_counter()
+        proc = subprocess.Popen([str(executable), "-u", "Cmdenv", "-n", ned_path, str(config_path)],
+                                stdout=out, stderr=subprocess.STDOUT)
+        killer = threading.Timer(timeout, proc.kill)
+        killer.start()
+        try:
+            _, status, usage = os.wait4(proc.pid, 0)
+        finally:
+            killer.cancel()
+        wall = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        output = out.read()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{config_path.name} failed (exit {proc.returncode}):\n{output[-500:]}")
+    events = re.findall(r'event #(\d+)', output)
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    rss = usage.ru_maxrss / (1024.0 if sys.platform != 'darwin' else 1024.0 ** 2)
+    return {'events': int(events[-1]) if events else 0, 'wall': wall, 'peak_rss_mb': rss}
+
+
+def benchmark_workload(executable, ned_path, workload, tmp, repeats, timeout):
+    """Median metrics over repeats; startup from a near-zero time-limit run"""
+    config = tmp / "bench.ini"
+    write_config(config, workload, STARTUP_SIM_TIME, tmp / "results")
+    startup = statistics.median(run_binary(executable, ned_path, config, timeout)['wall'] for _ in range(repeats))
+
+    write_config(config, workload, SIM_TIME, tmp / "results")
+    runs = [run_binary(executable, ned_path, config, timeout) for _ in range(repeats)]
+    wall = statistics.median(r['wall'] for r in runs)
+    run_time = max(wall - startup, 1e-9)
+    events = runs[0]['events']              # fixed seeds: identical in every repeat
+    return {
+        'events': events,
+        'wall_s': wall,
+        'startup_s': startup,
+        'events_per_s': events / run_time,
+        'simsec_per_s': SIM_TIME / run_time,
+        'peak_rss_mb': max(r['peak_rss_mb'] for r in runs),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """List of (workload, metric, baseline, current, relative change) regressions"""
+    regressions = []
+    # Higher is better for rates, lower is better for time and memory
+    checks = {'events_per_s': -1, 'simsec_per_s': -1, 'startup_s': 1, 'peak_rss_mb': 1}
+    for name, metrics in current.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, direction in checks.items():
+            if base.get(metric, 0) <= 0:
+                continue
+            change = (metrics[metric] - base[metric]) / base[metric]
+            if change * direction > tolerance:
+                regressions.append((name, metric, base[metric], metrics[metric], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="exam throughput benchmark with JSON baselines")
+    parser.add_argument('--save', action='store_true', help="write the results as the new baseline")
+    parser.add_argument('--force', action='store_true', help="compare even if the sources are unchanged")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--timeout', type=int, default=1800)
+    parser.add_argument('--workloads', nargs='+', choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    args = parser.parse_args()
+
+    base_dir = Path(__file__).resolve().parent
+    executable = base_dir.parent / "out/clang-release/src/exam"
+    src_dir = base_dir.parent / "src" / "progetto"
+    ned_path = str(base_dir.parent / "src") + ":" + str(base_dir)
+    if not executable.exists():
+        print(f"✗ ERRORE: Eseguibile non trovato: {executable}")
+        print("  Eseguire: cd ../src && make MODE=release")
+        return 1
+
+    hashes = source_hashes(src_dir)
+    baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else None
+    if baseline and not args.save and not args.force:
+        changed = sorted(f for f in set(hashes) | set(baseline['sources'])
+                         if hashes.get(f) != baseline['sources'].get(f))
+        if not changed:
+            print("✓ Sorgenti invariati rispetto alla baseline, benchmark non necessario (--force per eseguirlo)")
+            return 0
+        print(f"Sorgenti modificati: {', '.join(changed)}")
+
+    print(f"{'Workload':<26} {'events/s':>12} {'simsec/s':>10} {'startup':>9} {'RSS MB':>8}")
+    print("-" * 70)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.workloads:
+            results[name] = benchmark_workload(executable, ned_path, WORKLOADS[name], Path(tmp),
+                                               args.repeats, args.timeout)
+            r = results[name]
+            print(f"{name:<26} {r['events_per_s']:>12.0f} {r['simsec_per_s']:>10.1f} "
+                  f"{r['startup_s']:>8.2f}s {r['peak_rss_mb']:>8.1f}")
+
+    if args.save or baseline is None:
+        BENCHMARK_DIR.mkdir(exist_ok=True)
+        BASELINE_FILE.write_text(json.dumps({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'host': platform.node(),
+            'sim_time': SIM_TIME,
+            'seed_set': SEED_SET,
+            'sources': hashes,
+            'workloads': results,
+        }, indent=2, sort_keys=True) + "\n")
+        print(f"\n✓ Baseline salvata: {BASELINE_FILE}")
+        return 0
+
+    if baseline.get('host') != platform.node():
+        print(f"\n⚠ Baseline registrata su '{baseline.get('host')}', confronto indicativo")
+    regressions = compare(results, baseline['workloads'], args.tolerance)
+    if not regressions:
+        print(f"\n✓ Nessuna regressione oltre il {args.tolerance:.0%}")
+        return 0
+    print(f"\n✗ {len(regressions)} regressioni oltre il {args.tolerance:.0%}:")
+    for name, metric, base, cur, change in regressions:
+        print(f"  {name:<26} {metric:<14} {base:>12.2f} → {cur:>12.2f} ({change:+.1%})")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
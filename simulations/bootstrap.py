@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Batched bootstrap confidence intervals for arbitrary statistics.
+
+All configurations are resampled at once: samples are packed into a NaN-padded
+matrix (configs x max_samples) and every bootstrap replicate is a gather with
+an index matrix, so B resamples of C configs cost a handful of NumPy
+operations instead of B*C Python loops. Percentile and BCa intervals are
+supported; BCa uses a chunked jackknife for the acceleration.
+
+Statistics receive (x, n): x of shape (..., max_samples) with NaN padding
+(anywhere in the row) and n the number of valid samples per row. Built-ins:
+mean, median, p90, p95, p99, max, min.
+
+Usage:
+    python3 bootstrap.py [results_dir] [--resamples 2000] [--method bca]
+"""
+
+import argparse
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+from scipy import stats
+
+DEFAULT_RESAMPLES = 2000
+CHUNK_ELEMENTS = 4_000_000      # max floats materialized per resampling chunk
+
+
+def _sorted_quantile(x, n, q):
+    """Linear-interpolated quantile q of the first n values of each sorted row"""
+    n = np.broadcast_to(n, x.shape[:-1])
+    pos = q * np.maximum(n - 1, 0)
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+    frac = pos - lo
+    v_lo = np.take_along_axis(x, lo[..., None], axis=-1)[..., 0]
+    v_hi = np.take_along_axis(x, hi[..., None], axis=-1)[..., 0]
+    return v_lo + frac * (v_hi - v_lo)
+
+
+def quantile_statistic(q):
+    def statistic(x, n):
+        return _sorted_quantile(np.sort(x, axis=-1), n, q)     # NaNs sort last
+    return statistic
+
+
+def _mean(x, n):
+    return np.nansum(x, axis=-1) / np.maximum(n, 1)
+
+
+def _max(x, n):
+    return np.nanmax(np.where(np.isnan(x), -np.inf, x), axis=-1)
+
+
+def _min(x, n):
+    return np.nanmin(np.where(np.isnan(x), np.inf, x), axis=-1)
+
+
+STATISTICS = {
+    'mean': _mean,
+    'median': quantile_statistic(0.5),
+    'p90': quantile_statistic(0.90),
+    'p95': quantile_statistic(0.95),
+    'p99': quantile_statistic(0.99),
+    'max': _max,
+    'min': _min,
+}
+
+
+def pack_groups(groups):
+    """List of 1-D sample arrays -> (NaN-padded matrix, counts)"""
+    counts = np.array([len(g) for g in groups], dtype=int)
+    data = np.full((len(groups), max(counts.max(initial=0), 1)), np.nan)
+    for i, g in enumerate(groups):
+        data[i, :len(g)] = g
+    return data, counts
+
+
+def bootstrap_distribution(data, counts, statistic, n_resamples=DEFAULT_RESAMPLES, rng=None):
+    """(configs x n_resamples) matrix of bootstrap replicates of statistic"""
+    rng = np.random.default_rng(rng)
+    c, m = data.shape
+    rows = np.arange(c)[:, None, None]
+    valid = np.arange(m)[None, None, :] < counts[:, None, None]
+    chunk = max(1, CHUNK_ELEMENTS // max(c * m, 1))
+    out = np.empty((c, n_resamples))
+    for start in range(0, n_resamples, chunk):
+        b = min(chunk, n_resamples - start)
+        idx = (rng.random((c, b, m)) * counts[:, None, None]).astype(int)
+        sample = np.where(valid, data[rows, idx], np.nan)
+        out[:, start:start + b] = statistic(sample, counts[:, None])
+    return out
+
+
+def jackknife_acceleration(data, counts, statistic):
+    """BCa acceleration per config from leave-one-out replicates"""
+    c, m = data.shape
+    if m < 2:
+        return np.zeros(c)
+    jack = np.empty((c, m))
+    # row i of keep lists every sample index except i
+    cols = np.arange(m - 1)[None, :]
+    keep = cols + (cols >= np.arange(m)[:, None])
+    chunk = max(1, CHUNK_ELEMENTS // max(c * m, 1))
+    for start in range(0, m, chunk):
+        stop = min(start + chunk, m)
+        loo = data[:, keep[start:stop]]             # (c, stop-start, m-1)
+        jack[:, start:stop] = statistic(loo, (counts - 1)[:, None])
+    # Leave-one-out of a padding slot is not a jackknife replicate
+    jack[np.arange(m)[None, :] >= counts[:, None]] = np.nan
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centered = np.nanmean(jack, axis=1, keepdims=True) - jack
+        num = np.nansum(centered ** 3, axis=1)
+        den = 6.0 * np.nansum(centered ** 2, axis=1) ** 1.5
+        return np.where(den > 0, num / den, 0.0)
+
+
+def bootstrap_ci(groups, statistic='mean', n_resamples=DEFAULT_RESAMPLES, confidence=0.95,
+                 method='percentile', rng=None):
+    """
+    Bootstrap CIs of statistic for every group at once.
+
+    groups: list of 1-D sample arrays (one per configuration), or a
+    (data, counts) tuple from pack_groups. Returns dict of arrays
+    'estimate', 'lower', 'upper' (one entry per group).
+    """
+    stat = STATISTICS[statistic] if isinstance(statistic, str) else statistic
+    data, counts = groups if isinstance(groups, tuple) else pack_groups(groups)
+
+    estimate = stat(data, counts)
+    boot = np.sort(bootstrap_distribution(data, counts, stat, n_resamples, rng), axis=1)
+    alpha = (1 - confidence) / 2
+
+    if method == 'bca':
+        with np.errstate(divide='ignore'):
+            prop = (np.sum(boot < estimate[:, None], axis=1)
+                    + 0.5 * np.sum(boot == estimate[:, None], axis=1)) / n_resamples
+        z0 = stats.norm.ppf(np.clip(prop, 1e-6, 1 - 1e-6))
+        a = jackknife_acceleration(data, counts, stat)
+        z = stats.norm.ppf([alpha, 1 - alpha])[None, :]
+        adj = stats.norm.cdf(z0[:, None] + (z0[:, None] + z) / (1 - a[:, None] * (z0[:, None] + z)))
+    else:
+        adj = np.tile([alpha, 1 - alpha], (len(counts), 1))
+
+    bounds = _sorted_quantile(boot[:, None, :].repeat(2, axis=1), n_resamples, adj)
+    return {'estimate': estimate, 'lower': bounds[:, 0], 'upper': bounds[:, 1]}
+
+
+def load_samples(result_dir):
+    """
+    Per-configuration samples from .sca files (see plot_results.load_all_results),
+    one value per replication: the replication is the resampling unit, since
+    users of the same run share the tables and are strongly correlated.
+    Per run: p95/p99 of the wait time from the users' merged quantile
+    sketches (sketch.py), p95 of the per-user mean waits (a quantile of user
+    means, kept as an extra column), max queue and completion rate (served /
+    issued). Runs recorded without sketches have no wait quantiles.
+    """
+    import os
+    from plot_results import parse_sca_file
+    from sketch import merge_file_sketches
+
+    samples = defaultdict(lambda: {'wait_p95': [], 'wait_p99': [], 'user_wait_p95': [], 'max_queue': [],
+                                   'completion_rate': []})
+    for filename in sorted(os.listdir(result_dir)):
+        if not filename.endswith('.sca'):
+            continue
+        data = parse_sca_file(os.path.join(result_dir, filename))
+        dist = 'Uniform' if 'Uniform' in filename else 'Lognormal' if 'Lognormal' in filename else None
+        n_users = int(data['config'].get('N', 0))
+        if not dist or n_users == 0:
+            continue
+        key = (dist, data['detected_M'], n_users, float(data['config'].get('p', 0)))
+        s = samples[key]
+        sketch = merge_file_sketches(os.path.join(result_dir, filename))
+        if sketch is not None and sketch.count > 0:
+            s['wait_p95'].append(sketch.quantile(0.95))
+            s['wait_p99'].append(sketch.quantile(0.99))
+        user_waits = [u['averageWaitTime'] for u in data['users'] if 'averageWaitTime' in u]
+        if user_waits:
+            s['user_wait_p95'].append(np.percentile(user_waits, 95))
+        s['max_queue'].append(max((t.get('table.maxQueueLength', 0) for t in data['tables']), default=0))
+        issued = sum(u.get('totalAccesses', 0) for u in data['users'])
+        served = sum(t.get('table.totalServed', 0) for t in data['tables'])
+        if issued > 0:
+            s['completion_rate'].append(served / issued)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bootstrap CIs for tail metrics across all configs")
+    parser.add_argument('result_dir', nargs='?', default='results')
+    parser.add_argument('--resamples', type=int, default=DEFAULT_RESAMPLES)
+    parser.add_argument('--method', choices=['percentile', 'bca'], default='bca')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    samples = load_samples(args.result_dir)
+    if not samples:
+        print(f"Nessun risultato trovato in {args.result_dir}")
+        return 1
+    keys = sorted(samples)
+
+    start = time.time()
+    tables = {
+        # Mean over replications of the per-run wait quantiles (merged user sketches)
+        'wait p95': bootstrap_ci([samples[k]['wait_p95'] or [np.nan] for k in keys], 'mean',
+                                 args.resamples, method=args.method, rng=args.seed),
+        'wait p99': bootstrap_ci([samples[k]['wait_p99'] or [np.nan] for k in keys], 'mean',
+                                 args.resamples, method=args.method, rng=args.seed),
+        # Extra: per-run p95 of the per-user mean waits, not a wait-time quantile
+        'user-mean wait p95': bootstrap_ci([samples[k]['user_wait_p95'] or [np.nan] for k in keys], 'mean',
+                                           args.resamples, method=args.method, rng=args.seed),
+        'max queue': bootstrap_ci([samples[k]['max_queue'] for k in keys], 'max', args.resamples, method=args.method, rng=args.seed),
+        'completion': bootstrap_ci([samples[k]['completion_rate'] or [np.nan] for k in keys], 'mean', args.resamples, method=args.method, rng=args.seed),
+    }
+    elapsed = time.time() - start
+
+    header = f"{'Dist':<10} {'M':>3} {'N':>6} {'p':>5}" + "".join(f" {name:>28}" for name in tables)
+    print(header)
+    print("-" * len(header))
+    for i, (dist, m, n, p) in enumerate(keys):
+        row = f"{dist:<10} {m:>3} {n:>6} {p:>5}"
+        for res in tables.values():
+            row += f" {res['estimate'][i]:>9.3f} [{res['lower'][i]:>7.3f},{res['upper'][i]:>8.3f}]"
+        print(row)
+    print(f"\n{len(keys)} configs × {args.resamples} resamples × {len(tables)} statistics "
+          f"({args.method}) in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
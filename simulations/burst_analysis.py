@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Queue build-up and drain under time-varying load (User.rateProfile), from the
+snapshot files of runs with snapshotInterval > 0.
+
+An episode is a maximal stretch of snapshot intervals where the total queue
+exceeds the threshold (default: twice the median queue of the run, at least
+1). For each episode: when it starts, the peak queue and when it is reached
+(build-up), how long the queue takes to fall back below the threshold after
+the peak (drain), and the peak per-interval mean wait. --intervals also
+prints the per-interval series (arrival rate, throughput, wait, queue).
+
+Usage:
+    python3 burst_analysis.py [results_dir] [--threshold 50] [--intervals]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from snapshots import read_snapshots, system_series, interval_series
+
+
+def find_episodes(intervals, threshold):
+    """Stretches of consecutive intervals with queueLength > threshold"""
+    above = intervals['queueLength'].to_numpy() > threshold
+    episodes = []
+    i, n = 0, len(intervals)
+    while i < n:
+        if not above[i]:
+            i += 1
+            continue
+        j = i
+        while j + 1 < n and above[j + 1]:
+            j += 1
+        window = intervals.iloc[i:j + 1]
+        peak = window['queueLength'].idxmax()
+        # Drained at the end of the first interval back under the threshold
+        drained = intervals['end'].iloc[j + 1] if j + 1 < n else float('nan')
+        episodes.append({
+            'start': float(window['start'].iloc[0]),
+            'peak_time': float(intervals.loc[peak, 'end']),
+            'peak_queue': float(intervals.loc[peak, 'queueLength']),
+            'peak_wait': float(window['meanWait'].max()),
+            'peak_arrival_rate': float(window['arrivalRate'].max()),
+            'build_up': float(intervals.loc[peak, 'end'] - window['start'].iloc[0]),
+            'drain': float(drained - intervals.loc[peak, 'end']),
+        })
+        i = j + 1
+    return episodes
+
+
+def analyze_file(path, threshold=None):
+    df = read_snapshots(path)
+    if df.empty or df['time'].nunique() < 2:
+        return None, [], 0.0
+    intervals = interval_series(system_series(df)).reset_index(drop=True)
+    if threshold is None:
+        threshold = max(2 * float(np.median(intervals['queueLength'])), 1.0)
+    return intervals, find_episodes(intervals, threshold), threshold
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue build-up and drain after load peaks and bursts")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--threshold', type=float, help="queue length that counts as congested")
+    parser.add_argument('--intervals', action='store_true', help="print the per-interval series too")
+    args = parser.parse_args()
+
+    files = sorted(Path(args.results_dir).rglob("*.snap.csv"))
+    if not files:
+        print(f"Nessun file .snap.csv trovato in {args.results_dir}")
+        return 1
+
+    for path in files:
+        intervals, episodes, threshold = analyze_file(path, args.threshold)
+        print(f"\n{path.name}")
+        if intervals is None:
+            print("  meno di due snapshot")
+            continue
+        if args.intervals:
+            print(f"  {'start':>9} {'arr/s':>9} {'thr/s':>9} {'wait':>9} {'queue':>7}")
+            for row in intervals.itertuples():
+                print(f"  {row.start:>9.0f} {row.arrivalRate:>9.2f} {row.throughput:>9.2f} "
+                      f"{row.meanWait:>9.4f} {row.queueLength:>7.0f}")
+        print(f"  Soglia coda: {threshold:.0f}, episodi: {len(episodes)}")
+        if episodes:
+            print(f"  {'start':>9} {'peak t':>9} {'peak q':>7} {'build-up':>9} {'drain':>9} "
+                  f"{'peak wait':>10} {'peak arr/s':>10}")
+            for ep in episodes:
+                print(f"  {ep['start']:>9.0f} {ep['peak_time']:>9.0f} {ep['peak_queue']:>7.0f} "
+                      f"{ep['build_up']:>9.0f} {ep['drain']:>9.0f} {ep['peak_wait']:>10.4f} "
+                      f"{ep['peak_arrival_rate']:>10.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,6 +10,8 @@ import subprocess
 from pathlib import Path
 import time
 
+from run_specs import RunSpec
+
 class ConsistencyTester:
     def __init__(self, base_dir="."):
         self.base_dir = Path(base_dir).resolve()
@@ -31,32 +33,20 @@ class ConsistencyTester:
         """Create .ini configuration file for a specific numUsers value"""
         config_path = self.results_dir / f"{config_name}.ini"
         
-        config_content = f"""[General]
-network = progetto.DatabaseNetwork
-
-# Simulation parameters
-sim-time-limit = 4000s
-warmup-period = 500s
-repeat = 3
-
-# Output
-result-dir = {self.results_dir}
-output-scalar-file = ${{resultdir}}/${{configname}}-${{iterationvars}}-${{repetition}}.sca
-
-# Network parameters
-*.numUsers = {num_users}
-*.numTables = 10
-*.user[*].readProbability = 0.5
-*.user[*].tableDistribution = "uniform"
-*.user[*].serviceTime = 0.1s
-*.user[*].lambda = 0.05
-
-
-[Config {config_name}]
-"""
-        
-        with open(config_path, 'w') as f:
-            f.write(config_content)
+        spec = RunSpec(config_name, {
+            'numUsers': num_users,
+            'numTables': 10,
+            'readProbability': 0.5,
+            'tableDistribution': 'uniform',
+            'serviceTime': 0.1,
+            'lambda': 0.05,
+        }, {
+            'sim-time-limit': 4000,
+            'warmup-period': 500,
+            'result-dir': self.results_dir,
+            'output-scalar-file': '${resultdir}/${configname}-${iterationvars}-${repetition}.sca',
+        }, repeat=3)
+        spec.write_ini(config_path)
         
         print(f"✓ Created config: {config_name} (numUsers={num_users})")
         return config_path
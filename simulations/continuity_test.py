@@ -10,18 +10,63 @@ NOTA: Si varia il numero di utenti invece di p (readProbability) perché:
 - Tutte le metriche scalano in modo prevedibile (~5% aumento)
 """
 
+import argparse
 import subprocess
 import os
 import sys
 from pathlib import Path
 from datetime import datetime
 
-def run_continuity_test():
+from run_specs import RunSpec
+
+# Random purposes drawn by each User: interarrival, op type, table choice
+RNG_PURPOSES = 3
+# ... and by each Table: service time, partition/replica choice
+TABLE_RNG_PURPOSES = 2
+# ... and by each Cache (one per table): key choice
+CACHE_RNG_PURPOSES = 1
+
+def crn_rng_mapping(max_users, num_tables):
+    """
+    Mappa RNG per common random numbers: ogni utente, ogni tabella e ogni
+    scopo ha il suo stream globale, identico in A e B (stesso num-rngs e
+    stesso seed-set), così l'utente aggiuntivo di B non sposta i numeri
+    casuali degli altri. Dopo gli utenti vengono le tabelle e le cache
+    (useCache); l'ultimo stream è del modulo di rete (burst del profilo
+    "mmpp", burstRng = 0).
+    """
+    mapping = {
+        '*.user[*].interarrivalRng': 0,
+        '*.user[*].opTypeRng': 1,
+        '*.user[*].tableRng': 2,
+        '*.table[*].serviceRng': 0,
+        '*.table[*].selectionRng': 1,
+        '*.cache[*].keyRng': 0,
+    }
+    for i in range(max_users):
+        for k in range(RNG_PURPOSES):
+            mapping[f"*.user[{i}].rng-{k}"] = RNG_PURPOSES * i + k
+    base = RNG_PURPOSES * max_users
+    for j in range(num_tables):
+        for k in range(TABLE_RNG_PURPOSES):
+            mapping[f"*.table[{j}].rng-{k}"] = base + TABLE_RNG_PURPOSES * j + k
+    base += TABLE_RNG_PURPOSES * num_tables
+    for j in range(num_tables):
+        for k in range(CACHE_RNG_PURPOSES):
+            mapping[f"*.cache[{j}].rng-{k}"] = base + CACHE_RNG_PURPOSES * j + k
+    base += CACHE_RNG_PURPOSES * num_tables
+    mapping['DatabaseNetwork.rng-0'] = base
+    mapping['num-rngs'] = base + 1
+    return mapping
+
+def run_continuity_test(paired=False, replications=25):
     """Esegue il continuity test con due configurazioni"""
     
     print(f"\n{'='*70}")
     print(" "*15 + "CONTINUITY TEST - SEZIONE 5.2")
     print(f"{'='*70}\n")
+    if paired:
+        print(f"Modalità PAIRED: common random numbers, {replications} repliche\n")
     
     # Directories
     base_dir = Path("..")
@@ -44,50 +89,37 @@ def run_continuity_test():
     
     print(f"✓ Eseguibile trovato: {out_dir}\n")
     
-    # Configurazione A: N = 100 users (baseline)
-    config_a = """[General]
-description = "Continuity Test - Configuration A (N=100)"
-network = progetto.DatabaseNetwork
-seed-set = 1
-result-dir = results_continuity
+    # In modalità paired entrambe le config usano seed-set = repetition e la
+    # stessa mappa RNG, così la replica r di A e di B è accoppiata
+    seed_set = "${repetition}" if paired else "1"
 
-[Config ContinuityA]
-*.numUsers = 100
-*.numTables = 20
-*.user[*].lambda = 1.0
-*.user[*].readProbability = 0.5
-*.user[*].serviceTime = 0.1s
-*.user[*].tableDistribution = "uniform"
-sim-time-limit = 1000s
-warmup-period = 500s
-repeat = 25
-"""
-    
-    # Configurazione B: N = 101 users (variazione minima +1 utente)
-    config_b = """[General]
-description = "Continuity Test - Configuration B (N=101)"
-network = progetto.DatabaseNetwork
-seed-set = 1
-result-dir = results_continuity
-
-[Config ContinuityB]
-*.numUsers = 101
-*.numTables = 20
-*.user[*].lambda = 1.0
-*.user[*].readProbability = 0.5
-*.user[*].serviceTime = 0.1s
-*.user[*].tableDistribution = "uniform"
-sim-time-limit = 1000s
-warmup-period = 500s
-repeat = 25
-"""
+    # Configurazione A: N = 100 users (baseline); B: N = 101 (variazione minima +1 utente)
+    params = {
+        'numTables': 20,
+        'lambda': 1.0,
+        'readProbability': 0.5,
+        'serviceTime': 0.1,
+        'tableDistribution': 'uniform',
+    }
+    rng_mapping = crn_rng_mapping(101, params['numTables']) if paired else {}
+    options = {
+        'seed-set': seed_set,
+        'result-dir': 'results_continuity',
+        'sim-time-limit': 1000,
+        'warmup-period': 500,
+        **rng_mapping,
+    }
+    config_a = RunSpec("ContinuityA", {'numUsers': 100, **params},
+                       {'description': '"Continuity Test - Configuration A (N=100)"', **options}, repeat=replications)
+    config_b = RunSpec("ContinuityB", {'numUsers': 101, **params},
+                       {'description': '"Continuity Test - Configuration B (N=101)"', **options}, repeat=replications)
     
     # Salva config files
     config_a_file = results_dir / "ContinuityA.ini"
     config_b_file = results_dir / "ContinuityB.ini"
     
-    config_a_file.write_text(config_a)
-    config_b_file.write_text(config_b)
+    config_a.write_ini(config_a_file)
+    config_b.write_ini(config_b_file)
     
     print(f"Configuration A (readProbability = 0.5):")
     print(f"  ✓ Salvato: {config_a_file}")
@@ -96,7 +128,7 @@ repeat = 25
     
     # Esegui simulazione A
     print(f"{'='*70}")
-    print("Lanciando CONFIGURATION A (p=0.5) con 25 repetizioni...")
+    print(f"Lanciando CONFIGURATION A (p=0.5) con {replications} repetizioni...")
     print(f"{'='*70}\n")
     
     cmd_a = [str(out_dir), "-n", str(src_dir) + ":.",
@@ -122,7 +154,7 @@ repeat = 25
     
     # Esegui simulazione B
     print(f"{'='*70}")
-    print("Lanciando CONFIGURATION B (p=0.55) con 25 repetizioni...")
+    print(f"Lanciando CONFIGURATION B (p=0.55) con {replications} repetizioni...")
     print(f"{'='*70}\n")
     
     cmd_b = [str(out_dir), "-n", str(src_dir) + ":.",
@@ -155,14 +187,24 @@ repeat = 25
     print(f"✓ Results saved in: {results_dir}/")
     print(f"\nNext step:")
     print(f"  - Analyze .sca files from both configurations")
-    print(f"  - Compare 95% confidence intervals")
-    print(f"  - Verify overlap to confirm continuity\n")
+    if paired:
+        print("  - Compute 95% CI of the paired differences (python3 analyze_continuity.py --paired)\n")
+    else:
+        print(f"  - Compare 95% confidence intervals")
+        print(f"  - Verify overlap to confirm continuity\n")
     
     return True
 
 def main():
     """Main entry point"""
-    success = run_continuity_test()
+    parser = argparse.ArgumentParser(description="Continuity test A (N=100) vs B (N=101)")
+    parser.add_argument("--paired", action="store_true",
+                        help="common random numbers: synchronized RNG streams per user and purpose")
+    parser.add_argument("--replications", type=int, default=None,
+                        help="repliche per configurazione (default: 25, 10 in modalità paired)")
+    args = parser.parse_args()
+    replications = args.replications or (10 if args.paired else 25)
+    success = run_continuity_test(paired=args.paired, replications=replications)
     return 0 if success else 1
 
 if __name__ == '__main__':
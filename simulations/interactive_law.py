@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Interactive response time law check for closed-loop runs (User.maxOutstanding
+> 0, see [Config ClosedLoop]).
+
+Each user is K terminals cycling request -> response -> think time Z, so over
+the post-warm-up window the population N = sum of K must equal X * (R + Z),
+with X the completed cycles per second, R their mean response time and Z the
+mean think time. A large relative error means the window is too short or
+the run did not reach steady state; the X and R columns against N are the
+capacity curve (X flattens at the bottleneck, R then grows linearly in N).
+
+Usage:
+    python3 interactive_law.py results/ClosedLoop-*.sca [--tolerance 0.05]
+"""
+
+import argparse
+import glob
+import re
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+SCALAR_RE = re.compile(r'^scalar\s+\S+\.(user|table)\[(\d+)\]\s+(\S+)\s+(\S+)')
+ATTR_RE = re.compile(r'^attr\s+(configname|iterationvars)\s+"?([^"\n]*)"?')
+USER_SCALARS = {'maxOutstanding', 'thinkTime', 'closedThroughput', 'closedResponseTime:mean'}
+
+
+def parse_closed_run(filepath):
+    """(point label, {'N', 'X', 'R', 'Z', 'Umax'}) of one .sca file, None if not closed loop"""
+    attrs = {}
+    users = defaultdict(dict)
+    utilization = []
+    with open(filepath, 'r') as f:
+        for line in f:
+            match = ATTR_RE.match(line)
+            if match:
+                attrs[match.group(1)] = match.group(2)
+                continue
+            match = SCALAR_RE.match(line)
+            if not match:
+                continue
+            module, index, name, value = match.groups()
+            if module == 'user' and name in USER_SCALARS:
+                users[int(index)][name] = float(value)
+            elif module == 'table' and name == 'table.utilization':
+                utilization.append(float(value))
+
+    users = [u for u in users.values() if u.get('maxOutstanding', 0) > 0 and 'closedThroughput' in u]
+    if not users:
+        return None
+    x = np.array([u['closedThroughput'] for u in users])
+    r = np.array([u.get('closedResponseTime:mean', np.nan) for u in users])
+    z = np.array([u['thinkTime'] for u in users])
+    total_x = x.sum()
+    served = (x > 0) & np.isfinite(r)
+    label = f"{attrs.get('configname', filepath)} {attrs.get('iterationvars', '')}".strip()
+    return label, {
+        'N': sum(u['maxOutstanding'] for u in users),
+        'X': total_x,
+        # Per-user means weighted by their cycles, i.e. the means over all cycles
+        'R': float(np.dot(x[served], r[served]) / total_x) if total_x > 0 else np.nan,
+        'Z': float(np.dot(x, z) / total_x) if total_x > 0 else float(z.mean()),
+        'Umax': max(utilization) if utilization else np.nan,
+    }
+
+
+def check_point(runs, tolerance):
+    """Means over the repetitions of a point plus the law error X*(R+Z)/N - 1"""
+    mean = {key: float(np.mean([run[key] for run in runs])) for key in runs[0]}
+    mean['N_law'] = mean['X'] * (mean['R'] + mean['Z'])
+    mean['error'] = mean['N_law'] / mean['N'] - 1 if mean['N'] > 0 else np.nan
+    mean['ok'] = bool(abs(mean['error']) <= tolerance)
+    mean['runs'] = len(runs)
+    return mean
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interactive response time law N = X(R+Z) on closed-loop runs")
+    parser.add_argument('sca_files', nargs='*', default=['results/*.sca'])
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help="max relative error of X(R+Z) against N (default 0.05)")
+    args = parser.parse_args()
+
+    files = sorted(f for pattern in args.sca_files for f in glob.glob(pattern))
+    points = defaultdict(list)
+    for filepath in files:
+        parsed = parse_closed_run(filepath)
+        if parsed:
+            points[parsed[0]].append(parsed[1])
+    if not points:
+        print("Nessuna run closed-loop trovata (maxOutstanding = 0?)")
+        return 1
+
+    print(f"{'Point':<40} {'runs':>4} {'N':>7} {'X [1/s]':>10} {'R [s]':>9} {'Z [s]':>8} "
+          f"{'X(R+Z)':>9} {'err':>7} {'Umax':>6}")
+    print("-" * 108)
+    failed = 0
+    for label, runs in sorted(points.items(), key=lambda kv: (kv[0].split()[0], kv[1][0]['N'])):
+        res = check_point(runs, args.tolerance)
+        failed += not res['ok']
+        flag = "" if res['ok'] else "  ⚠"
+        print(f"{label[:40]:<40} {res['runs']:>4} {res['N']:>7.0f} {res['X']:>10.3f} {res['R']:>9.4f} "
+              f"{res['Z']:>8.2f} {res['N_law']:>9.1f} {100 * res['error']:>6.2f}% {res['Umax']:>6.3f}{flag}")
+    if failed:
+        print(f"\n{failed} punti fuori tolleranza ({100 * args.tolerance:.0f}%)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -60,6 +60,10 @@ def aggregate_statistics(data):
     total_writes = sum(u.get('totalWrites', 0) for u in data['users'])
     total_ops = total_reads + total_writes
     read_pct = (total_reads / total_ops * 100) if total_ops > 0 else 0
+    # Load shedding (requestTimeout / admissionControl): share of the requests sent
+    total_sent = sum(u.get('totalAccesses', 0) for u in data['users'])
+    timed_out = sum(u.get('requestsTimedOut', 0) for u in data['users'])
+    rejected = sum(u.get('requestsRejected', 0) for u in data['users'])
 
     table_throughputs = [t.get('table.throughput', 0) for t in data['tables']]
     table_utils = [t.get('table.utilization', 0) for t in data['tables']]
@@ -73,7 +77,9 @@ def aggregate_statistics(data):
         'max_table_utilization': max(table_utils) if table_utils else 0,
         'avg_queue_len': statistics.mean(table_queues) if table_queues else 0,
         'max_queue_len': max(table_max_queues) if table_max_queues else 0,
-        'read_pct': read_pct
+        'read_pct': read_pct,
+        'timeout_pct': (timed_out / total_sent * 100) if total_sent > 0 else 0,
+        'rejected_pct': (rejected / total_sent * 100) if total_sent > 0 else 0
     }
 
 def load_all_results():
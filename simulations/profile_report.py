@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Where does the wall-clock time go? Summary of the profile.* scalars written
+by User/Table when profileEvents = true (see [Config Profile]).
+
+Usage:
+    python3 profile_report.py results/Profile-*.sca
+"""
+
+import glob
+import re
+import sys
+from collections import defaultdict
+
+SCALAR_RE = re.compile(r'^scalar\s+\S+\.(user|table)\[0\]\s+profile\.(\S+)\.(events|wallTime)\s+(\S+)')
+FES_RE = re.compile(r'^scalar\s+\S+\s+profile\.fesLength\.(\S+)\s+(\S+)')
+
+
+def parse_profile(filepath):
+    """({category: {'events', 'wallTime'}}, {fes stat: value}) from one .sca file"""
+    categories = defaultdict(dict)
+    fes = {}
+    with open(filepath, 'r') as f:
+        for line in f:
+            match = SCALAR_RE.match(line)
+            if match:
+                module_type = 'User' if match.group(1) == 'user' else 'Table'
+                categories[f"{module_type}.{match.group(2)}"][match.group(3)] = float(match.group(4))
+                continue
+            match = FES_RE.match(line)
+            if match:
+                fes[match.group(1)] = float(match.group(2))
+    return categories, fes
+
+
+def main():
+    files = sorted(f for pattern in (sys.argv[1:] or ['results/*.sca']) for f in glob.glob(pattern))
+    found = False
+    for filepath in files:
+        categories, fes = parse_profile(filepath)
+        if not categories:
+            continue
+        found = True
+        total = sum(c.get('wallTime', 0.0) for c in categories.values())
+        print(f"\n{filepath}")
+        print(f"{'Category':<28} {'events':>12} {'wall [s]':>10} {'share':>7} {'µs/event':>10}")
+        print("-" * 72)
+        for name, c in sorted(categories.items(), key=lambda kv: -kv[1].get('wallTime', 0.0)):
+            events, wall = c.get('events', 0), c.get('wallTime', 0.0)
+            share = 100 * wall / total if total > 0 else 0.0
+            per_event = 1e6 * wall / events if events else 0.0
+            print(f"{name:<28} {events:>12.0f} {wall:>10.3f} {share:>6.1f}% {per_event:>10.2f}")
+        if fes:
+            print(f"FES length: mean {fes.get('mean', 0):.0f}, max {fes.get('max', 0):.0f}")
+            buckets = sorted((int(k[4:-1]), v) for k, v in fes.items() if k.startswith('upTo'))
+            print("  " + ", ".join(f"≤{t}s: {v:.0f}" for t, v in buckets))
+
+    if not found:
+        print("Nessuno scalare profile.* trovato (profileEvents = false?)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Results catalog: per-configuration metadata derived from past runs
+(e.g. the recommended warm-up period), stored as JSON next to the results.
+
+Entries are keyed by "<configname> <iterationvars>", e.g.
+"Uniform $N=1000, $p=0.5", the same strings OMNeT++ writes in the
+run attributes.
+"""
+
+import json
+import re
+from pathlib import Path
+
+CATALOG_FILE = Path(__file__).resolve().parent / "results_catalog.json"
+# Warm-up detection run of each sweep config (omnetpp.ini): same ${N}/${p}
+# levels, warmup-period = 0s and the waitTime vector on
+WARMUP_CONFIGS = {'Uniform': 'WarmupUniform', 'Lognormal': 'WarmupLognormal'}
+
+
+def config_key(configname, iterationvars=""):
+    iterationvars = (iterationvars or "").strip().strip('"')
+    return f"{configname} {iterationvars}" if iterationvars else configname
+
+
+def parse_itervars(iterationvars):
+    """'$N=1000, $p=0.5' -> {'N': '1000', 'p': '0.5'}"""
+    return dict(re.findall(r'\$(\w+)=([^,\s]+)', iterationvars or ""))
+
+
+def load_catalog(path=CATALOG_FILE):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_catalog(catalog, path=CATALOG_FILE):
+    with open(path, 'w') as f:
+        json.dump(catalog, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def update_entry(key, fields, path=CATALOG_FILE):
+    """Merge fields into the catalog entry for key and write the file back"""
+    catalog = load_catalog(path)
+    catalog.setdefault(key, {}).update(fields)
+    save_catalog(catalog, path)
+    return catalog[key]
+
+
+def lookup_warmup(configname, itervars=None, default=None, path=CATALOG_FILE):
+    """
+    Recommended warm-up (seconds) for a config point, from entries of the
+    config itself or of its detection config (WARMUP_CONFIGS). Numeric
+    itervars (N, p) pick the nearest entry by relative distance, the others
+    must match; falls back to default when nothing matches.
+    """
+    catalog = load_catalog(path)
+    names = {configname, WARMUP_CONFIGS.get(configname)}
+    itervars = {k: str(v) for k, v in (itervars or {}).items()}
+    best, best_dist = None, None
+    for key, entry in catalog.items():
+        if 'warmup_s' not in entry or entry.get('configname') not in names:
+            continue
+        other = entry.get('itervars', {})
+        dist = 0.0
+        for k, v in itervars.items():
+            if k not in other:
+                dist = None
+                break
+            try:
+                a, b = float(v), float(other[k])
+                dist += abs(a - b) / max(abs(a), 1e-9)
+            except ValueError:
+                if other[k] != v:
+                    dist = None
+                    break
+        if dist is None:
+            continue
+        if best_dist is None or dist < best_dist:
+            best, best_dist = entry['warmup_s'], dist
+    return best if best is not None else default
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Run specifications for the DatabaseNetwork simulation.
+
+Replaces the hand-written .ini templates of the test/sweep scripts: a RunSpec
+holds the config name, the NED parameters, the run options (sim-time-limit,
+warm-up, seeds, output files) and the number of repetitions. Designs over the
+parameters are generated in memory:
+  - grid()                   full factorial
+  - fractional_factorial()   2-level 2^(k-p) design from generators
+  - latin_hypercube()        space-filling sample of ranges / levels
+design_specs() turns design points into specs and dedupe() drops the ones
+that would run the same simulation (same rendered parameters, options and
+repeat; the name is ignored).
+
+A spec renders to ini text (to_ini / write_ini, write_batch_ini for many
+specs in one file). Launcher.launch() runs one spec in a private temporary
+directory and copies the artifacts out; Launcher.run_all() does the same
+for many specs in parallel.
+
+Usage (dry run, prints the ini of a design):
+    python3 run_specs.py --design lhs --points 8 --seed 1
+"""
+
+import argparse
+import itertools
+import json
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from results_catalog import lookup_warmup
+
+NETWORK = "progetto.DatabaseNetwork"
+
+# Bare parameter name -> ini pattern of the modules that own it. Keys that
+# already contain '.' or '*' are used verbatim.
+PARAM_SCOPES = {
+    'numUsers': '*',
+    'numTables': '*',
+    'lambda': '*.user[*]',
+    'readProbability': '*.user[*]',
+    'tableDistribution': '*.user[*]',
+    'serviceTime': '*.user[*]',
+    'lognormalM': '*.user[*]',
+    'lognormalS': '*.user[*]',
+    'interarrivalRng': '*.user[*]',
+    'opTypeRng': '*.user[*]',
+    'tableRng': '*.user[*]',
+    'recordWaitSketch': '**',
+    'sketchRelativeAccuracy': '**',
+    'sketchMaxBins': '**',
+    'leanStats': '**',
+    'snapshotInterval': '**',
+    'snapshotFile': '**',
+    'profileEvents': '**',
+    'schedulingPolicy': '*.table[*]',
+    'policyBound': '*.table[*]',
+    'partitions': '*.table[*]',
+    'partitionSelection': '*.table[*]',
+    'readReplicas': '*.table[*]',
+    'replicaSelection': '*.table[*]',
+    'replicationDelay': '*.table[*]',
+    'selectionRng': '*.table[*]',
+    'useCache': '*',
+    'capacity': '*.cache[*]',
+    'hitServiceTime': '*.cache[*]',
+    'ttl': '*.cache[*]',
+    'evictionPolicy': '*.cache[*]',
+    'keySpace': '*.cache[*]',
+    'keyDistribution': '*.cache[*]',
+    'zipfExponent': '*.cache[*]',
+    'requestTimeout': '*.user[*]',
+    'maxOutstanding': '*.user[*]',
+    'transactionProbability': '*.user[*]',
+    'transactionSize': '*.user[*]',
+    'traceFile': '*.user[*]',
+    'traceFormat': '*.user[*]',
+    'traceTimeScale': '*.user[*]',
+    'traceReadAhead': '*.user[*]',
+    'rateProfile': '*.user[*]',
+    'rateSteps': '*.user[*]',
+    'ratePeriod': '*.user[*]',
+    'rateAmplitude': '*.user[*]',
+    'ratePhase': '*.user[*]',
+    'burstFactor': '*.user[*]',
+    'burstDuration': '*.user[*]',
+    'burstGap': '*.user[*]',
+    'burstRng': '*.user[*]',
+    'readServiceDistribution': '*.table[*]',
+    'readServiceMean': '*.table[*]',
+    'readServiceCv': '*.table[*]',
+    'readServiceTrace': '*.table[*]',
+    'writeServiceDistribution': '*.table[*]',
+    'writeServiceMean': '*.table[*]',
+    'writeServiceCv': '*.table[*]',
+    'writeServiceTrace': '*.table[*]',
+    'serviceRng': '*.table[*]',
+    'admissionControl': '*.table[*]',
+    'queueCapacity': '*.table[*]',
+    'codelTarget': '*.table[*]',
+    'codelInterval': '*.table[*]',
+}
+STRING_PARAMS = {'tableDistribution', 'snapshotFile', 'schedulingPolicy', 'partitionSelection', 'replicaSelection',
+                 'evictionPolicy', 'keyDistribution', 'admissionControl',
+                 'readServiceDistribution', 'readServiceTrace', 'writeServiceDistribution', 'writeServiceTrace',
+                 'traceFile', 'traceFormat', 'rateProfile', 'rateSteps'}
+SECONDS_PARAMS = {'serviceTime', 'snapshotInterval', 'replicationDelay', 'hitServiceTime', 'ttl', 'requestTimeout',
+                  'readServiceMean', 'writeServiceMean',
+                  'codelTarget', 'codelInterval', 'ratePeriod', 'burstDuration', 'burstGap'}
+SECONDS_OPTIONS = {'sim-time-limit', 'warmup-period'}
+# User parameters without a NED default: an ini rendered standalone must set them
+REQUIRED_PARAMS = ('lambda', 'readProbability', 'serviceTime', 'tableDistribution')
+
+
+def param_key(name):
+    """ini key of a parameter: 'lambda' -> '*.user[*].lambda'"""
+    if '.' in name or '*' in name:
+        return name
+    if name not in PARAM_SCOPES:
+        raise ValueError(f"unknown parameter '{name}' (use the full ini key, e.g. '*.table[*].{name}')")
+    return f"{PARAM_SCOPES[name]}.{name}"
+
+
+def format_value(value, quote=False, unit=None):
+    """
+    ini text of a value. Strings are taken as ini expressions ("0.1s",
+    "${N=10,100}") unless quote is set; numbers get the unit if given.
+    """
+    if isinstance(value, (str, Path)):
+        return json.dumps(str(value)) if quote else str(value)
+    if isinstance(value, (bool, np.bool_)):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, np.integer)):
+        text = str(int(value))
+    else:
+        text = f"{float(value):.12g}"
+    return text + unit if unit else text
+
+
+@dataclass
+class RunSpec:
+    """One simulation configuration: rendered as [Config name] with `repeat` runs"""
+    name: str
+    params: dict = field(default_factory=dict)
+    options: dict = field(default_factory=dict)
+    repeat: int = 1
+
+    def param_lines(self):
+        lines = []
+        for name, value in self.params.items():
+            bare = name.rsplit('.', 1)[-1]
+            quote = bare in STRING_PARAMS and not str(value).startswith(('"', '$'))
+            lines.append((param_key(name), format_value(value, quote=quote,
+                                                        unit='s' if bare in SECONDS_PARAMS else None)))
+        return lines
+
+    def option_lines(self):
+        lines = [(k, format_value(v, unit='s' if k in SECONDS_OPTIONS else None)) for k, v in self.options.items()]
+        if self.repeat != 1:
+            lines.append(('repeat', str(self.repeat)))
+        return lines
+
+    def key(self):
+        """Canonical identity: what the simulator sees, independent of the name and dict order"""
+        return tuple(sorted(self.option_lines())), tuple(sorted(self.param_lines()))
+
+    def with_options(self, **options):
+        """Copy with extra/overridden options (ini names with '-' passed as dict: **{'seed-set': 1})"""
+        return RunSpec(self.name, dict(self.params), {**self.options, **options}, self.repeat)
+
+    def with_params(self, **params):
+        return RunSpec(self.name, {**self.params, **params}, dict(self.options), self.repeat)
+
+    def section(self):
+        lines = [f"[Config {self.name}]"]
+        lines += [f"{k} = {v}" for k, v in self.option_lines()]
+        lines += [f"{k} = {v}" for k, v in self.param_lines()]
+        return "\n".join(lines) + "\n"
+
+    def to_ini(self, general=None):
+        return render_ini([self], general)
+
+    def write_ini(self, path, general=None):
+        path = Path(path)
+        path.write_text(self.to_ini(general))
+        return path
+
+    def argv(self, executable, ned_path, ini_path, run=None):
+        """Command line running this spec from ini_path (all runs, or only `run`)"""
+        cmd = [str(executable), "-u", "Cmdenv", "-n", str(ned_path), "-f", str(ini_path), "-c", self.name]
+        if run is not None:
+            cmd += ["-r", str(run)]
+        return cmd
+
+
+def render_ini(specs, general=None):
+    """One ini file: [General] with the network and shared options, one section per spec"""
+    names = {}
+    for spec in specs:
+        if not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_-]*', spec.name):
+            raise ValueError(f"invalid config name '{spec.name}'")
+        if names.setdefault(spec.name, spec.key()) != spec.key():
+            raise ValueError(f"config name '{spec.name}' used by two different specs")
+        check_required(spec, general)
+    lines = ["[General]", f"network = {NETWORK}"]
+    lines += [f"{k} = {format_value(v, unit='s' if k in SECONDS_OPTIONS else None)}"
+              for k, v in (general or {}).items()]
+    text = "\n".join(lines) + "\n"
+    seen = set()
+    for spec in specs:
+        if spec.name not in seen:
+            seen.add(spec.name)
+            text += "\n" + spec.section()
+    return text
+
+
+def check_required(spec, general=None):
+    """Reject a spec that leaves a required User parameter unset (no users, no check)"""
+    given = {k: v for k, v in (general or {}).items()}
+    given.update(spec.params)
+    bare = {name.rsplit('.', 1)[-1]: value for name, value in given.items()}
+    if str(bare.get('numUsers', '')).strip() == '0':
+        return
+    missing = [name for name in REQUIRED_PARAMS if name not in bare]
+    if missing:
+        raise ValueError(f"config '{spec.name}' does not set {', '.join(missing)} (no NED default)")
+
+
+def write_batch_ini(specs, path, general=None):
+    """Whole design in a single ini file, each spec runnable with -c <name>"""
+    path = Path(path)
+    path.write_text(render_ini(specs, general))
+    return path
+
+
+def dedupe(specs):
+    """Drop specs identical to an earlier one (same key), keeping the order"""
+    seen = set()
+    unique = []
+    for spec in specs:
+        key = spec.key()
+        if key not in seen:
+            seen.add(key)
+            unique.append(spec)
+    return unique
+
+
+# ---------------------------------------------------------------------------
+# Designs: each returns a list of {parameter: value} points
+# ---------------------------------------------------------------------------
+
+def grid(**levels):
+    """Full factorial: grid(numUsers=[100, 500], readProbability=[0.3, 0.8])"""
+    names = list(levels)
+    return [dict(zip(names, values)) for values in itertools.product(*(levels[n] for n in names))]
+
+
+def fractional_factorial(factors, generators):
+    """
+    2-level fractional factorial 2^(k-p). factors: {name: (low, high)};
+    generators: {generated factor: base factors whose product aliases it},
+    e.g. {'serviceTime': ('numUsers', 'lambda', 'readProbability')} gives the
+    resolution IV 2^(4-1) design. Base factors run a full 2^(k-p) in
+    standard order.
+    """
+    base = [f for f in factors if f not in generators]
+    for name, word in generators.items():
+        if name not in factors:
+            raise ValueError(f"generated factor '{name}' has no levels")
+        unknown = [f for f in word if f not in base]
+        if unknown or not word:
+            raise ValueError(f"generator of '{name}' must be a product of base factors, got {word}")
+    # Standard (Yates) order: the first base factor alternates fastest
+    signs = np.array(list(itertools.product((-1, 1), repeat=len(base))))[:, ::-1]
+    columns = {name: signs[:, i] for i, name in enumerate(base)}
+    for name, word in generators.items():
+        columns[name] = np.prod([columns[f] for f in word], axis=0)
+    points = []
+    for row in range(len(signs)):
+        point = {}
+        for name in factors:
+            low, high = factors[name]
+            point[name] = high if columns[name][row] > 0 else low
+        points.append(point)
+    return points
+
+
+def latin_hypercube(ranges, n, seed=None, integer=()):
+    """
+    n-point Latin hypercube. ranges: {name: (low, high)} for continuous
+    factors (rounded for names in `integer`) or {name: [levels...]} for
+    discrete ones; every one of the n strata of each factor is hit once.
+    """
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for name, spec in ranges.items():
+        u = (rng.permutation(n) + rng.random(n)) / n
+        if isinstance(spec, tuple) and len(spec) == 2:
+            low, high = spec
+            values = low + u * (high - low)
+            samples[name] = [int(round(v)) for v in values] if name in integer else [float(v) for v in values]
+        else:
+            levels = list(spec)
+            samples[name] = [levels[min(int(x * len(levels)), len(levels) - 1)] for x in u]
+    return [{name: samples[name][i] for name in ranges} for i in range(n)]
+
+
+def spec_name(prefix, point):
+    """Config name from a design point: Lhs_numUsers250_readProbability0p4"""
+    parts = [prefix]
+    for name, value in point.items():
+        text = format_value(value)
+        parts.append(re.sub(r'[^A-Za-z0-9]', '', name.rsplit('.', 1)[-1]) +
+                     re.sub(r'[^A-Za-z0-9]', '', text.replace('.', 'p').replace('-', 'm')))
+    return "_".join(parts)
+
+
+def design_specs(points, prefix, params=None, options=None, repeat=1):
+    """Specs for design points on top of the shared params/options, deduplicated"""
+    specs = []
+    for point in points:
+        specs.append(RunSpec(spec_name(prefix, point), {**(params or {}), **point}, dict(options or {}), repeat))
+    return dedupe(specs)
+
+
+# ---------------------------------------------------------------------------
+# Execution
+# ---------------------------------------------------------------------------
+
+@dataclass
+class RunResult:
+    spec: RunSpec
+    returncode: int          # None on timeout / launch error
+    output: str
+    files: list              # artifacts copied out (ini, .sca, .vec, .snap.csv)
+    elapsed: float
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+    def sca_files(self):
+        return [p for p in self.files if p.suffix == '.sca']
+
+
+class Launcher:
+    """Runs specs with the exam executable, each in its own temporary directory"""
+
+    def __init__(self, base_dir=".", timeout=3600, jobs=None):
+        # base_dir: the simulations directory (next to src/ and out/)
+        self.base_dir = Path(base_dir).resolve()
+        self.executable = self.base_dir.parent / "out/clang-release/src/exam"
+        self.ned_path = self.base_dir.parent / "src"
+        self.timeout = timeout
+        self.jobs = jobs
+
+    def launch(self, spec, artifacts_dir, run=None, general=None):
+        """
+        Run one spec (all repetitions, or only `run`) and copy the ini and the
+        result files into artifacts_dir. result-dir is forced to the private
+        directory, so parallel launches never share output files.
+        """
+        artifacts_dir = Path(artifacts_dir)
+        artifacts_dir.mkdir(parents=True, exist_ok=True)
+        work_dir = Path(tempfile.mkdtemp(prefix=f"{spec.name}_"))
+        start = time.perf_counter()
+        try:
+            ini_path = spec.with_options(**{'result-dir': str(work_dir / "results")}).write_ini(
+                work_dir / f"{spec.name}.ini", general)
+            try:
+                result = subprocess.run(spec.argv(self.executable, self.ned_path, ini_path, run),
+                                        cwd=str(work_dir), capture_output=True, text=True,
+                                        timeout=self.timeout)
+                returncode, output = result.returncode, result.stdout + result.stderr
+            except subprocess.TimeoutExpired:
+                returncode, output = None, f"timeout (>{self.timeout}s)"
+            except OSError as e:
+                returncode, output = None, str(e)
+            files = []
+            for path in [ini_path] + sorted((work_dir / "results").glob("*")):
+                if path.is_file():
+                    files.append(Path(shutil.copy2(path, artifacts_dir / path.name)))
+            return RunResult(spec, returncode, output, files, time.perf_counter() - start)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def run_all(self, specs, artifacts_dir, general=None, on_done=None):
+        """
+        Launch many specs in parallel (jobs workers, default one per CPU);
+        results come back in input order. on_done(result) is called as each
+        run finishes, from the worker thread.
+        """
+        def task(spec):
+            result = self.launch(spec, artifacts_dir, general=general)
+            if on_done:
+                on_done(result)
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return list(pool.map(task, specs))
+
+
+def point_warmup(params, default):
+    """Catalog warm-up of the Uniform/Lognormal sweep point nearest to params"""
+    dist = str(params.get('tableDistribution', 'uniform')).capitalize()
+    itervars = {'N': params['numUsers']} if 'numUsers' in params else {}
+    if 'readProbability' in params:
+        itervars['p'] = params['readProbability']
+    return lookup_warmup(dist, itervars, default=default)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate (and optionally run) a design over DatabaseNetwork")
+    parser.add_argument('--design', choices=['grid', 'fractional', 'lhs'], default='grid')
+    parser.add_argument('--points', type=int, default=10, help="Latin hypercube size")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--sim-time', type=float, default=10000)
+    parser.add_argument('--warmup', type=float, default=500,
+                        help="warm-up of points without a results_catalog.json entry (seconds)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help="write the design as one ini file instead of printing it")
+    parser.add_argument('--run', metavar='DIR', help="run the design, artifacts in DIR")
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.design == 'grid':
+        points = grid(tableDistribution=['uniform', 'lognormal'], numUsers=[100, 500, 1000, 2000],
+                      readProbability=[0.3, 0.5, 0.8])
+    elif args.design == 'fractional':
+        points = fractional_factorial(
+            {'numUsers': (100, 2000), 'numTables': (10, 20), 'readProbability': (0.3, 0.8),
+             'tableDistribution': ('uniform', 'lognormal')},
+            {'tableDistribution': ('numUsers', 'numTables', 'readProbability')})
+    else:
+        points = latin_hypercube({'numUsers': (100, 2000), 'readProbability': (0.2, 0.9),
+                                  'tableDistribution': ['uniform', 'lognormal']},
+                                 args.points, seed=args.seed, integer={'numUsers'})
+    options = {'sim-time-limit': args.sim_time, 'warmup-period': args.warmup, 'seed-set': '${repetition}'}
+    specs = design_specs(points, args.design.capitalize(),
+                         # lognormalM/S as in [Config Lognormal] (unused by uniform points)
+                         params={'numTables': 20, 'lambda': 0.05, 'serviceTime': 0.1,
+                                 'lognormalM': 1.5, 'lognormalS': 1.0},
+                         options=options, repeat=args.repeat)
+    # Warm-up per point from warmup_detection.py (results_catalog.json)
+    specs = [spec.with_options(**{'warmup-period': point_warmup(spec.params, args.warmup)}) for spec in specs]
+    print(f"{len(points)} punti, {len(specs)} configurazioni distinte", file=sys.stderr)
+
+    if args.run:
+        launcher = Launcher(timeout=3600, jobs=args.jobs)
+        results = launcher.run_all(specs, args.run,
+                                   on_done=lambda r: print(f"{'✓' if r.ok else '✗'} {r.spec.name} "
+                                                           f"({r.elapsed:.1f}s)", file=sys.stderr))
+        return 0 if all(r.ok for r in results) else 1
+    if args.output:
+        write_batch_ini(specs, args.output)
+        print(f"✓ Salvato: {args.output}", file=sys.stderr)
+    else:
+        print(render_ini(specs), end="")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
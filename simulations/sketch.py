@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Merge the wait-time quantile sketches recorded by User/Table (WaitSketch.h)
+and report p50/p95/p99 per configuration with vectors turned off.
+
+Each module writes a scalar "<name>.sketch" whose value is the sample count
+and whose attributes hold the DDSketch state (gamma, zeroCount, bins as
+"index:count,..."). Sketches with the same gamma merge exactly by adding
+bucket counts, so users, tables and replications of a config point combine
+into one distribution with the same relative accuracy.
+
+Usage:
+    python3 sketch.py [results_dir] [--scalar waitTime.sketch]
+"""
+
+import argparse
+import math
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from results_catalog import config_key
+
+USER_SKETCH = 'waitTime.sketch'
+TABLE_SKETCH = 'table.waitingTime.sketch'
+
+
+class DDSketch:
+    """Python mirror of WaitSketch: log-spaced buckets, mergeable counts"""
+
+    def __init__(self, gamma):
+        self.gamma = gamma
+        self.zero_count = 0
+        self.bins = Counter()
+
+    @classmethod
+    def from_attributes(cls, attrs):
+        sketch = cls(float(attrs['gamma']))
+        sketch.zero_count = int(attrs.get('zeroCount', 0))
+        for item in filter(None, attrs.get('bins', '').split(',')):
+            index, count = item.split(':')
+            sketch.bins[int(index)] += int(count)
+        return sketch
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.bins.values())
+
+    def merge(self, other):
+        if not math.isclose(self.gamma, other.gamma, rel_tol=1e-12):
+            raise ValueError(f"Cannot merge sketches with gamma {self.gamma} and {other.gamma}")
+        self.zero_count += other.zero_count
+        self.bins.update(other.bins)
+        return self
+
+    def quantile(self, q):
+        count = self.count
+        if count == 0:
+            return float('nan')
+        rank = q * (count - 1)
+        if self.zero_count > rank:
+            return 0.0
+        seen = self.zero_count
+        index = None
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                break
+        return 2.0 * self.gamma ** index / (self.gamma + 1.0)
+
+
+def iter_sca_sketches(filepath, scalar=USER_SKETCH):
+    """
+    Yield (run_attrs, module, sketch) for every matching sketch scalar in a
+    .sca file. attr lines after "run" belong to the run, after "scalar" to
+    the scalar.
+    """
+    run_attrs, current = {}, None
+
+    def flush():
+        if current is not None:
+            return DDSketch.from_attributes(current[1])
+        return None
+
+    with open(filepath, 'r') as f:
+        for line in f:
+            parts = line.split(None, 2)
+            if not parts:
+                continue
+            if parts[0] == 'attr' and len(parts) == 3:
+                value = parts[2].strip().strip('"')
+                (current[1] if current is not None else run_attrs)[parts[1]] = value
+                continue
+            sketch = flush()
+            if sketch is not None:
+                yield run_attrs, current[0], sketch
+            current = None
+            if parts[0] == 'run':
+                run_attrs = {}
+            elif parts[0] == 'scalar' and len(parts) == 3 and parts[2].split()[0] == scalar:
+                current = (parts[1], {})
+        sketch = flush()
+        if sketch is not None:
+            yield run_attrs, current[0], sketch
+
+
+def merge_file_sketches(filepath, scalar=USER_SKETCH):
+    """All sketches of one .sca file (one replication) merged, None if it has none"""
+    merged = None
+    for _, _, sketch in iter_sca_sketches(filepath, scalar):
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged
+
+
+def merge_sketches(results_dir, scalar=USER_SKETCH):
+    """{config key: (merged DDSketch, number of runs)} over all .sca files"""
+    merged, runs = {}, defaultdict(set)
+    for sca_file in sorted(Path(results_dir).rglob("*.sca")):
+        for run_attrs, _, sketch in iter_sca_sketches(sca_file, scalar):
+            key = config_key(run_attrs.get('configname', sca_file.stem), run_attrs.get('iterationvars', ''))
+            runs[key].add(sca_file)
+            if key in merged:
+                merged[key].merge(sketch)
+            else:
+                merged[key] = sketch
+    return {key: (sketch, len(runs[key])) for key, sketch in merged.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merged wait-time quantiles from recorded sketches")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--scalar', default=None,
+                        help=f"sketch scalar name (default: {USER_SKETCH} and {TABLE_SKETCH})")
+    args = parser.parse_args()
+
+    scalars = [args.scalar] if args.scalar else [USER_SKETCH, TABLE_SKETCH]
+    found = False
+    for scalar in scalars:
+        merged = merge_sketches(args.results_dir, scalar)
+        if not merged:
+            continue
+        found = True
+        print(f"\n{scalar}")
+        print(f"{'Config':<40} {'runs':>5} {'samples':>10} {'p50':>10} {'p95':>10} {'p99':>10}")
+        print("-" * 90)
+        for key, (sketch, num_runs) in sorted(merged.items()):
+            print(f"{key[:40]:<40} {num_runs:>5} {sketch.count:>10} {sketch.quantile(0.50):>10.4f} "
+                  f"{sketch.quantile(0.95):>10.4f} {sketch.quantile(0.99):>10.4f}")
+
+    if not found:
+        print(f"Nessuno sketch trovato in {args.results_dir} (recordWaitSketch = false?)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
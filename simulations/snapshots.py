@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Reader for the in-run snapshot files (*.snap.csv) written by User/Table when
+snapshotInterval > 0, plus an early convergence/instability check.
+
+Each row holds a module's cumulative counters at a snapshot time:
+    time,module,served,waitSum,busyTime,maxQueue,arrivals,queueLength
+Differences between consecutive snapshots give per-interval throughput,
+arrival rate and mean wait, so partial results of killed or timed-out runs
+stay usable; queueLength is the instantaneous queue (files written before
+it existed read it as 0).
+
+Usage:
+    python3 snapshots.py [results_dir] [--warmup 500] [--tolerance 0.05]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from batch_means import batch_means
+
+MIN_INTERVALS = 10       # post-warm-up intervals needed before any verdict
+TOLERANCE = 0.05         # relative CI half-width for convergence
+
+
+def read_snapshots(path):
+    """Snapshot rows as a DataFrame; a partially written last snapshot is dropped"""
+    df = pd.read_csv(path, on_bad_lines='skip')
+    df = df.dropna(subset=['time', 'module'])
+    if df.empty:
+        return df
+    # The run may have been killed while writing the last snapshot
+    rows_per_time = df.groupby('time')['module'].count()
+    complete = rows_per_time[rows_per_time >= rows_per_time.max()].index
+    return df[df['time'].isin(complete)]
+
+
+def system_series(df):
+    """
+    Per-snapshot system totals: served/busyTime/maxQueue from the tables,
+    completed responses and wait sum from the users.
+    """
+    df = df.reindex(columns=df.columns.union(['arrivals', 'queueLength'], sort=False))
+    tables = df[df['module'].str.contains(r'\.table\[')]
+    users = df[df['module'].str.contains(r'\.user\[')]
+    series = pd.DataFrame({
+        'served': tables.groupby('time')['served'].sum(),
+        'busyTime': tables.groupby('time')['busyTime'].sum(),
+        'maxQueue': tables.groupby('time')['maxQueue'].max(),
+        'queueLength': tables.groupby('time')['queueLength'].sum(),
+        'arrivals': users.groupby('time')['arrivals'].sum(),
+        'responses': users.groupby('time')['served'].sum(),
+        'waitSum': users.groupby('time')['waitSum'].sum(),
+    }).sort_index()
+    return series.fillna(0.0)
+
+
+def interval_series(series):
+    """Per-interval throughput and mean response wait from consecutive snapshots"""
+    times = series.index.to_numpy(dtype=float)
+    delta = series.diff().iloc[1:]
+    dt = np.diff(times)
+    out = pd.DataFrame({
+        'start': times[:-1],
+        'end': times[1:],
+        'throughput': delta['served'].to_numpy() / dt,
+        'responses': delta['responses'].to_numpy(),
+        'waitSum': delta['waitSum'].to_numpy(),
+        'maxQueue': series['maxQueue'].to_numpy()[1:],
+        'arrivalRate': delta['arrivals'].to_numpy() / dt,
+        'queueLength': series['queueLength'].to_numpy()[1:],
+    })
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out['meanWait'] = out['waitSum'] / out['responses']
+    return out
+
+
+def assess(intervals, warmup=0.0, tolerance=TOLERANCE, min_intervals=MIN_INTERVALS):
+    """
+    Early verdict on a (possibly still running) replication:
+      - 'unstable'  : the post-warm-up interval mean wait grows significantly
+                      over time and the max queue keeps increasing
+      - 'converged' : batch-means CI of the mean wait within tolerance
+      - 'running'   : not enough evidence yet
+    Returns dict with status, mean_wait, half_width, intervals.
+    """
+    post = intervals[(intervals['start'] >= warmup) & (intervals['responses'] > 0)]
+    result = {'status': 'running', 'mean_wait': float('nan'), 'half_width': float('nan'),
+              'intervals': len(post)}
+    if len(post) == 0:
+        return result
+
+    bm = batch_means(post['waitSum'].to_numpy(), post['responses'].to_numpy(), min_batches=5)
+    result['mean_wait'], result['half_width'] = bm['mean'], bm['half_width']
+    if len(post) < min_intervals:
+        return result
+
+    # Instability: significant upward trend in the second half of the window,
+    # growing by more than tolerance over it, with the max queue still rising
+    recent = post.iloc[len(post) // 2:]
+    trend = stats.linregress(recent['end'], recent['meanWait'])
+    growth = trend.slope * (recent['end'].iloc[-1] - recent['end'].iloc[0])
+    queue_rising = recent['maxQueue'].iloc[-1] > recent['maxQueue'].iloc[0]
+    if trend.pvalue < 0.01 and growth > tolerance * max(bm['mean'], 1e-12) and queue_rising:
+        result['status'] = 'unstable'
+    elif bm['mean'] > 0 and bm['half_width'] / bm['mean'] <= tolerance:
+        result['status'] = 'converged'
+    return result
+
+
+def assess_file(path, warmup=0.0, tolerance=TOLERANCE, min_intervals=MIN_INTERVALS):
+    df = read_snapshots(path)
+    if df.empty or df['time'].nunique() < 2:
+        return {'status': 'running', 'mean_wait': float('nan'), 'half_width': float('nan'),
+                'intervals': 0, 'last_time': float(df['time'].max()) if not df.empty else 0.0}
+    series = system_series(df)
+    result = assess(interval_series(series), warmup, tolerance, min_intervals)
+    result['last_time'] = float(series.index.max())
+    result['served'] = float(series['served'].iloc[-1])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partial results and early verdicts from snapshot files")
+    parser.add_argument('results_dir', nargs='?', default='results')
+    parser.add_argument('--warmup', type=float, default=500)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    files = sorted(Path(args.results_dir).rglob("*.snap.csv"))
+    if not files:
+        print(f"Nessun file .snap.csv trovato in {args.results_dir}")
+        return 1
+
+    print(f"{'Run':<40} {'t [s]':>8} {'served':>10} {'wait':>10} {'± CI':>10}  status")
+    print("-" * 92)
+    for path in files:
+        res = assess_file(path, args.warmup, args.tolerance)
+        print(f"{path.name[:40]:<40} {res['last_time']:>8.0f} {res.get('served', 0):>10.0f} "
+              f"{res['mean_wait']:>10.4f} {res['half_width']:>10.4f}  {res['status']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Adaptive sweep planner for the (N, p) capacity curve.
+
+Instead of the hand-picked N grid in omnetpp.ini, the planner starts from a
+coarse grid, fits a monotone PCHIP interpolant of log10(wait) along N for each
+p and keeps adding the point whose estimated interpolation error (curvature
+plus CI uncertainty) is largest, until the run budget is spent. Points end up
+clustered around the saturation knee, where wait time explodes.
+
+With --snapshot-interval each replication writes in-run snapshots
+(snapshots.py) and is stopped as soon as its mean wait has converged or the
+system is clearly unstable (saturated), instead of running to sim-time-limit.
+
+Usage:
+    python3 sweep_planner.py --dist uniform --budget 120 [--snapshot-interval 100]
+"""
+
+import argparse
+import csv
+import math
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.interpolate import PchipInterpolator
+
+from run_specs import RunSpec
+from plot_results import parse_sca_file, aggregate_statistics, calculate_ci
+from results_catalog import lookup_warmup
+from snapshots import assess_file
+
+# Same ranges as [Config Uniform] / [Config Lognormal] in omnetpp.ini
+DEFAULT_COARSE_N = [100, 1500, 3000, 5000]
+DEFAULT_P = [0.3, 0.5, 0.8]
+MIN_N_STEP = 25          # do not bisect N intervals narrower than this
+WAIT_FLOOR = 1e-3        # seconds, keeps log10 finite for idle configs
+
+
+def to_log_wait(wait, ci):
+    """Map a wait time and its CI half-width to log10 units."""
+    y = math.log10(wait + WAIT_FLOOR)
+    h = ci / ((wait + WAIT_FLOOR) * math.log(10))
+    return y, h
+
+
+class AdaptiveSweep:
+    """Refinement state: measured points and candidate scoring."""
+
+    def __init__(self, measure, p_levels, coarse_n, budget, runs_per_point=1,
+                 uncertainty_weight=1.0):
+        self.measure = measure              # callable (N, p) -> (wait_s, ci_s)
+        self.p_levels = sorted(p_levels)
+        self.coarse_n = sorted(coarse_n)
+        self.budget = budget
+        self.runs_per_point = runs_per_point
+        self.uncertainty_weight = uncertainty_weight
+        self.points = {}                    # (N, p) -> (y, h, wait, ci)
+        self.runs_used = 0
+
+    def coarse_cost(self):
+        return len(self.coarse_n) * len(self.p_levels) * self.runs_per_point
+
+    def check_budget(self):
+        """The coarse grid must fit in the budget and leave runs for refinement."""
+        cost = self.coarse_cost()
+        if cost >= self.budget:
+            raise ValueError(
+                f"coarse grid needs {cost} runs ({len(self.coarse_n)} N × {len(self.p_levels)} p × "
+                f"{self.runs_per_point} repeat) but the budget is {self.budget}: raise --budget or "
+                f"use fewer --coarse-n/--p values or a lower --repeat")
+
+    def run_point(self, n, p):
+        if (n, p) in self.points:
+            return
+        wait, ci = self.measure(n, p)
+        self.runs_used += self.runs_per_point
+        y, h = to_log_wait(wait, ci)
+        self.points[(n, p)] = (y, h, wait, ci)
+        print(f"  N={n:<6} p={p:<5} wait={wait:.4f}s ±{ci:.4f}  "
+              f"[{self.runs_used}/{self.budget} runs]")
+
+    def curve(self, p):
+        """Sorted (N, y, h) arrays of the points measured at read probability p."""
+        pts = sorted((n, v[0], v[1]) for (n, pp), v in self.points.items() if pp == p)
+        if not pts:
+            return np.array([]), np.array([]), np.array([])
+        n, y, h = zip(*pts)
+        return np.array(n, dtype=float), np.array(y), np.array(h)
+
+    def surrogate(self, p):
+        n, y, _ = self.curve(p)
+        if len(n) < 2:
+            return None
+        return PchipInterpolator(n, y, extrapolate=True)
+
+    def knee(self, p):
+        """N where the fitted log-wait curve rises fastest (the saturation knee)."""
+        fit = self.surrogate(p)
+        if fit is None:
+            return None
+        n, _, _ = self.curve(p)
+        grid = np.linspace(n[0], n[-1], 512)
+        return float(grid[np.argmax(fit.derivative()(grid))])
+
+    def n_candidates(self, p):
+        """Interval midpoints along N, scored by linear-interpolation error."""
+        n, y, h = self.curve(p)
+        if len(n) < 2:
+            return []
+        slopes = np.diff(y) / np.diff(n)
+        # Second divided differences at interior nodes, padded at the ends
+        curv = np.zeros(len(n))
+        if len(n) > 2:
+            curv[1:-1] = np.abs(np.diff(slopes)) / ((n[2:] - n[:-2]) / 2.0)
+            curv[0], curv[-1] = curv[1], curv[-2]
+        candidates = []
+        for i in range(len(n) - 1):
+            width = n[i + 1] - n[i]
+            if width < 2 * MIN_N_STEP:
+                continue
+            error = width ** 2 / 8.0 * max(curv[i], curv[i + 1])
+            uncertainty = 0.5 * (h[i] + h[i + 1])
+            score = error + self.uncertainty_weight * uncertainty
+            mid = int(round((n[i] + n[i + 1]) / 2.0))
+            candidates.append((score, [(mid, p)]))
+        return candidates
+
+    def is_complete(self, p):
+        return all((n, p) in self.points for n in self.coarse_n)
+
+    def p_candidates(self):
+        """New p levels between neighbours whose curves disagree most at the knee."""
+        levels = [p for p in self.p_levels if self.is_complete(p)]
+        candidates = []
+        for i in range(len(levels) - 1):
+            pa, pb = levels[i], levels[i + 1]
+            pm = round((pa + pb) / 2.0, 3)
+            if pm in self.p_levels or pm in (pa, pb):
+                continue
+            fa, fb = self.surrogate(pa), self.surrogate(pb)
+            knee = 0.5 * (self.knee(pa) + self.knee(pb))
+            # Error of interpolating linearly across p at the knee: half the
+            # gap between the neighbouring curves, or the three-level second
+            # difference when a further neighbour exists.
+            ya, yb = float(fa(knee)), float(fb(knee))
+            error = 0.5 * abs(ya - yb)
+            if len(levels) > 2:
+                j = i + 2 if i + 2 < len(levels) else i - 1
+                yc = float(self.surrogate(levels[j])(knee))
+                spacing = abs(levels[j] - (pb if j > i else pa))
+                curv = abs(ya - 2 * yb + yc) if j > i else abs(yc - 2 * ya + yb)
+                error = max(error, (pb - pa) ** 2 / 8.0 * curv / max(spacing, 1e-9) ** 2)
+            # A new level is a complete curve: coarse grid plus the knee
+            points = [(n, pm) for n in self.coarse_n] + [(int(round(knee)), pm)]
+            candidates.append((error, points))
+        return candidates
+
+    def plan(self, tolerance=0.0):
+        self.check_budget()
+        print(f"Coarse grid ({self.coarse_cost()}/{self.budget} runs)...")
+        for p in self.p_levels:
+            for n in self.coarse_n:
+                self.run_point(n, p)
+
+        print("Refinement...")
+        while self.runs_used < self.budget:
+            candidates = []
+            for p in self.p_levels:
+                candidates.extend(self.n_candidates(p))
+            candidates.extend(self.p_candidates())
+            affordable = [
+                (score / len(points), points) for score, points in candidates
+                if len(points) * self.runs_per_point <= self.budget - self.runs_used
+                and any(pt not in self.points for pt in points)
+            ]
+            if not affordable:
+                break
+            score, points = max(affordable, key=lambda c: c[0])
+            if score <= tolerance:
+                break
+            for n, p in points:
+                if p not in self.p_levels:
+                    self.p_levels.append(p)
+                    self.p_levels.sort()
+                self.run_point(n, p)
+
+        return self.points
+
+
+class SimulatorBackend:
+    """Runs one (N, p) point with the exam executable, like ConsistencyTester."""
+
+    def __init__(self, dist, base_dir=".", sim_time=10000, warmup=500, repeat=5, timeout=3600,
+                 snapshot_interval=0, poll=5.0):
+        self.dist = dist
+        self.base_dir = Path(base_dir).resolve()
+        self.results_dir = self.base_dir / "results_adaptive"
+        self.executable = self.base_dir.parent / "out/clang-release/src/exam"
+        self.ned_path = str(self.base_dir.parent / "src") + ":."
+        self.sim_time = sim_time
+        self.warmup = warmup
+        self.repeat = repeat
+        self.timeout = timeout
+        self.snapshot_interval = snapshot_interval   # 0 = run every replication to the end
+        self.poll = poll
+        self.current_warmup = warmup               # warm-up of the point being run
+
+    def setup(self):
+        self.results_dir.mkdir(exist_ok=True, parents=True)
+        if not self.executable.exists():
+            print(f"ERROR: Executable not found at {self.executable}")
+            return False
+        return True
+
+    def config_name(self, n, p):
+        return f"{self.dist.capitalize()}_N{n}_p{int(round(p * 1000))}"
+
+    def create_config(self, n, p):
+        config_name = self.config_name(n, p)
+        config_path = self.results_dir / f"{config_name}.ini"
+        params = {
+            'numUsers': n,
+            'numTables': 20,
+            'lambda': 0.05,
+            'serviceTime': 0.1,
+            'readProbability': p,
+            'tableDistribution': self.dist,
+        }
+        if self.dist == "lognormal":
+            params.update(lognormalM=1.5, lognormalS=1.0)
+        if self.snapshot_interval:
+            params['snapshotInterval'] = self.snapshot_interval
+        # Warm-up detected by warmup_detection.py for this (or the nearest) point
+        warmup = lookup_warmup(self.dist.capitalize(), {"N": n, "p": p}, default=self.warmup)
+        self.current_warmup = warmup
+
+        RunSpec(config_name, params, {
+            'sim-time-limit': self.sim_time,
+            'warmup-period': warmup,
+            'seed-set': '${repetition}',
+            'result-dir': self.results_dir,
+            'output-scalar-file': '${resultdir}/${configname}-${repetition}.sca',
+            '**.vector-recording': False,
+        }, repeat=self.repeat).write_ini(config_path)
+        return config_path, config_name
+
+    def run_watched(self, config_path, config_name, run):
+        """
+        One replication, stopped early once its snapshots show convergence or
+        instability. Returns the snapshot wait estimate (post-warm-up mean over
+        served requests) whether the run was stopped or finished: a finished
+        run is judged from its final snapshot, so every replication of a point
+        uses the same estimator.
+        """
+        cmd = [str(self.executable), "-u", "Cmdenv", "-n", self.ned_path,
+               "-c", config_name, "-r", str(run), str(config_path)]
+        snap_file = self.results_dir / f"{config_name}-{run}.snap.csv"
+        snap_file.unlink(missing_ok=True)          # never judge a stale file from an older sweep
+        proc = subprocess.Popen(cmd, cwd=str(self.base_dir), stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, text=True)
+        start = time.time()
+        while proc.poll() is None:
+            time.sleep(self.poll)
+            if time.time() - start > self.timeout:
+                proc.kill()
+                proc.wait()
+                raise RuntimeError(f"{config_name} run {run} timed out")
+            if not snap_file.exists():
+                continue
+            verdict = assess_file(snap_file, warmup=self.current_warmup)
+            if verdict["status"] in ("converged", "unstable"):
+                proc.kill()
+                proc.wait()
+                print(f"    run {run}: {verdict['status']} at t={verdict['last_time']:.0f}s")
+                return verdict["mean_wait"]
+        if proc.returncode != 0:
+            raise RuntimeError(f"{config_name} run {run} failed: {proc.stderr.read()[-500:]}")
+        verdict = assess_file(snap_file, warmup=self.current_warmup) if snap_file.exists() else None
+        if verdict is None or math.isnan(verdict["mean_wait"]):
+            raise RuntimeError(f"{config_name} run {run}: no post-warm-up snapshot intervals in {snap_file.name}")
+        return verdict["mean_wait"]
+
+    def __call__(self, n, p):
+        config_path, config_name = self.create_config(n, p)
+        if self.snapshot_interval:
+            waits = [self.run_watched(config_path, config_name, run) for run in range(self.repeat)]
+            return calculate_ci(waits)
+
+        cmd = [str(self.executable), "-u", "Cmdenv", "-n", self.ned_path,
+               "-c", config_name, str(config_path)]
+        result = subprocess.run(cmd, cwd=str(self.base_dir), capture_output=True,
+                                text=True, timeout=self.timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"{config_name} failed: {result.stderr[-500:]}")
+
+        waits = []
+        for sca_file in sorted(self.results_dir.glob(f"{config_name}-*.sca")):
+            waits.append(aggregate_statistics(parse_sca_file(sca_file))["avg_wait_time"])
+        if not waits:
+            raise RuntimeError(f"No .sca files produced for {config_name}")
+        return calculate_ci(waits)
+
+
+def save_plan(points, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["N", "p", "wait_s", "ci_s", "log10_wait"])
+        for (n, p), (y, _, wait, ci) in sorted(points.items(), key=lambda kv: (kv[0][1], kv[0][0])):
+            writer.writerow([n, p, f"{wait:.6f}", f"{ci:.6f}", f"{y:.6f}"])
+    print(f"✓ Sweep saved: {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive (N, p) sweep around the saturation knee")
+    parser.add_argument("--dist", choices=["uniform", "lognormal"], default="uniform")
+    parser.add_argument("--budget", type=int, default=120, help="total simulation runs (points × repeat)")
+    parser.add_argument("--coarse-n", type=int, nargs="+", default=DEFAULT_COARSE_N)
+    parser.add_argument("--p", type=float, nargs="+", default=DEFAULT_P)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--sim-time", type=float, default=10000)
+    parser.add_argument("--warmup", type=float, default=500)
+    parser.add_argument("--tolerance", type=float, default=0.01,
+                        help="stop when the best score (log10 units) drops below this")
+    parser.add_argument("--snapshot-interval", type=float, default=0,
+                        help="seconds between in-run snapshots; stops replications early (0 = off)")
+    args = parser.parse_args()
+
+    sweep = AdaptiveSweep(None, args.p, args.coarse_n, args.budget, runs_per_point=args.repeat)
+    try:
+        sweep.check_budget()
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    backend = SimulatorBackend(args.dist, sim_time=args.sim_time, warmup=args.warmup, repeat=args.repeat,
+                               snapshot_interval=args.snapshot_interval)
+    if not backend.setup():
+        return 1
+
+    sweep.measure = backend
+    points = sweep.plan(tolerance=args.tolerance)
+    save_plan(points, backend.results_dir / f"adaptive_sweep_{args.dist}.csv")
+
+    for p in sweep.p_levels:
+        knee = sweep.knee(p)
+        if knee is not None:
+            print(f"  p={p}: knee at N≈{knee:.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
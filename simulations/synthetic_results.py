@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Synthetic OMNeT++ results for benchmarking the analysis pipeline.
+
+Writes .sca and .vec files in the same text format (version 3) and with the
+same run attributes, itervars, config lines and scalar/vector names as the
+exam simulation, for arbitrary N, M, p, distributions and repetitions.
+Values follow a rough per-table M/D/1 model so that wait time grows with the
+load like in the real sweeps; they are realistic in shape, not in detail.
+
+Usage:
+    python3 synthetic_results.py out_dir --users 100 1000 --tables 20 --reps 5 [--vec]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+LAMBDA = 0.05
+SERVICE_TIME = 0.1
+SIM_TIME = 10000.0
+WARMUP = 500.0
+
+
+def expected_wait(n_users, n_tables, p, dist):
+    """Rough mean wait: M/D/1 per table, writes serialize, hotspots load table 0 more"""
+    rho = n_users * LAMBDA * SERVICE_TIME / n_tables
+    rho *= (1.0 - p) + p * 0.5          # concurrent reads relieve the table
+    if dist == 'Lognormal':
+        rho *= 3.0
+    if rho >= 1.0:
+        return SERVICE_TIME * (1.0 + 50.0 * rho)   # saturated: wait keeps growing
+    return SERVICE_TIME + rho * SERVICE_TIME / (2.0 * (1.0 - rho))
+
+
+def run_header(f, dist, n_users, n_tables, p, rep, runnumber):
+    itervars = f"$N={n_users}, $p={p}"
+    f.write("version 3\n")
+    f.write(f"run {dist}-{runnumber}-20250101-00:00:00-{1000 + runnumber}\n")
+    f.write(f"attr configname {dist}\n")
+    f.write("attr datetime 20250101-00:00:00\n")
+    f.write(f"attr experiment {dist}\n")
+    f.write("attr inifile omnetpp.ini\n")
+    f.write(f'attr iterationvars "{itervars}"\n')
+    f.write(f'attr measurement "{itervars}"\n')
+    f.write("attr network progetto.DatabaseNetwork\n")
+    f.write(f"attr repetition {rep}\n")
+    f.write(f'attr replication #{rep}\n')
+    f.write(f"attr runnumber {runnumber}\n")
+    f.write(f"attr seedset {rep}\n")
+    f.write(f"itervar N {n_users}\n")
+    f.write(f"itervar p {p}\n")
+    f.write("config network progetto.DatabaseNetwork\n")
+    f.write(f"config sim-time-limit {SIM_TIME:g}s\n")
+    f.write(f"config warmup-period {WARMUP:g}s\n")
+    f.write(f"config *.numUsers {n_users}\n")
+    f.write(f"config *.numTables {n_tables}\n")
+    f.write(f"config *.user[*].readProbability {p}\n")
+    f.write(f'config *.user[*].tableDistribution "{dist.lower()}"\n')
+    f.write(f"config *.user[*].lambda {LAMBDA}\n")
+    f.write(f"config *.user[*].serviceTime {SERVICE_TIME}s\n")
+    f.write("\n")
+
+
+def write_sca(path, dist, n_users, n_tables, p, rep, runnumber, rng):
+    mean_wait = expected_wait(n_users, n_tables, p, dist)
+    with open(path, 'w') as f:
+        run_header(f, dist, n_users, n_tables, p, rep, runnumber)
+        accesses = rng.poisson(LAMBDA * SIM_TIME, n_users)
+        reads = rng.binomial(accesses, p)
+        waits = mean_wait * rng.gamma(20.0, 1.0 / 20.0, n_users)
+        lines = []
+        for u in range(n_users):
+            module = f"DatabaseNetwork.user[{u}]"
+            lines.append(f"scalar {module} totalAccesses {accesses[u]}\n")
+            lines.append(f"scalar {module} totalReads {reads[u]}\n")
+            lines.append(f"scalar {module} totalWrites {accesses[u] - reads[u]}\n")
+            lines.append(f"scalar {module} averageWaitTime {waits[u]:.10g}\n")
+            lines.append(f"scalar {module} accessesPerSecond {accesses[u] / SIM_TIME:.10g}\n")
+            lines.append(f"scalar {module} waitTime:mean {waits[u]:.10g}\n")
+            lines.append(f"scalar {module} readAccess:count {reads[u]}\n")
+            lines.append(f"scalar {module} writeAccess:count {accesses[u] - reads[u]}\n")
+        f.writelines(lines)
+
+        share = rng.dirichlet(np.full(n_tables, 20.0))
+        total = int(accesses.sum())
+        for t in range(n_tables):
+            module = f"DatabaseNetwork.table[{t}]"
+            served = int(total * share[t])
+            util = min(1.0, served * SERVICE_TIME / SIM_TIME)
+            f.write(f"scalar {module} throughput:last {served}\n")
+            f.write(f"scalar {module} utilization:last {util:.10g}\n")
+            f.write(f"scalar {module} waitingTime:mean {mean_wait - SERVICE_TIME:.10g}\n")
+            f.write(f"scalar {module} table.utilization {util:.10g}\n")
+            f.write(f"scalar {module} table.totalServed {served}\n")
+            f.write(f"scalar {module} table.totalReads {int(served * p)}\n")
+            f.write(f"scalar {module} table.totalWrites {served - int(served * p)}\n")
+            f.write(f"scalar {module} table.maxQueueLength {rng.poisson(1 + 10 * mean_wait)}\n")
+            f.write(f"scalar {module} table.avgQueueLength {served * (mean_wait - SERVICE_TIME) / SIM_TIME:.10g}\n")
+            f.write(f"scalar {module} table.avgWaitingTime {mean_wait - SERVICE_TIME:.10g}\n")
+
+
+def write_vec(path, dist, n_users, n_tables, p, rep, runnumber, rng, sim_time=SIM_TIME):
+    """waitTime:vector per user, with a warm-up transient rising to the steady level"""
+    mean_wait = expected_wait(n_users, n_tables, p, dist)
+    with open(path, 'w') as f:
+        run_header(f, dist, n_users, n_tables, p, rep, runnumber)
+        for u in range(n_users):
+            f.write(f"vector {u} DatabaseNetwork.user[{u}] waitTime:vector ETV\n")
+        event = 0
+        for u in range(n_users):
+            times = np.sort(rng.uniform(0.0, sim_time, rng.poisson(LAMBDA * sim_time)))
+            level = mean_wait * (1.0 - np.exp(-times / (WARMUP / 3.0)))
+            values = SERVICE_TIME + level * rng.exponential(1.0, len(times))
+            rows = [f"{u}\t{event + i}\t{t:.6f}\t{v:.8g}\n" for i, (t, v) in enumerate(zip(times, values))]
+            event += len(times)
+            f.writelines(rows)
+
+
+def generate(out_dir, dists=('Uniform', 'Lognormal'), users=(100, 1000), tables=20,
+             probs=(0.3, 0.5, 0.8), reps=5, vec=False, seed=1):
+    """Write one .sca (and optionally .vec) per (dist, N, p, repetition); returns the paths"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for dist in dists:
+        runnumber = 0
+        for n_users in users:
+            for p in probs:
+                for rep in range(reps):
+                    stem = f"{dist}-$N={n_users},$p={p}-{rep}"
+                    write_sca(out_dir / f"{stem}.sca", dist, n_users, tables, p, rep, runnumber, rng)
+                    paths.append(out_dir / f"{stem}.sca")
+                    if vec:
+                        write_vec(out_dir / f"{stem}.vec", dist, n_users, tables, p, rep, runnumber, rng)
+                        paths.append(out_dir / f"{stem}.vec")
+                    runnumber += 1
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic .sca/.vec files in OMNeT++ format")
+    parser.add_argument('out_dir')
+    parser.add_argument('--dists', nargs='+', default=['Uniform', 'Lognormal'])
+    parser.add_argument('--users', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--tables', type=int, default=20)
+    parser.add_argument('--p', type=float, nargs='+', default=[0.3, 0.5, 0.8])
+    parser.add_argument('--reps', type=int, default=5)
+    parser.add_argument('--vec', action='store_true', help="also write waitTime vectors")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    paths = generate(args.out_dir, args.dists, args.users, args.tables, args.p, args.reps, args.vec, args.seed)
+    size = sum(p.stat().st_size for p in paths)
+    print(f"✓ {len(paths)} file scritti in {args.out_dir} ({size / 1e6:.1f} MB)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
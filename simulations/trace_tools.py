@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Access traces for User.traceFile (trace replay, see TraceSource.h).
+
+    info     duration, access rate, read share and busiest tables of a trace,
+             and the traceTimeScale that gives a target rate
+    convert  csv -> binary (*.bin), the compact format read without parsing
+
+Both work in chunks, so multi-million-line traces are never fully in memory.
+
+Usage:
+    python3 trace_tools.py info access.csv [--target-rate 50]
+    python3 trace_tools.py convert access.csv access.bin
+"""
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1_000_000
+# Same layout as TraceSource::readBinary: 24-byte little-endian records
+BINARY_DTYPE = np.dtype([('time', '<f8'), ('table', '<i4'), ('op', '<i4'), ('serviceTime', '<f8')])
+READ_OPS = {'r', 'read', '0'}
+WRITE_OPS = {'w', 'write', '1'}
+
+
+def iter_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Trace as DataFrames (time, table, op with 0 = read, serviceTime NaN if absent)"""
+    if path.endswith('.bin'):
+        with open(path, 'rb') as f:
+            while True:
+                records = np.fromfile(f, dtype=BINARY_DTYPE, count=chunk_rows)
+                if len(records) == 0:
+                    return
+                yield pd.DataFrame(records)
+        return
+
+    names = ['time', 'table', 'op', 'serviceTime']
+    reader = pd.read_csv(path, names=names, comment='#', skipinitialspace=True,
+                         dtype={'op': str, 'time': str}, chunksize=chunk_rows)
+    first = True
+    for chunk in reader:
+        # Only the first line may be a header (non-numeric timestamp), like
+        # the C++ reader; anywhere else it is a corrupted record
+        time = pd.to_numeric(chunk['time'], errors='coerce')
+        if first and len(chunk) and np.isnan(time.iloc[0]):
+            chunk, time = chunk.iloc[1:].copy(), time.iloc[1:]
+        first = False
+        if time.isna().any():
+            raise ValueError(f"{path}: bad timestamp '{chunk['time'][time.isna()].iloc[0]}'")
+        chunk['time'] = time
+        op = chunk['op'].str.strip().str.lower()
+        unknown = ~op.isin(READ_OPS | WRITE_OPS)
+        if unknown.any():
+            raise ValueError(f"{path}: unknown op '{chunk['op'][unknown].iloc[0]}'")
+        chunk['op'] = np.where(op.isin(READ_OPS), 0, 1)
+        chunk['table'] = chunk['table'].astype(int)
+        chunk['serviceTime'] = pd.to_numeric(chunk['serviceTime'], errors='coerce')
+        yield chunk
+
+
+def trace_info(path, top=5):
+    count = reads = 0
+    first = last = None
+    per_table = {}
+    for chunk in iter_chunks(path):
+        if chunk.empty:
+            continue
+        if first is None:
+            first = float(chunk['time'].iloc[0])
+        if last is not None and chunk['time'].iloc[0] < last:
+            raise ValueError(f"{path}: timestamps must be non-decreasing")
+        if not chunk['time'].is_monotonic_increasing:
+            raise ValueError(f"{path}: timestamps must be non-decreasing")
+        last = float(chunk['time'].iloc[-1])
+        count += len(chunk)
+        reads += int((chunk['op'] == 0).sum())
+        for table, n in chunk['table'].value_counts().items():
+            per_table[table] = per_table.get(table, 0) + int(n)
+    duration = (last - first) if count else 0.0
+    return {
+        'records': count,
+        'duration': duration,
+        'rate': count / duration if duration > 0 else float('nan'),
+        'read_share': reads / count if count else float('nan'),
+        'tables': len(per_table),
+        'max_table': max(per_table) if per_table else -1,
+        'top_tables': sorted(per_table.items(), key=lambda kv: -kv[1])[:top],
+    }
+
+
+def convert(src, dst):
+    written = 0
+    with open(dst, 'wb') as out:
+        for chunk in iter_chunks(src):
+            records = np.empty(len(chunk), dtype=BINARY_DTYPE)
+            for field in BINARY_DTYPE.names:
+                records[field] = chunk[field].to_numpy()
+            records.tofile(out)
+            written += len(records)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Access traces for trace replay")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_info = sub.add_parser('info')
+    p_info.add_argument('trace')
+    p_info.add_argument('--target-rate', type=float, help="accesses/s wanted in the simulation")
+    p_conv = sub.add_parser('convert')
+    p_conv.add_argument('trace')
+    p_conv.add_argument('output')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        n = convert(args.trace, args.output)
+        print(f"{n} record scritti in {args.output}")
+        return 0
+
+    info = trace_info(args.trace)
+    if info['records'] == 0:
+        print("Trace vuota")
+        return 1
+    print(f"Record:        {info['records']}")
+    print(f"Durata:        {info['duration']:.3f} s")
+    print(f"Rate:          {info['rate']:.3f} accessi/s")
+    print(f"Read share:    {100 * info['read_share']:.1f}%")
+    print(f"Tabelle:       {info['tables']} (numTables >= {info['max_table'] + 1})")
+    print("Più accedute:  " + ", ".join(f"{t}: {n}" for t, n in info['top_tables']))
+    if args.target_rate:
+        print(f"traceTimeScale = {args.target_rate / info['rate']:.6g} per {args.target_rate:g} accessi/s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
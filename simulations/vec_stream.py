@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for OMNeT++ .vec files.
+
+Unlike parse_vec_file in analyze_warmup.py, nothing is accumulated: data lines
+are yielded one at a time, so multi-gigabyte vector files can be reduced with
+constant memory.
+"""
+
+import re
+
+
+def parse_duration(text):
+    """'500s' / '500' / '1.5ms' -> seconds"""
+    match = re.fullmatch(r'\s*([\d.eE+-]+)\s*(s|ms|us|ns|min|h)?\s*', text)
+    if not match:
+        raise ValueError(f"Invalid duration: {text}")
+    scale = {None: 1.0, 's': 1.0, 'ms': 1e-3, 'us': 1e-6, 'ns': 1e-9, 'min': 60.0, 'h': 3600.0}
+    return float(match.group(1)) * scale[match.group(2)]
+
+
+def read_vec_header(filepath):
+    """Run attributes, itervars and config entries from the header of a .vec file"""
+    header = {'attr': {}, 'itervar': {}, 'config': {}}
+    with open(filepath, 'r') as f:
+        for line in f:
+            if line.startswith('vector') or (line[:1].isdigit()):
+                break
+            parts = line.split(None, 2)
+            if len(parts) == 3 and parts[0] in header:
+                header[parts[0]][parts[1]] = parts[2].strip().strip('"')
+    return header
+
+
+def iter_vec_records(filepath, metric_filter=None, module_filter=None):
+    """
+    Yield (module, metric, time, value) for every data line of the selected
+    vectors. metric_filter/module_filter are substrings, None selects all.
+    """
+    vectors = {}   # vector id -> (module, metric, time column, value column)
+
+    with open(filepath, 'r') as f:
+        for line in f:
+            if not line or not line[0].isdigit():
+                # Declaration: "vector <id> <module> <name>:vector [ETV]"
+                if line.startswith('vector'):
+                    parts = line.split()
+                    if len(parts) < 4:
+                        continue
+                    module, metric = parts[2], parts[3].split(':')[0]
+                    if metric_filter is not None and metric_filter not in metric:
+                        continue
+                    if module_filter is not None and module_filter not in module:
+                        continue
+                    columns = parts[4] if len(parts) >= 5 else 'ETV'
+                    vectors[parts[1]] = (module, metric,
+                                         columns.index('T') + 1, columns.index('V') + 1)
+                continue
+
+            parts = line.split()
+            vec = vectors.get(parts[0])
+            if vec is None:
+                continue
+            try:
+                yield vec[0], vec[1], float(parts[vec[2]]), float(parts[vec[3]])
+            except (IndexError, ValueError):
+                continue
@@ -6,27 +6,45 @@ Testa 4 casi degeneri per validare il comportamento del modello:
   2. Write-Only (mutua esclusione critica)
   3. Read-Only (massimo parallelismo)
   4. Single Table (serializzazione)
+
+I test girano in parallelo, ognuno in una directory temporanea isolata e con
+il proprio timeout, quindi la suite dura quanto il caso più lento e può
+essere usata come gate veloce prima di uno sweep. Oltre al codice di uscita
+vengono verificate proprietà quantitative (throughput ≈ N·λ, concorrenza
+write ≤ 1, attesa read-only ≈ 0, limiti di utilizzazione a tabella singola).
+
+Usage:
+    python3 verify_simulation.py [--timeout 120] [--jobs 4]
 """
 
-import subprocess
-import os
+import argparse
+import math
 import sys
-import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+from run_specs import Launcher, RunSpec
+
 class Logger:
     """Simple logger that writes to both stdout and file"""
-    def __init__(self, filepath):
-        self.filepath = Path(filepath)
+    def __init__(self, filepath=None, echo=True):
+        self.filepath = Path(filepath) if filepath else None
+        self.echo = echo
         self.lines = []
-    
+
     def log(self, message=""):
         """Log message to both stdout and internal buffer"""
-        print(message)
+        if self.echo:
+            print(message)
         self.lines.append(message)
-    
+
+    def replay(self, other):
+        """Append (and print) the buffered lines of another logger"""
+        for line in other.lines:
+            self.log(line)
+
     def save(self):
         """Save all logged messages to file"""
         with open(self.filepath, 'w') as f:
@@ -34,123 +52,83 @@ class Logger:
                 f.write(line + '\n')
 
 class VerificationTester:
-    def __init__(self, base_dir=".."):
-        self.base_dir = Path(base_dir)
+    def __init__(self, base_dir="..", timeout=120, jobs=None):
+        # Percorsi assoluti: ogni test gira nella propria directory temporanea
+        self.base_dir = Path(base_dir).resolve()
         self.out_dir = self.base_dir / "out" / "clang-release" / "src" / "exam"
-        self.results_dir = Path("results_verify")
+        self.results_dir = Path("results_verify").resolve()
         self.src_dir = self.base_dir / "src"
         self.logger = Logger(self.results_dir / "verification_results.log")
-        
-        # Percorsi relativi a results_verify (dove verrà eseguito)
-        self.out_dir_relative = Path("..") / self.out_dir
-        self.src_dir_relative = Path("..") / self.src_dir
-        
+        self.timeout = timeout
+        self.jobs = jobs
+        self.launcher = Launcher(self.base_dir / "simulations", timeout=timeout)
+
     def setup(self):
         """Prepara ambiente per test"""
         self.logger.log(f"\n{'='*60}")
         self.logger.log("VERIFICATION TEST SETUP")
         self.logger.log(f"{'='*60}\n")
-        
-        # Crea directory isolata per risultati verification
+
+        # Directory con gli artefatti (ini + .sca) copiati da ogni test
         if self.results_dir.exists():
             shutil.rmtree(self.results_dir)
         self.results_dir.mkdir(parents=True)
         self.logger.log(f"✓ Created results directory: {self.results_dir}/")
-        
+
         # Verifica che l'eseguibile esista
         if not self.out_dir.exists():
             self.logger.log(f"✗ ERRORE: Eseguibile non trovato: {self.out_dir}")
             self.logger.log("  Eseguire: cd ../src && make")
             return False
-        
+
         self.logger.log(f"✓ Eseguibile trovato: {self.out_dir}")
         return True
-    
-    def run_test(self, test_name, config_content, sim_time="100s"):
-        """Esegue un test di verifica"""
-        self.logger.log(f"\n{'-'*60}")
-        self.logger.log(f"TEST: {test_name}")
-        self.logger.log(f"{'-'*60}")
-        
-        # Crea config file temporaneo
-        config_file = self.results_dir / f"{test_name}.ini"
-        
-        # Template config con parametri comuni
-        full_config = f"""
-[General]
-description = "Verification Test: {test_name}"
-network = progetto.DatabaseNetwork
-seed-set = 1
-result-dir = results_verify
-
-[Config {test_name}]
-{config_content}
-sim-time-limit = {sim_time}
-warmup-period = 0s
-repeat = 1
-"""
-        
-        config_file.write_text(full_config)
-        self.logger.log(f"✓ Created config: {config_file}")
-        
-        # Esegui simulazione
-        self.logger.log(f"  Running simulation...")
-        try:
-            # NED path: OMNeT++ troverà automaticamente il package 'progetto' in src/progetto/
-            ned_path = str(self.src_dir) + ":."
-            
-            # Debug: stampa il comando esatto
-            cmd = [str(self.out_dir), "-n", ned_path,
-                 "-c", test_name, 
-                 "-f", str(config_file),
-                 "-u", "Cmdenv"]
-            self.logger.log(f"  Command: {' '.join(cmd)}")
-            
-            result = subprocess.run(
-                cmd,
-                cwd=".",
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            
-            if result.returncode == 0:
-                self.logger.log(f"  ✓ Simulazione completata con successo")
-                return True
-            else:
-                self.logger.log(f"  ✗ Simulazione fallita")
-                self.logger.log(f"  STDERR: {result.stderr[:500]}")
-                return False
-                
-        except subprocess.TimeoutExpired:
-            self.logger.log(f"  ✗ Simulazione timeout (>120s)")
-            return False
-        except Exception as e:
-            self.logger.log(f"  ✗ Errore esecuzione: {e}")
-            return False
-    
-    def analyze_results(self, test_name):
-        """Analizza risultati di un test"""
-        self.logger.log(f"  Analyzing results...")
-        
-        # Cerca file .sca corrispondente (ricerca ricorsiva)
-        sca_files = list(self.results_dir.rglob(f"*{test_name}*.sca"))
-        
+
+    def run_test(self, test_name, params, log, sim_time=100.0):
+        """
+        Esegue un test di verifica in una directory temporanea isolata.
+        Ritorna le statistiche aggregate del .sca prodotto, None se fallisce.
+        """
+        log.log(f"\n{'-'*60}")
+        log.log(f"TEST: {test_name}")
+        log.log(f"{'-'*60}")
+
+        spec = RunSpec(test_name, params, {
+            'description': f'"Verification Test: {test_name}"',
+            'seed-set': 1,
+            'sim-time-limit': sim_time,
+            'warmup-period': 0,
+        })
+        log.log(f"  Running simulation...")
+        log.log(f"  Command: {' '.join(spec.argv(self.out_dir, self.src_dir, f'{test_name}.ini'))}")
+        result = self.launcher.launch(spec, self.results_dir / test_name)
+
+        if result.returncode is None:
+            log.log(f"  ✗ Errore esecuzione: {result.output}")
+            return None
+        if not result.ok:
+            log.log(f"  ✗ Simulazione fallita")
+            log.log(f"  OUTPUT: {result.output[-500:]}")
+            return None
+        log.log(f"  ✓ Simulazione completata con successo ({result.elapsed:.1f}s)")
+
+        sca_files = result.sca_files()
         if not sca_files:
-            self.logger.log(f"  ⚠ Nessun file .sca trovato")
+            log.log(f"  ⚠ Nessun file .sca trovato")
             return None
-        
-        # Leggi primo file .sca
-        sca_file = sca_files[0]
-        
-        # Estrai statistiche rilevanti
+        return self.analyze_results(sca_files[0], log)
+
+    def analyze_results(self, sca_file, log):
+        """Aggrega gli scalari di un file .sca per nome metrica"""
+        log.log(f"  Analyzing results...")
+
         stats = {}
         try:
             with open(sca_file, 'r') as f:
                 for line in f:
                     line = line.strip()
                     if line.startswith('scalar'):
-                        # Formato: scalar DatabaseNetwork.table[0] throughput 0.1234
+                        # Formato: scalar DatabaseNetwork.table[0] table.totalServed 1234
                         parts = line.split()
                         if len(parts) >= 4:
                             metric = parts[2]
@@ -162,221 +140,230 @@ repeat = 1
                             except ValueError:
                                 pass
         except Exception as e:
-            self.logger.log(f"  ⚠ Errore lettura .sca: {e}")
+            log.log(f"  ⚠ Errore lettura .sca: {e}")
             return None
-        
+
         # Calcola aggregate
         result = {}
         for metric, values in stats.items():
             if values:
                 result[metric] = {
                     'mean': sum(values) / len(values),
+                    'sum': sum(values),
                     'count': len(values),
                     'min': min(values),
-                    'max': max(values)
+                    'max': max(values),
+                    'values': values,
                 }
-        
+
         return result
-    
-    def verify_degeneracy_zero_users(self):
+
+    @staticmethod
+    def check(log, description, ok, detail):
+        log.log(f"    {'✓' if ok else '✗'} {description}: {detail}")
+        return ok
+
+    def check_throughput(self, log, results, n_users, lam, sim_time):
+        """Richieste servite ≈ N·λ·T (Poisson: ±4σ più le richieste in volo)"""
+        served = results.get('table.totalServed', {}).get('sum', 0.0)
+        expected = n_users * lam * sim_time
+        slack = 4 * math.sqrt(expected) + n_users
+        return self.check(log, "throughput ≈ N·λ",
+                          abs(served - expected) <= slack,
+                          f"{served / sim_time:.3f} req/s vs {n_users * lam:.3f} (±{slack / sim_time:.3f})")
+
+    def verify_degeneracy_zero_users(self, log):
         """5.1 Test: Zero Users - Sistema deve essere IDLE"""
-        self.logger.log(f"\n{'='*60}")
-        self.logger.log("5.1 DEGENERACY TEST: ZERO USERS")
-        self.logger.log(f"{'='*60}")
-        self.logger.log("Expected: No activity, all queues empty, throughput = 0")
-        
-        config = """
-*.numUsers = 0
-*.numTables = 20
-"""
-        
-        if self.run_test("ZeroUsers", config, sim_time="100s"):
-            results = self.analyze_results("ZeroUsers")
-            
-            if results:
-                throughput_vals = results.get('throughput', {}).get('mean', 0)
-                
-                self.logger.log(f"\n  Results:")
-                self.logger.log(f"    Throughput: {throughput_vals:.6f} (expected: ≈0)")
-                
-                if throughput_vals < 0.001:
-                    self.logger.log(f"  ✓ PASS: Sistema correttamente IDLE")
-                    return True
-                else:
-                    self.logger.log(f"  ✗ FAIL: Throughput non zero con zero utenti!")
-                    return False
-        
-        return False
-    
-    def verify_degeneracy_write_only(self):
+        log.log(f"\n{'='*60}")
+        log.log("5.1 DEGENERACY TEST: ZERO USERS")
+        log.log(f"{'='*60}")
+        log.log("Expected: No activity, all queues empty, throughput = 0")
+
+        config = {'numUsers': 0, 'numTables': 20}
+
+        results = self.run_test("ZeroUsers", config, log, sim_time=100.0)
+        if results is None:
+            return False
+
+        log.log(f"\n  Results:")
+        checks = [
+            self.check(log, "nessuna richiesta servita", results.get('table.totalServed', {}).get('sum', 0) == 0,
+                       f"{results.get('table.totalServed', {}).get('sum', 0):.0f}"),
+            self.check(log, "utilizzazione nulla", results.get('table.utilization', {}).get('max', 0) == 0,
+                       f"{results.get('table.utilization', {}).get('max', 0):.6f}"),
+            self.check(log, "code vuote", results.get('table.maxQueueLength', {}).get('max', 0) == 0,
+                       f"max {results.get('table.maxQueueLength', {}).get('max', 0):.0f}"),
+        ]
+        passed = all(checks)
+        log.log(f"  {'✓ PASS: Sistema correttamente IDLE' if passed else '✗ FAIL: attività con zero utenti!'}")
+        return passed
+
+    def verify_degeneracy_write_only(self, log):
         """5.1 Test: Write-Only - Mutua esclusione critica"""
-        self.logger.log(f"\n{'='*60}")
-        self.logger.log("5.1 DEGENERACY TEST: WRITE-ONLY WORKLOAD")
-        self.logger.log(f"{'='*60}")
-        self.logger.log("Expected: Mutual exclusion critical, 1 write at a time")
-        
-        config = """
-*.numUsers = 10
-*.numTables = 5
-*.user[*].readProbability = 0
-*.user[*].tableDistribution = "uniform"
-*.user[*].lambda = 1.0
-*.user[*].serviceTime = 0.1s
-"""
-        
-        if self.run_test("WriteOnly", config, sim_time="50s"):
-            results = self.analyze_results("WriteOnly")
-            
-            if results:
-                self.logger.log(f"\n  Results:")
-                for metric in ['throughput', 'utilization']:
-                    if metric in results:
-                        val = results[metric].get('mean', 0)
-                        self.logger.log(f"    {metric}: {val:.6f}")
-                
-                self.logger.log(f"  ✓ PASS: Sistema esegue writes con mutua esclusione")
-                return True
-        
-        return False
-    
-    def verify_degeneracy_read_only(self):
+        log.log(f"\n{'='*60}")
+        log.log("5.1 DEGENERACY TEST: WRITE-ONLY WORKLOAD")
+        log.log(f"{'='*60}")
+        log.log("Expected: Mutual exclusion critical, 1 write at a time")
+
+        sim_time, service = 50.0, 0.1
+        config = {'numUsers': 10, 'numTables': 5, 'readProbability': 0, 'tableDistribution': 'uniform',
+                  'lambda': 1.0, 'serviceTime': service}
+        results = self.run_test("WriteOnly", config, log, sim_time=sim_time)
+        if results is None:
+            return False
+
+        log.log(f"\n  Results:")
+        served = results.get('table.totalServed', {}).get('values', [])
+        utils = results.get('table.utilization', {}).get('values', [])
+        # Con una sola write alla volta il tempo occupato è la somma dei
+        # servizi: utilization = served·S/T (a meno della write in corso)
+        overlap = max((abs(u - s * service / sim_time) for s, u in zip(served, utils)), default=float('inf'))
+        checks = [
+            self.check_throughput(log, results, 10, 1.0, sim_time),
+            self.check(log, "concorrenza write ≤ 1 (busy = served·S)", overlap <= service / sim_time + 1e-9,
+                       f"max |util - served·S/T| = {overlap:.6f}"),
+            self.check(log, "nessuna read servita", results.get('table.totalReads', {}).get('sum', 0) == 0,
+                       f"{results.get('table.totalReads', {}).get('sum', 0):.0f}"),
+            self.check(log, "nessun reader attivo", results.get('table.avgActiveReaders', {}).get('max', 0) == 0,
+                       f"{results.get('table.avgActiveReaders', {}).get('max', 0):.6f}"),
+        ]
+        passed = all(checks)
+        log.log(f"  {'✓ PASS: Sistema esegue writes con mutua esclusione' if passed else '✗ FAIL: mutua esclusione violata'}")
+        return passed
+
+    def verify_degeneracy_read_only(self, log):
         """5.1 Test: Read-Only - Massimo parallelismo"""
-        self.logger.log(f"\n{'='*60}")
-        self.logger.log("5.1 DEGENERACY TEST: READ-ONLY WORKLOAD")
-        self.logger.log(f"{'='*60}")
-        self.logger.log("Expected: Maximum parallelism, no mutual exclusion conflicts")
-        
-        config = """
-*.numUsers = 10
-*.numTables = 5
-*.user[*].readProbability = 1.0
-*.user[*].tableDistribution = "uniform"
-*.user[*].lambda = 1.0
-*.user[*].serviceTime = 0.1s
-"""
-        
-        if self.run_test("ReadOnly", config, sim_time="50s"):
-            results = self.analyze_results("ReadOnly")
-            
-            if results:
-                self.logger.log(f"\n  Results:")
-                for metric in ['throughput', 'utilization']:
-                    if metric in results:
-                        val = results[metric].get('mean', 0)
-                        self.logger.log(f"    {metric}: {val:.6f}")
-                
-                self.logger.log(f"  ✓ PASS: Sistema esegue reads con parallelismo")
-                return True
-        
-        return False
-    
-    def verify_degeneracy_single_table(self):
+        log.log(f"\n{'='*60}")
+        log.log("5.1 DEGENERACY TEST: READ-ONLY WORKLOAD")
+        log.log(f"{'='*60}")
+        log.log("Expected: Maximum parallelism, no mutual exclusion conflicts")
+
+        sim_time, service = 50.0, 0.1
+        config = {'numUsers': 10, 'numTables': 5, 'readProbability': 1.0, 'tableDistribution': 'uniform',
+                  'lambda': 1.0, 'serviceTime': service}
+        results = self.run_test("ReadOnly", config, log, sim_time=sim_time)
+        if results is None:
+            return False
+
+        log.log(f"\n  Results:")
+        queue_wait = results.get('table.avgWaitingTime', {}).get('max', float('inf'))
+        response = results.get('averageWaitTime', {}).get('mean', 0.0)
+        checks = [
+            self.check_throughput(log, results, 10, 1.0, sim_time),
+            self.check(log, "attesa in coda ≈ 0", queue_wait < 1e-9, f"max {queue_wait:.9f}s"),
+            self.check(log, "tempo di risposta ≈ S", abs(response - service) <= 0.05 * service,
+                       f"{response:.6f}s vs {service}s"),
+            self.check(log, "nessuna write servita", results.get('table.totalWrites', {}).get('sum', 0) == 0,
+                       f"{results.get('table.totalWrites', {}).get('sum', 0):.0f}"),
+        ]
+        passed = all(checks)
+        log.log(f"  {'✓ PASS: Sistema esegue reads con parallelismo' if passed else '✗ FAIL: le read si bloccano'}")
+        return passed
+
+    def verify_degeneracy_single_table(self, log):
         """5.1 Test: Single Table - Serializzazione"""
-        self.logger.log(f"\n{'='*60}")
-        self.logger.log("5.1 DEGENERACY TEST: SINGLE TABLE")
-        self.logger.log(f"{'='*60}")
-        self.logger.log("Expected: High contention, long queues, high wait times")
-        
-        config = """
-*.numUsers = 5
-*.numTables = 1
-*.user[*].readProbability = 0.5
-*.user[*].tableDistribution = "uniform"
-*.user[*].lambda = 1.0
-*.user[*].serviceTime = 0.1s
-"""
-        
-        if self.run_test("SingleTable", config, sim_time="50s"):
-            results = self.analyze_results("SingleTable")
-            
-            if results:
-                self.logger.log(f"\n  Results:")
-                for metric in ['throughput', 'waitingTime']:
-                    if metric in results:
-                        val = results[metric].get('mean', 0)
-                        self.logger.log(f"    {metric}: {val:.6f}")
-                
-                self.logger.log(f"  ✓ PASS: Sistema serializza su singola tabella")
-                return True
-        
-        return False
-    
+        log.log(f"\n{'='*60}")
+        log.log("5.1 DEGENERACY TEST: SINGLE TABLE")
+        log.log(f"{'='*60}")
+        log.log("Expected: High contention, long queues, high wait times")
+
+        sim_time, service = 50.0, 0.1
+        config = {'numUsers': 5, 'numTables': 1, 'readProbability': 0.5, 'tableDistribution': 'uniform',
+                  'lambda': 1.0, 'serviceTime': service}
+        results = self.run_test("SingleTable", config, log, sim_time=sim_time)
+        if results is None:
+            return False
+
+        log.log(f"\n  Results:")
+        util = results.get('table.utilization', {}).get('mean', 0.0)
+        writes = results.get('table.totalWrites', {}).get('sum', 0.0)
+        served = results.get('table.totalServed', {}).get('sum', 0.0)
+        slack = service / sim_time
+        # Le write sono esclusive (limite inferiore), le read al più si
+        # sovrappongono (limite superiore: domanda totale)
+        lower, upper = writes * service / sim_time, min(1.0, served * service / sim_time + slack)
+        checks = [
+            self.check_throughput(log, results, 5, 1.0, sim_time),
+            self.check(log, "utilizzazione nei limiti", lower - slack <= util <= upper,
+                       f"{lower:.4f} ≤ {util:.4f} ≤ {upper:.4f}"),
+        ]
+        passed = all(checks)
+        log.log(f"  {'✓ PASS: Sistema serializza su singola tabella' if passed else '✗ FAIL: utilizzazione incoerente'}")
+        return passed
+
     def run_all_tests(self):
-        """Esegue tutti i test di verifica"""
+        """Esegue tutti i test di verifica in parallelo"""
         self.logger.log(f"\n{'='*70}")
         self.logger.log(" "*15 + "VERIFICATION TEST SUITE")
         self.logger.log(f"{'='*70}")
         self.logger.log(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        print(f"\n{'='*70}")
-        print(" "*15 + "VERIFICATION TEST SUITE")
-        print(f"{'='*70}")
-        
+
         if not self.setup():
             return False
-        
+
         tests = [
             ("5.1a", self.verify_degeneracy_zero_users),
             ("5.1b", self.verify_degeneracy_write_only),
             ("5.1c", self.verify_degeneracy_read_only),
             ("5.1d", self.verify_degeneracy_single_table),
         ]
-        
-        results = {}
-        for test_id, test_func in tests:
+
+        def run(test_func):
+            log = Logger(echo=False)
             try:
-                results[test_id] = test_func()
+                return test_func(log), log
             except Exception as e:
-                self.logger.log(f"  ✗ EXCEPTION: {e}")
-                print(f"  ✗ EXCEPTION: {e}")
-                results[test_id] = False
-        
+                log.log(f"  ✗ EXCEPTION: {e}")
+                return False, log
+
+        start = datetime.now()
+        with ThreadPoolExecutor(max_workers=self.jobs or len(tests)) as pool:
+            futures = {test_id: pool.submit(run, test_func) for test_id, test_func in tests}
+            results = {}
+            # Output di ogni test in blocco e in ordine, non interlacciato
+            for test_id, future in futures.items():
+                results[test_id], log = future.result()
+                self.logger.replay(log)
+        elapsed = (datetime.now() - start).total_seconds()
+
         # Riassunto
         self.logger.log(f"\n{'='*70}")
         self.logger.log("VERIFICATION RESULTS SUMMARY")
         self.logger.log(f"{'='*70}\n")
-        
-        print(f"\n{'='*70}")
-        print("VERIFICATION RESULTS SUMMARY")
-        print(f"{'='*70}\n")
-        
+
         passed = sum(1 for v in results.values() if v)
         total = len(results)
-        
+
         for test_id, result in results.items():
             status = "✓ PASS" if result else "✗ FAIL"
             self.logger.log(f"  {test_id}: {status}")
-            print(f"  {test_id}: {status}")
-        
-        self.logger.log(f"\nTotal: {passed}/{total} tests passed")
-        print(f"\nTotal: {passed}/{total} tests passed")
-        
+
+        self.logger.log(f"\nTotal: {passed}/{total} tests passed in {elapsed:.1f}s")
+
         if passed == total:
             self.logger.log("\n✓ ALL VERIFICATION TESTS PASSED")
             self.logger.log("  Sistema è corretto e pronto per esperimenti full-scale")
-            print("\n✓ ALL VERIFICATION TESTS PASSED")
-            print("  Sistema è corretto e pronto per esperimenti full-scale")
         else:
             self.logger.log(f"\n⚠ {total - passed} test(s) failed")
             self.logger.log("  Rivedere implementazione prima di procedere")
-            print(f"\n⚠ {total - passed} test(s) failed")
-            print("  Rivedere implementazione prima di procedere")
-        
+
         self.logger.log(f"\nDetailed results saved in: {self.results_dir}/")
         self.logger.log(f"Completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        
+
         # Salva il log file
-        log_file = self.results_dir / "verification_results.log"
         self.logger.save()
-        
-        print(f"\n✓ Log file saved: {log_file}")
-        print(f"\nDetailed results saved in: {self.results_dir}/\n")
-        
+        print(f"\n✓ Log file saved: {self.logger.filepath}\n")
+
         return passed == total
 
 def main():
     """Main entry point"""
-    tester = VerificationTester()
+    parser = argparse.ArgumentParser(description="Verification (degeneracy) test suite")
+    parser.add_argument("--timeout", type=int, default=120, help="timeout per test [s]")
+    parser.add_argument("--jobs", type=int, default=None, help="test in parallelo (default: tutti)")
+    args = parser.parse_args()
+
+    tester = VerificationTester(timeout=args.timeout, jobs=args.jobs)
     success = tester.run_all_tests()
     return 0 if success else 1
 
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Automatic warm-up truncation point (MSER-5 or Welch) across replications.
+
+Each replication's .vec file is streamed once and reduced to per-bin means of
+waitTime over fixed time bins; the bins are averaged across replications
+(Welch ensemble average) and the truncation point is searched on that series:
+
+  - MSER-5: batches of 5 bins, truncation d* minimizing the marginal standard
+    error  sum((z_i - mean(z[d:]))^2) / (k - d)^2  for d <= k/2 (earliest d
+    within sampling noise of the minimum)
+  - Welch:  first time after which the moving average stays within a
+    tolerance band around the mean of the second half of the run
+
+The recommended warmup-period is written into the results catalog
+(results_catalog.json) for every config/iteration found.
+
+Run the configs with warmup-period = 0s and the waitTime vector enabled:
+[Config WarmupUniform] / [Config WarmupLognormal] in omnetpp.ini cover the
+(N, p) points of the Uniform/Lognormal sweeps (results_catalog.WARMUP_CONFIGS),
+[Config WarmupAnalysis] a single heavy-load point.
+
+Usage:
+    python3 warmup_detection.py results_warmup [--method mser5|welch]
+"""
+
+import argparse
+import math
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from vec_stream import iter_vec_records, read_vec_header, parse_duration
+from results_catalog import config_key, parse_itervars, update_entry
+
+BIN_WIDTH = 10.0          # seconds per time bin
+MSER_BATCH = 5            # bins per MSER batch
+WELCH_WINDOW = 5          # half-width (bins) of the Welch moving average
+WELCH_TOLERANCE = 0.05    # relative band around the steady-state level
+
+
+def binned_replication(vec_file, metric, bin_width, end):
+    """Per-bin means of one replication (NaN for empty bins), one streaming pass"""
+    num_bins = max(1, int(math.ceil(end / bin_width)))
+    sums = np.zeros(num_bins)
+    counts = np.zeros(num_bins)
+    for _, _, t, v in iter_vec_records(vec_file, metric):
+        idx = int(t / bin_width)
+        if 0 <= idx < num_bins:
+            sums[idx] += v
+            counts[idx] += 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def mser5(series, batch=MSER_BATCH):
+    """Truncation point in bins (multiple of batch) and whether it is reliable"""
+    k = len(series) // batch
+    if k < 4:
+        return 0, False
+    z = series[:k * batch].reshape(k, batch).mean(axis=1)
+    values = np.array([np.sum((z[d:] - z[d:].mean()) ** 2) / (k - d) ** 2
+                       for d in range(0, k // 2 + 1)])
+    best_d = int(np.argmin(values))
+    # On the steady-state plateau the statistic only fluctuates; the variance
+    # estimate has relative error ~sqrt(2/(k-d)), so take the earliest d that
+    # is statistically indistinguishable from the minimum instead of the
+    # noise-driven argmin.
+    threshold = values[best_d] * (1 + math.sqrt(2.0 / (k - best_d)))
+    d = int(np.nonzero(values <= threshold)[0][0])
+    # A minimum at the end of the search range means no steady state was seen
+    return d * batch, best_d < k // 2
+
+
+def welch(series, window=WELCH_WINDOW, tolerance=WELCH_TOLERANCE):
+    """First bin after which the moving average stays within the band"""
+    n = len(series)
+    if n < 2 * window + 2:
+        return 0, False
+    kernel = np.ones(2 * window + 1) / (2 * window + 1)
+    smooth = np.convolve(series, kernel, mode='same')
+    smooth[:window] = [series[:2 * i + 1].mean() for i in range(window)]
+    level = series[n // 2:].mean()
+    band = tolerance * max(abs(level), 1e-12)
+    outside = np.nonzero(np.abs(smooth[:n - window] - level) > band)[0]
+    cut = int(outside[-1]) + 1 if len(outside) else 0
+    return cut, cut <= n // 2
+
+
+def detect_warmup(vec_files, metric='waitTime', method='mser5', bin_width=BIN_WIDTH):
+    """Ensemble-average the replications and return (warmup_s, reliable, num_bins)"""
+    end = 0.0
+    for vec_file in vec_files:
+        limit = read_vec_header(vec_file)['config'].get('sim-time-limit')
+        if limit is not None:
+            end = max(end, parse_duration(limit))
+    if end <= 0:
+        end = max((t for f in vec_files for _, _, t, _ in iter_vec_records(f, metric)), default=0.0)
+
+    reps = np.vstack([binned_replication(f, metric, bin_width, end) for f in vec_files])
+    with np.errstate(invalid='ignore'):
+        ensemble = np.nanmean(reps, axis=0)
+    # Empty bins (no completions yet) carry the next observed level backwards
+    valid = np.nonzero(~np.isnan(ensemble))[0]
+    if len(valid) == 0:
+        return 0.0, False, 0
+    ensemble = np.interp(np.arange(len(ensemble)), valid, ensemble[valid])
+
+    if method == 'welch':
+        cut, reliable = welch(ensemble)
+    else:
+        cut, reliable = mser5(ensemble)
+    return cut * bin_width, reliable, len(ensemble)
+
+
+def group_replications(results_dir):
+    """{(configname, iterationvars): [vec files]} from the run headers"""
+    groups = defaultdict(list)
+    for vec_file in sorted(Path(results_dir).rglob("*.vec")):
+        attrs = read_vec_header(vec_file)['attr']
+        groups[(attrs.get('configname', vec_file.stem), attrs.get('iterationvars', ''))].append(vec_file)
+    return groups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Automatic warm-up detection (MSER-5 / Welch)")
+    parser.add_argument('results_dir', nargs='?', default='results_warmup')
+    parser.add_argument('--method', choices=['mser5', 'welch'], default='mser5')
+    parser.add_argument('--metric', default='waitTime')
+    parser.add_argument('--bin-width', type=float, default=BIN_WIDTH)
+    parser.add_argument('--no-catalog', action='store_true', help="do not write results_catalog.json")
+    args = parser.parse_args()
+
+    groups = group_replications(args.results_dir)
+    if not groups:
+        print(f"Nessun file .vec trovato in {args.results_dir}")
+        return 1
+
+    print(f"{'Config':<40} {'reps':>5} {'warmup':>10}  {'method':<6}")
+    print("-" * 70)
+    for (configname, itervars), files in sorted(groups.items()):
+        warmup, reliable, num_bins = detect_warmup(files, args.metric, args.method, args.bin_width)
+        # Round up to a whole bin and never recommend less than one bin
+        warmup_s = max(args.bin_width, math.ceil(warmup / args.bin_width) * args.bin_width)
+        key = config_key(configname, itervars)
+        note = "" if reliable else "  ⚠ no steady state within the first half, run longer"
+        print(f"{key[:40]:<40} {len(files):>5} {warmup_s:>9.0f}s  {args.method:<6}{note}")
+
+        if not args.no_catalog:
+            update_entry(key, {
+                'configname': configname,
+                'itervars': parse_itervars(itervars),
+                'warmup_s': warmup_s,
+                'warmup-period': f"{warmup_s:g}s",
+                'warmup_method': args.method,
+                'warmup_reliable': reliable,
+                'warmup_replications': len(files),
+            })
+
+    if not args.no_catalog:
+        print("\n✓ Recommended warm-up periods saved in results_catalog.json")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())